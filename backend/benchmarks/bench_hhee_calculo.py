@@ -0,0 +1,81 @@
+# /backend/benchmarks/bench_hhee_calculo.py
+"""
+Compara la lógica de HHEE escalar (aplicar_logica_de_negocio) con el motor vectorizado.
+Verifica que ambos resultados coincidan fila a fila (valor y tipo) y muestra la aceleración.
+
+Uso: python -m backend.benchmarks.bench_hhee_calculo [empleados] [dias]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from ..services.geovictoria_service import aplicar_logica_de_negocio
+from ..services.hhee_calculo import calcular_hhee_lote
+
+
+def _hhmm(minutos: int) -> str:
+    minutos %= 1440
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def generar_periodo(empleados: int, dias: int, semilla: int = 7):
+    rnd = random.Random(semilla)
+    inicio = date(2026, 1, 26)
+    filas = []
+    for e in range(empleados):
+        rut = f"{10000000 + e}K"
+        turno_inicio = rnd.choice([360, 480, 540, 840, 1320])  # incluye turnos nocturnos
+        duracion = rnd.choice([480, 540, 600])
+        for d in range(dias):
+            fila = {
+                "fecha": (inicio + timedelta(days=d)).strftime('%Y-%m-%d'),
+                "rut_limpio": rut,
+                "inicio_turno_teorico": _hhmm(turno_inicio),
+                "fin_turno_teorico": _hhmm(turno_inicio + duracion),
+                "marca_real_inicio": _hhmm(turno_inicio + rnd.randint(-90, 30)),
+                "marca_real_fin": _hhmm(turno_inicio + duracion + rnd.randint(-30, 120)),
+            }
+            caso = rnd.random()
+            if caso < 0.10:
+                fila["inicio_turno_teorico"] = rnd.choice([None, "Descanso", "00:00"])
+                if fila["inicio_turno_teorico"] == "00:00":
+                    fila["fin_turno_teorico"] = "00:00"
+            elif caso < 0.15:
+                fila["marca_real_fin"] = None
+            elif caso < 0.17:
+                fila["marca_real_fin"] = fila["marca_real_inicio"]
+            filas.append(fila)
+    return filas
+
+
+def main():
+    empleados = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    dias = int(sys.argv[2]) if len(sys.argv) > 2 else 31
+    filas = generar_periodo(empleados, dias)
+
+    t0 = time.perf_counter()
+    escalar = [aplicar_logica_de_negocio(f) for f in filas]
+    t_escalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vectorizado = calcular_hhee_lote(filas)
+    t_vector = time.perf_counter() - t0
+
+    diferencias = 0
+    for a, b in zip(escalar, vectorizado):
+        if a != b or any(type(a[k]) is not type(b[k]) for k in a):
+            diferencias += 1
+            if diferencias <= 5:
+                print(f"DIFERENCIA: escalar={a} vectorizado={b}")
+
+    print(f"Filas: {len(filas)} ({empleados} empleados x {dias} días)")
+    print(f"Escalar:     {t_escalar * 1000:.1f} ms")
+    print(f"Vectorizado: {t_vector * 1000:.1f} ms")
+    print(f"Aceleración: x{t_escalar / t_vector:.1f}")
+    print(f"Diferencias: {diferencias}")
+    return 1 if diferencias else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
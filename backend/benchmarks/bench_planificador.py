@@ -0,0 +1,76 @@
+# /backend/benchmarks/bench_planificador.py
+"""
+Compara, para distintos rangos x dotaciones, la cantidad de peticiones a AttendanceBook
+del esquema anterior (lotes fijos de 40 RUTs sobre el rango completo, con pasada de
+recuperación de RUTs faltantes) contra el planificador de lotes.
+
+La columna "real" ejecuta el servicio de punta a punta contra el simulador local
+(en el mismo proceso, sin red) y verifica que lleguen todos los días de todos los RUTs.
+
+Uso: python -m backend.benchmarks.bench_planificador [rangos_en_dias] [dotaciones]
+     p. ej. python -m backend.benchmarks.bench_planificador 7,31,62,93 50,200,800
+"""
+import asyncio
+import math
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from ..services import geovictoria_service
+from ..services.geovictoria_planificador import planificar_lotes
+from .geovictoria_simulador import ConfigSimulador, crear_app, LIMITE_REGISTROS
+
+LOTE_FIJO_ANTERIOR = 40
+REINTENTOS_ANTERIOR = 3
+
+
+def peticiones_esquema_anterior(empleados: int, dias: int) -> int:
+    """Lotes fijos de 40 RUTs: si superan el tope se rechazan (3 intentos) y la recuperación repite todo."""
+    lotes = math.ceil(empleados / LOTE_FIJO_ANTERIOR)
+    rechazados = sum(
+        1 for i in range(lotes)
+        if min(LOTE_FIJO_ANTERIOR, empleados - i * LOTE_FIJO_ANTERIOR) * dias > LIMITE_REGISTROS
+    )
+    # Los rechazados agotan sus reintentos en la primera pasada y otra vez en la recuperación
+    return (lotes - rechazados) + rechazados * REINTENTOS_ANTERIOR * 2
+
+
+async def ejecutar_real(empleados: int, dias: int):
+    transporte = httpx.ASGITransport(app=crear_app(ConfigSimulador()))
+    geovictoria_service.cliente_gv._client = httpx.AsyncClient(transport=transporte, base_url="http://simulador")
+    geovictoria_service.GEOVICTORIA_USER = geovictoria_service.GEOVICTORIA_USER or "bench"
+    geovictoria_service.GEOVICTORIA_PASSWORD = geovictoria_service.GEOVICTORIA_PASSWORD or "bench"
+    geovictoria_service.estadisticas_planificador.update({"peticiones": 0, "lotes_fallidos": 0, "lotes_perdidos": 0})
+
+    ruts = [f"{20000000 + i}K" for i in range(empleados)]
+    inicio = datetime(2026, 1, 26)
+    fin = inicio + timedelta(days=dias - 1, hours=23, minutes=59)
+    t0 = time.perf_counter()
+    registros = await geovictoria_service._consultar_datos_completos_periodo(ruts, inicio, fin)
+    duracion = time.perf_counter() - t0
+    await geovictoria_service.cliente_gv.cerrar()
+
+    completos = len(registros) == empleados * dias
+    return geovictoria_service.estadisticas_planificador["peticiones"], geovictoria_service.estadisticas_planificador["lotes_fallidos"], completos, duracion
+
+
+async def main(rangos, dotaciones):
+    # El simulador expone sus rutas en /api/v1; el cliente usa las URLs configuradas
+    geovictoria_service.GEOVICTORIA_LOGIN_URL = "http://simulador/api/v1/Login"
+    geovictoria_service.GEOVICTORIA_ATTENDANCE_URL = "http://simulador/api/v1/AttendanceBook"
+
+    print(f"{'días':>5} {'RUTs':>6} | {'anterior':>9} | {'plan':>5} {'real':>5} {'fallidos':>8} {'completo':>8} {'seg':>6}")
+    for dias in rangos:
+        for empleados in dotaciones:
+            anterior = peticiones_esquema_anterior(empleados, dias)
+            plan = len(planificar_lotes([str(i) for i in range(empleados)], date(2026, 1, 26), date(2026, 1, 26) + timedelta(days=dias - 1)))
+            real, fallidos, completos, duracion = await ejecutar_real(empleados, dias)
+            print(f"{dias:>5} {empleados:>6} | {anterior:>9} | {plan:>5} {real:>5} {fallidos:>8} {'sí' if completos else 'NO':>8} {duracion:>6.2f}")
+
+
+if __name__ == "__main__":
+    rangos = [int(x) for x in (sys.argv[1] if len(sys.argv) > 1 else "7,31,62,93").split(",")]
+    dotaciones = [int(x) for x in (sys.argv[2] if len(sys.argv) > 2 else "50,200,800").split(",")]
+    asyncio.run(main(rangos, dotaciones))
@@ -0,0 +1,286 @@
+# /backend/benchmarks/geovictoria_simulador.py
+"""
+Servidor local que imita los contratos de GeoVictoria usados por geovictoria_service
+(Login, AttendanceBook y Consolidated), para probar y medir los flujos HHEE sin tocar la API real.
+
+Modos:
+  - sintético (por defecto): genera usuarios, turnos y marcas deterministas a partir del RUT pedido.
+  - grabar: reenvía cada petición a la API real y guarda la respuesta en un directorio.
+  - reproducir: responde con las respuestas guardadas (las que falten se generan sintéticas).
+
+Uso:
+  python -m backend.benchmarks.geovictoria_simulador --puerto 8099 --latencia-ms 150 --tasa-429 0.05
+  # y en el backend:
+  GEOVICTORIA_BASE_URL=http://127.0.0.1:8099/api/v1 GEOVICTORIA_USER=x GEOVICTORIA_PASSWORD=x uvicorn backend.main:app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+# GeoVictoria rechaza con 400 las consultas de más de 1500 registros (usuarios x días)
+LIMITE_REGISTROS = 1500
+API_REAL = "https://customerapi.geovictoria.com/api/v1"
+
+CAMPANAS = ["Soporte Técnico", "Ventas", "Cobranzas", "Retención", "Back Office"]
+NOMBRES = ["Ana", "Bruno", "Carla", "Diego", "Elena", "Franco", "Gabriela", "Héctor", "Inés", "Julián"]
+APELLIDOS = ["Pérez", "González", "Rodríguez", "López", "Martínez", "Sánchez", "Romero", "Díaz"]
+PERMISOS = ["Licencia Médica", "Vacaciones", "Permiso Administrativo"]
+
+
+@dataclass
+class ConfigSimulador:
+    latencia_ms: float = 0.0
+    jitter_ms: float = 0.0
+    tasa_429: float = 0.0
+    tasa_400: float = 0.0
+    retry_after_seg: int = 1
+    empleados: int = 200  # usuarios devueltos cuando la consulta no trae UserIds
+    token_ttl_seg: int = 1800
+    grabar: Optional[str] = None
+    reproducir: Optional[str] = None
+    semilla: int = 7
+
+
+def _hhmm(minutos: int) -> str:
+    minutos %= 1440
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def _token_jwt(ttl_seg: int) -> str:
+    """Token con forma de JWT (sin firma real) para ejercitar la lectura de 'exp' del cliente."""
+    def b64(datos: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip("=")
+    return f"{b64({'alg': 'none'})}.{b64({'exp': int(time.time()) + ttl_seg, 'jti': random.random()})}.sim"
+
+
+def _rnd_usuario(rut: str, semilla: int) -> random.Random:
+    return random.Random(int(hashlib.md5(f"{semilla}:{rut}".encode()).hexdigest()[:12], 16))
+
+
+def _datos_base_usuario(rut: str, semilla: int) -> Dict[str, Any]:
+    rnd = _rnd_usuario(rut, semilla)
+    return {
+        "Identifier": rut,
+        "Name": rnd.choice(NOMBRES),
+        "LastName": rnd.choice(APELLIDOS),
+        "GroupDescription": rnd.choice(CAMPANAS),
+        "_turno_inicio": rnd.choice([360, 480, 540, 840, 1320]),  # incluye turnos nocturnos
+        "_duracion": rnd.choice([480, 540, 600]),
+    }
+
+
+def _rango_dias(inicio: str, fin: str) -> List[datetime]:
+    desde = datetime.strptime(inicio[:8], "%Y%m%d")
+    hasta = datetime.strptime(fin[:8], "%Y%m%d")
+    return [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+
+
+def generar_usuario_asistencia(rut: str, dias: List[datetime], semilla: int) -> Dict[str, Any]:
+    base = _datos_base_usuario(rut, semilla)
+    turno_inicio, duracion = base.pop("_turno_inicio"), base.pop("_duracion")
+    intervalos = []
+    for dia in dias:
+        rnd = random.Random(f"{semilla}:{rut}:{dia:%Y%m%d}")
+        fecha = dia.strftime("%Y%m%d000000")
+        descanso = dia.weekday() >= 5
+        turno = [] if descanso else [{"StartTime": _hhmm(turno_inicio), "ExitTime": _hhmm(turno_inicio + duracion)}]
+
+        marcas = []
+        caso = rnd.random()
+        if caso > 0.05 and (not descanso or caso > 0.9):
+            entrada = turno_inicio + rnd.randint(-90, 20)
+            salida = turno_inicio + duracion + rnd.randint(-20, 120)
+            for minuto in (entrada, salida):
+                momento = dia + timedelta(minutes=minuto)
+                marcas.append({"Date": momento.strftime("%Y%m%d%H%M%S")})
+
+        intervalos.append({
+            "Date": fecha,
+            "Shifts": turno,
+            "Punches": marcas,
+            "TimeOffs": [{"TimeOffTypeDescription": rnd.choice(PERMISOS)}] if rnd.random() < 0.03 else [],
+            "AuthorizedOvertimeBefore": _hhmm(rnd.choice([0, 0, 0, 30, 60])),
+            "AuthorizedOvertimeAfter": _hhmm(rnd.choice([0, 0, 30, 60, 90])),
+        })
+    return {**base, "PlannedInterval": intervalos}
+
+
+def generar_usuario_consolidado(rut: str, dias: List[datetime], semilla: int) -> Dict[str, Any]:
+    base = _datos_base_usuario(rut, semilla)
+    base.pop("_turno_inicio"), base.pop("_duracion")
+    rnd = random.Random(f"{semilla}:{rut}:{dias[0]:%Y%m%d}:{dias[-1]:%Y%m%d}")
+    minutos = sum(rnd.choice([0, 0, 30, 60, 90]) for _ in dias)
+    return {**base, "TotalAuthorizedExtraTime": f"{minutos // 60:02d}:{minutos % 60:02d}"}
+
+
+def _ruts_de_payload(payload: Dict[str, Any], config: ConfigSimulador) -> List[str]:
+    ruts = [r.strip() for r in str(payload.get("UserIds") or "").split(",") if r.strip()]
+    if not ruts:
+        ruts = [f"{10000000 + i}K" for i in range(config.empleados)]
+    return ruts
+
+
+def _clave_grabacion(endpoint: str, payload: Dict[str, Any]) -> str:
+    normalizado = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return f"{endpoint}_{hashlib.sha1(normalizado.encode()).hexdigest()[:16]}.json"
+
+
+def crear_app(config: ConfigSimulador) -> FastAPI:
+    app = FastAPI(title="Simulador GeoVictoria")
+    tokens_validos = set()
+    estadisticas = {"peticiones": 0, "respuestas_429": 0, "respuestas_400": 0, "reproducidas": 0, "grabadas": 0}
+    cliente_real: Dict[str, httpx.AsyncClient] = {}
+
+    async def _latencia():
+        if config.latencia_ms or config.jitter_ms:
+            await asyncio.sleep(max(0.0, config.latencia_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000)
+
+    def _fallas_inyectadas() -> Optional[JSONResponse]:
+        sorteo = random.random()
+        if sorteo < config.tasa_429:
+            estadisticas["respuestas_429"] += 1
+            return JSONResponse({"Message": "Too Many Requests"}, status_code=429, headers={"Retry-After": str(config.retry_after_seg)})
+        if sorteo < config.tasa_429 + config.tasa_400:
+            estadisticas["respuestas_400"] += 1
+            return JSONResponse({"Message": "Simulated Bad Request"}, status_code=400)
+        return None
+
+    def _autorizado(request: Request) -> bool:
+        if config.grabar or config.reproducir:
+            return True
+        encabezado = request.headers.get("Authorization", "")
+        return encabezado.startswith("Bearer ") and encabezado[7:] in tokens_validos
+
+    async def _reenviar(endpoint: str, payload: Dict[str, Any], request: Request) -> JSONResponse:
+        """Modo grabar: consulta la API real y guarda la respuesta para reproducirla después."""
+        if "http" not in cliente_real:
+            cliente_real["http"] = httpx.AsyncClient(timeout=120.0)
+        headers = {k: v for k, v in request.headers.items() if k.lower() in ("authorization", "content-type", "accept")}
+        respuesta = await cliente_real["http"].post(f"{API_REAL}/{endpoint}", json=payload, headers=headers)
+        if respuesta.status_code == 200 and endpoint != "Login":
+            with open(os.path.join(config.grabar, _clave_grabacion(endpoint, payload)), "w", encoding="utf-8") as f:
+                f.write(respuesta.text)
+            estadisticas["grabadas"] += 1
+        return JSONResponse(respuesta.json(), status_code=respuesta.status_code)
+
+    def _reproducida(endpoint: str, payload: Dict[str, Any]) -> Optional[Any]:
+        ruta = os.path.join(config.reproducir, _clave_grabacion(endpoint, payload))
+        if not os.path.exists(ruta):
+            return None
+        estadisticas["reproducidas"] += 1
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+
+    async def _atender(endpoint: str, request: Request, generar) -> JSONResponse:
+        estadisticas["peticiones"] += 1
+        payload = await request.json()
+        await _latencia()
+        if config.grabar:
+            return await _reenviar(endpoint, payload, request)
+
+        falla = _fallas_inyectadas()
+        if falla is not None:
+            return falla
+        if not _autorizado(request):
+            return JSONResponse({"Message": "Unauthorized"}, status_code=401)
+
+        if config.reproducir:
+            guardada = _reproducida(endpoint, payload)
+            if guardada is not None:
+                return JSONResponse(guardada)
+
+        ruts = _ruts_de_payload(payload, config)
+        dias = _rango_dias(payload.get("StartDate", ""), payload.get("EndDate", ""))
+        if len(ruts) * len(dias) > LIMITE_REGISTROS:
+            estadisticas["respuestas_400"] += 1
+            return JSONResponse({"Message": f"La consulta supera el límite de {LIMITE_REGISTROS} registros."}, status_code=400)
+        return JSONResponse(generar(ruts, dias))
+
+    @app.post("/api/v1/Login")
+    async def login(request: Request):
+        estadisticas["peticiones"] += 1
+        if config.grabar:
+            return await _reenviar("Login", await request.json(), request)
+        await _latencia()
+        token = _token_jwt(config.token_ttl_seg)
+        tokens_validos.add(token)
+        return {"token": token}
+
+    @app.post("/api/v1/AttendanceBook")
+    async def attendance_book(request: Request):
+        return await _atender(
+            "AttendanceBook", request,
+            lambda ruts, dias: {"Users": [generar_usuario_asistencia(r, dias, config.semilla) for r in ruts]}
+        )
+
+    @app.post("/api/v1/Consolidated")
+    async def consolidated(request: Request):
+        return await _atender(
+            "Consolidated", request,
+            lambda ruts, dias: [generar_usuario_consolidado(r, dias, config.semilla) for r in ruts]
+        )
+
+    @app.get("/estadisticas")
+    async def ver_estadisticas():
+        return {**estadisticas, "tokens_emitidos": len(tokens_validos)}
+
+    @app.on_event("shutdown")
+    async def cerrar_cliente_real():
+        if "http" in cliente_real:
+            await cliente_real["http"].aclose()
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador local de la API de GeoVictoria")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8099)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429 (0 a 1)")
+    parser.add_argument("--tasa-400", type=float, default=0.0, help="Proporción de respuestas 400 (0 a 1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Segundos informados en Retry-After")
+    parser.add_argument("--empleados", type=int, default=200, help="Usuarios devueltos si la consulta no trae UserIds")
+    parser.add_argument("--token-ttl", type=int, default=1800, help="Vida del token emitido (segundos)")
+    parser.add_argument("--semilla", type=int, default=7)
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--grabar", metavar="DIR", help="Reenvía a la API real y guarda las respuestas en DIR")
+    grupo.add_argument("--reproducir", metavar="DIR", help="Responde con las respuestas guardadas en DIR")
+    args = parser.parse_args(argv)
+
+    for directorio in (args.grabar, args.reproducir):
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    config = ConfigSimulador(
+        latencia_ms=args.latencia_ms,
+        jitter_ms=args.jitter_ms,
+        tasa_429=args.tasa_429,
+        tasa_400=args.tasa_400,
+        retry_after_seg=args.retry_after,
+        empleados=args.empleados,
+        token_ttl_seg=args.token_ttl,
+        grabar=args.grabar,
+        reproducir=args.reproducir,
+        semilla=args.semilla,
+    )
+    uvicorn.run(crear_app(config), host=args.host, port=args.puerto, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,14 @@ from .sql_app.models import (
     HistorialEstadoTarea, Incidencia, ActualizacionIncidencia,
     ValidacionHHEE,
     SolicitudHHEE,
+    AsistenciaDiariaGV,
+    ConsolidadoGV,
+    SincronizacionGV,
+    ResumenHHEE,
+    PeriodoHHEE,
+    CierreHHEEResumen,
+    CierreHHEERRHH,
+    CierreHHEEDetalle,
     Entregable
 )
 # -------------------------------------------------------------
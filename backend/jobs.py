@@ -1,10 +1,14 @@
 import asyncio
+import time
 import pytz
 from datetime import datetime, timezone, timedelta
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from .database import AsyncSessionLocal
 from .sql_app import models
+from .services import asistencia_cache_service, hhee_periodos_service
+from .services.cache_respuestas import cache_respuestas
+from .utils import periodo_actual_hhee, rango_periodo_hhee
 
 async def poblado_diario_bolsa_reporteria():
     """Busca las plantillas activas y genera la bolsa para el día, filtrando por día de la semana."""
@@ -49,6 +53,68 @@ async def poblado_diario_bolsa_reporteria():
     except Exception as e:
         print(f"Error generando bolsa diaria: {e}")
 
+async def precalentar_hhee_geovictoria():
+    """
+    Deja en la caché local la asistencia de GeoVictoria del periodo HHEE abierto para todos los
+    analistas activos con RUT, y los totales consolidados que usa /hhee/metricas.
+    Usa la sincronización incremental: se pide el periodo abierto (RRHH todavía puede autorizar
+    horas de cualquiera de sus días) y los días marcados como sucios de periodos ya cerrados.
+    """
+    inicio_job = time.monotonic()
+    try:
+        periodo_actual = periodo_actual_hhee()
+        periodo_inicio, periodo_fin = rango_periodo_hhee(periodo_actual)
+        hoy = datetime.now(pytz.timezone("America/Argentina/Tucuman")).date()
+        hasta = min(periodo_fin, hoy)
+
+        async with AsyncSessionLocal() as db:
+            res_analistas = await db.execute(
+                select(models.Analista.rut_limpio).filter(
+                    models.Analista.esta_activo == True,
+                    models.Analista.rut_limpio.isnot(None),
+                    models.Analista.rut_limpio != ''
+                )
+            )
+            ruts_analistas = [r for r in res_analistas.scalars().all()]
+
+            # Métricas agrega por los RUTs con HHEE cargadas, que no siempre son analistas del portal
+            res_validaciones = await db.execute(
+                select(models.ValidacionHHEE.rut_limpio).distinct().filter(
+                    models.ValidacionHHEE.periodo_id == periodo_actual,
+                    models.ValidacionHHEE.rut_limpio.isnot(None)
+                )
+            )
+            ruts_validaciones = [r for r in res_validaciones.scalars().all()]
+
+            # El periodo en curso queda registrado en periodos_hhee
+            await hhee_periodos_service.asegurar_periodos(db, [periodo_actual])
+            await db.commit()
+
+        resumen_asistencia = await asistencia_cache_service.sincronizar_delta(ruts_analistas, periodo_inicio, hasta)
+        totales, _ = await asistencia_cache_service.obtener_consolidados(
+            ruts_analistas + ruts_validaciones, periodo_inicio, periodo_fin, forzar=True
+        )
+        # Totales RRHH nuevos: las métricas de HHEE cacheadas dejan de servirse
+        await cache_respuestas.invalidar(["consolidado"])
+
+        duracion = round(time.monotonic() - inicio_job, 2)
+        asistencia_cache_service.ultimo_precalentamiento.clear()
+        asistencia_cache_service.ultimo_precalentamiento.update({
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "periodo": f"{periodo_inicio} a {periodo_fin}",
+            "ruts": len(ruts_analistas),
+            **resumen_asistencia,
+            "consolidados": len(totales),
+            "duracion_seg": duracion,
+        })
+        print(
+            f"Precalentamiento HHEE GeoVictoria ({periodo_inicio} a {hasta}): {len(ruts_analistas)} RUTs, "
+            f"{resumen_asistencia['dias_consultados']} días consultados ({resumen_asistencia['dias_sucios']} sucios), "
+            f"{len(totales)} consolidados en {duracion}s."
+        )
+    except Exception as e:
+        print(f"Error en el precalentamiento HHEE de GeoVictoria tras {time.monotonic() - inicio_job:.2f}s: {e}")
+
 async def run_cron_jobs():
     """Bucle infinito que calcula el tiempo hasta la próxima medianoche y ejecuta las tareas."""
     tz_argentina = pytz.timezone("America/Argentina/Tucuman")
@@ -65,3 +131,4 @@ async def run_cron_jobs():
         
         # Al despertar (después de medianoche)
         await poblado_diario_bolsa_reporteria()
+        await precalentar_hhee_geovictoria()
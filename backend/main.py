@@ -30,10 +30,13 @@ from .routers import (
     analistas, campanas, bitacora, tareas, 
     incidencias, dashboard, sesiones, 
     hhee_router, wfm_router, entregables,
-    reporteria
+    reporteria, exportaciones
 )
 from .dependencies import get_current_analista, get_current_analista_full, require_role, get_current_analista_with_campaigns
 from .jobs import run_cron_jobs
+from .services import geovictoria_service
+from .services.exportacion_trabajos import gestor_exportaciones
+from .services.cache_respuestas import cache_respuestas
 import asyncio
 
 # --- 1. DEFINICIÓN DE LA FUNCIÓN LIFESPAN ---
@@ -45,10 +48,19 @@ async def lifespan(app: FastAPI):
     try:
         redis_connection = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
         await FastAPILimiter.init(redis_connection)
+        # La misma conexión respalda la caché de respuestas de los dashboards de HHEE
+        cache_respuestas.configurar_redis(redis_connection)
         print("Conectado a Redis y limitador inicializado.")
     except Exception as e:
         print(f"No se pudo conectar a Redis: {e}")
         
+    print("--- 1.2 Iniciando cliente compartido de GeoVictoria ---")
+    await geovictoria_service.cliente_gv.iniciar()
+
+    print("--- 1.3 Iniciando workers de exportación ---")
+    # Con Redis el registro de trabajos se comparte entre workers de gunicorn
+    await gestor_exportaciones.iniciar(redis_url)
+
     print("--- 1.5 Iniciando Cronjobs en segundo plano ---")
     tarea_cron = asyncio.create_task(run_cron_jobs())
     
@@ -56,6 +68,8 @@ async def lifespan(app: FastAPI):
     
     # --- Código que se ejecuta DESPUÉS de que la aplicación termine ---
     tarea_cron.cancel()
+    await gestor_exportaciones.detener()
+    await geovictoria_service.cliente_gv.cerrar()
     print("--- Aplicación finalizada. ---")
 
 # --- 2. CREACIÓN Y CONFIGURACIÓN DE LA APP (USANDO LA FUNCIÓN YA DEFINIDA) ---
@@ -106,6 +120,8 @@ app.include_router(entregables.router, prefix="/gtr", dependencies=gtr_wfm_restr
 app.include_router(reporteria.router, prefix="/api", dependencies=gtr_wfm_restriction) # Se usará /api/reporteria en frontend
 app.include_router(hhee_router.router, prefix="/hhee")
 app.include_router(wfm_router.router, dependencies=gtr_wfm_restriction)
+# Sin restricción de rol: cada trabajo solo lo ve quien lo pidió (GTR o HHEE)
+app.include_router(exportaciones.router)
 
 
 @app.get("/health", status_code=status.HTTP_200_OK)
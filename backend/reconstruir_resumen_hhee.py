@@ -0,0 +1,35 @@
+# backend/reconstruir_resumen_hhee.py
+"""
+Recalcula desde cero el resumen de HHEE (tabla resumen_hhee) de uno o más periodos
+y verifica que coincida con validaciones_hhee.
+
+Uso: python -m backend.reconstruir_resumen_hhee [periodo ...]
+     p. ej. python -m backend.reconstruir_resumen_hhee 202601 202602
+     Sin argumentos reconstruye el periodo actual.
+Termina con código 1 si después de reconstruir quedan diferencias.
+"""
+import asyncio
+import sys
+
+from .database import AsyncSessionLocal
+from .services import hhee_resumen_service
+from .utils import get_current_hhee_period, periodo_hhee
+
+
+async def main(periodos):
+    con_diferencias = False
+    async with AsyncSessionLocal() as db:
+        for periodo in periodos:
+            resultado = await hhee_resumen_service.reconstruir_periodo(db, periodo)
+            print(f"Periodo {periodo}: {resultado['filas']} filas, "
+                  f"{resultado['diferencias_previas']} diferencias antes de reconstruir, "
+                  f"{len(resultado['diferencias'])} después.")
+            for diferencia in resultado["diferencias"][:20]:
+                print(f"  {diferencia}")
+            con_diferencias = con_diferencias or bool(resultado["diferencias"])
+    return con_diferencias
+
+
+if __name__ == "__main__":
+    periodos = [int(p) for p in sys.argv[1:]] or [periodo_hhee(get_current_hhee_period()[1])]
+    sys.exit(1 if asyncio.run(main(periodos)) else 0)
@@ -13,6 +13,9 @@ from ..database import get_db
 from ..sql_app import models
 from ..enums import UserRole
 from ..dependencies import get_current_analista, require_role
+from ..services import reportes_exportacion
+from ..services.exportacion_service import FormatoArchivo
+from ..services.exportacion_trabajos import gestor_exportaciones, ColaExportacionLlenaError
 from ..schemas.models import (
     BitacoraEntry, BitacoraEntryCreate, BitacoraEntryUpdate,
     ComentarioGeneralBitacora, ComentarioGeneralBitacoraCreate, BitacoraExportFilters, Lob
@@ -298,22 +301,7 @@ async def exportar_bitacora(
     db: AsyncSession = Depends(get_db),
     current_analista: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.ANALISTA]))
 ):
-    query = select(models.BitacoraEntry).options(
-        selectinload(models.BitacoraEntry.campana),
-        selectinload(models.BitacoraEntry.autor),
-        selectinload(models.BitacoraEntry.lob)
-    ).order_by(models.BitacoraEntry.fecha.desc(), models.BitacoraEntry.hora.desc())
-
-    if filtros.fecha_inicio:
-        query = query.filter(models.BitacoraEntry.fecha >= filtros.fecha_inicio)
-    if filtros.fecha_fin:
-        query = query.filter(models.BitacoraEntry.fecha <= filtros.fecha_fin)
-    if filtros.campana_id:
-        query = query.filter(models.BitacoraEntry.campana_id == filtros.campana_id)
-    if filtros.autor_id:
-        query = query.filter(models.BitacoraEntry.autor_id == filtros.autor_id)
-    if filtros.lob_id:
-        query = query.filter(models.BitacoraEntry.lob_id == filtros.lob_id)
+    query = reportes_exportacion.consulta_bitacora(filtros)
             
     result = await db.execute(query)
     entradas = result.scalars().all()
@@ -321,15 +309,7 @@ async def exportar_bitacora(
     if not entradas:
         raise HTTPException(status_code=404, detail="No se encontraron eventos con los filtros seleccionados.")
 
-    datos_para_excel = [{
-        "ID": entry.id,
-        "Fecha": entry.fecha.strftime("%d-%m-%Y"),
-        "Hora": entry.hora.strftime("%H:%M"),
-        "Campaña": entry.campana.nombre if entry.campana else "N/A",
-        "LOB": entry.lob.nombre if entry.lob else "N/A",
-        "Autor": f"{entry.autor.nombre} {entry.autor.apellido}" if entry.autor else "N/A",
-        "Comentario": entry.comentario
-    } for entry in entradas]
+    datos_para_excel = [reportes_exportacion.fila_bitacora(entry) for entry in entradas]
     
     df = pd.DataFrame(datos_para_excel)
     
@@ -340,3 +320,21 @@ async def exportar_bitacora(
     
     headers = {'Content-Disposition': f'attachment; filename="Reporte_Eventos_{date.today().isoformat()}.xlsx"'}
     return StreamingResponse(output, headers=headers, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+@router.post("/bitacora/exportar/trabajos/", status_code=status.HTTP_202_ACCEPTED, summary="Encola la exportación de bitácora y devuelve el id del trabajo")
+async def encolar_exportacion_bitacora(
+    filtros: BitacoraExportFilters,
+    current_analista: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.ANALISTA]))
+):
+    try:
+        trabajo = await gestor_exportaciones.encolar(
+            "bitacora", filtros.model_dump(mode="json"), None, current_analista.id,
+            FormatoArchivo.XLSX, f"Reporte_Eventos_{date.today().isoformat()}",
+            lambda t: reportes_exportacion.producir_bitacora(t, filtros)
+        )
+    except ColaExportacionLlenaError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return trabajo.a_dict()
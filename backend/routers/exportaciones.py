@@ -0,0 +1,49 @@
+# /backend/routers/exportaciones.py
+import os
+
+from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.responses import FileResponse
+
+from ..dependencies import get_current_analista, require_role
+from ..enums import UserRole
+from ..sql_app import models
+from ..services.exportacion_service import MEDIA_TYPES
+from ..services.exportacion_trabajos import gestor_exportaciones, COMPLETADO
+
+router = APIRouter(
+    tags=["Exportaciones"]
+)
+
+
+@router.get("/exportaciones/estadisticas", summary="Estado de la cola de trabajos de exportación")
+async def estadisticas_exportaciones(
+    current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE]))
+):
+    return gestor_exportaciones.estado()
+
+
+@router.get("/exportaciones/{trabajo_id}", summary="Consulta el avance de un trabajo de exportación")
+async def consultar_trabajo_exportacion(
+    trabajo_id: str,
+    current_user: models.Analista = Depends(get_current_analista)
+):
+    trabajo = await gestor_exportaciones.obtener(trabajo_id, current_user.id)
+    if not trabajo:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo de exportación no encontrado o expirado.")
+    return trabajo.a_dict()
+
+
+@router.get("/exportaciones/{trabajo_id}/descargar", summary="Descarga el archivo de un trabajo de exportación terminado")
+async def descargar_trabajo_exportacion(
+    trabajo_id: str,
+    current_user: models.Analista = Depends(get_current_analista)
+):
+    trabajo = await gestor_exportaciones.obtener(trabajo_id, current_user.id)
+    if not trabajo or trabajo.expirado:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo de exportación no encontrado o expirado.")
+    if trabajo.estado != COMPLETADO:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=trabajo.error or "La exportación todavía no está lista.")
+    if not trabajo.ruta or not os.path.exists(trabajo.ruta):
+        # El archivo se generó en otra instancia (el directorio solo se comparte entre sus workers)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="El archivo ya no está disponible; vuelve a generar la exportación.")
+    return FileResponse(trabajo.ruta, media_type=MEDIA_TYPES[trabajo.formato], filename=trabajo.nombre_archivo)
@@ -1,13 +1,23 @@
 # /backend/routers/hhee_router.py
 
 import asyncio
+import base64
+import json
 from fastapi import APIRouter, HTTPException, Depends, status, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, update, or_
+from sqlalchemy import func, update, delete, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
-from ..services import geovictoria_service
+from ..services import geovictoria_service, asistencia_cache_service, hhee_calculo, hhee_exportacion, exportacion_service, hhee_resumen_service, hhee_solicitudes_service, hhee_periodos_service, hhee_cierre_service
+from ..services.hhee_cierre_service import CierrePeriodoError
+from ..services.exportacion_service import FormatoArchivo
+from ..services.exportacion_trabajos import gestor_exportaciones, ColaExportacionLlenaError
+from ..services.cache_respuestas import cache_respuestas, etiquetas_rango, etiquetas_fechas
+from ..services.geovictoria_limitador import limitador_gv
+from ..services.geovictoria_coalescencia import coalescedor_gv
+from ..services.geovictoria_circuito import circuito_gv
 from datetime import datetime, date
 from typing import List, Optional
 
@@ -17,16 +27,14 @@ from ..sql_app import models
 from pydantic import BaseModel
 
 from ..dependencies import require_role
-from ..enums import UserRole, TipoSolicitudHHEE, EstadoSolicitudHHEE
+from ..enums import UserRole, EstadoSolicitudHHEE
 from enum import Enum
 
 from ..schemas.models import DashboardHHEEMetricas, MetricasPorEmpleado, MetricasPorCampana, MetricasPendientesHHEE, SolicitudHHEECreate, SolicitudHHEE, SolicitudHHEEDecision, SolicitudHHEELote
 
-from ..utils import decimal_to_hhmm, formatear_rut, get_current_hhee_period
+from ..utils import decimal_to_hhmm, formatear_rut, limpiar_rut, get_current_hhee_period, periodos_completos_en_rango, periodo_hhee
 
 import bleach
-import pandas as pd
-import io
 
 
 # --- MODELOS PARA LA EXPORTACIÓN ---
@@ -38,12 +46,18 @@ class ExportRequest(BaseModel):
     fecha_inicio: date
     fecha_fin: date
     formato: ExportFormat
+    archivo: FormatoArchivo = FormatoArchivo.XLSX
 
 
 class ConsultaHHEE(BaseModel):
     rut: str
     fecha_inicio: date
     fecha_fin: date
+
+class ConsultaHHEEMultiple(BaseModel):
+    ruts: List[str]
+    fecha_inicio: date
+    fecha_fin: date
     
 class ValidacionDia(BaseModel):
     # Datos que necesitamos para identificar el día
@@ -78,109 +92,246 @@ router = APIRouter(
     tags=["Portal HHEE"]
 )
 
+# Tamaño de lote para las lecturas y escrituras masivas de /cargar-hhee
+LOTE_VALIDACIONES = 1000
+# Columnas que reescribe el upsert cuando ya existe la fila (RUT, fecha, tipo)
+COLUMNAS_UPSERT_VALIDACION = ("rut", "nombre_apellido", "campaña", "estado", "cantidad_hhee_aprobadas", "notas", "supervisor_carga")
+# RUTs por consulta a GeoVictoria al transmitir el enriquecimiento de /pendientes
+LOTE_RUTS_PENDIENTES = 25
+# RUTs por consulta a GeoVictoria y máximo por pedido en /consultar-empleados
+LOTE_RUTS_CONSULTA = 20
+MAX_RUTS_CONSULTA = 300
+
+async def _guardar_validaciones(db: AsyncSession, filas: List[dict], reemplazar_validadas: bool = True):
+    """
+    INSERT ... ON CONFLICT por lotes: una fila por (RUT, fecha, tipo), la última escritura gana.
+    Una fila ya reportada a RRHH nunca se reescribe (sus horas ya se enviaron); con
+    reemplazar_validadas=False tampoco una ya validada.
+    """
+    v = models.ValidacionHHEE
+    condicion = v.reportado_a_rrhh == False
+    if not reemplazar_validadas:
+        condicion = condicion & (v.estado != 'Validado')
+    for i in range(0, len(filas), LOTE_VALIDACIONES):
+        stmt = pg_insert(v).values(filas[i:i + LOTE_VALIDACIONES])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_validacion_hhee_rut_fecha_tipo",
+            set_={col: stmt.excluded[col] for col in COLUMNAS_UPSERT_VALIDACION},
+            where=condicion
+        )
+        await db.execute(stmt)
+
+
+def _agrupar_guardados(validaciones_guardadas) -> dict:
+    """Validaciones guardadas agrupadas por (rut_limpio, fecha 'YYYY-MM-DD')."""
+    datos_guardados = {}
+    for v in validaciones_guardadas:
+        datos_guardados.setdefault((v.rut_limpio, v.fecha_hhee.strftime('%Y-%m-%d')), []).append(v)
+    return datos_guardados
+
+
+def _combinar_con_guardados(datos_dia_completo: dict, registros_del_dia: list) -> dict:
+    """Completa un día ya enriquecido con el estado y las horas guardadas en la BD."""
+    # Inicializamos los campos que vendrán de la BD
+    datos_dia_completo['estado_final'] = 'No Guardado'
+    datos_dia_completo['notas'] = ''
+    datos_dia_completo['hhee_aprobadas_inicio'] = 0
+    datos_dia_completo['hhee_aprobadas_fin'] = 0
+    datos_dia_completo['hhee_aprobadas_descanso'] = 0
+
+    if registros_del_dia:
+        # Si hay CUALQUIER registro pendiente para el día, el estado general es pendiente
+        registro_pendiente = next((r for r in registros_del_dia if r.estado == 'Pendiente por Corrección'), None)
+        if registro_pendiente:
+            datos_dia_completo['estado_final'] = 'Pendiente por Corrección'
+            datos_dia_completo['notas'] = registro_pendiente.notas
+        else:
+            # Si no hay pendientes, es Validado y sumamos las horas aprobadas
+            datos_dia_completo['estado_final'] = 'Validado'
+            for registro in registros_del_dia:
+                if registro.tipo_hhee == 'Antes de Turno':
+                    datos_dia_completo['hhee_aprobadas_inicio'] = registro.cantidad_hhee_aprobadas
+                elif registro.tipo_hhee == 'Después de Turno':
+                    datos_dia_completo['hhee_aprobadas_fin'] = registro.cantidad_hhee_aprobadas
+                elif registro.tipo_hhee == 'Día de Descanso':
+                    datos_dia_completo['hhee_aprobadas_descanso'] = registro.cantidad_hhee_aprobadas
+
+    return datos_dia_completo
+
+
 @router.post("/consultar-empleado")
 async def consultar_empleado(
     consulta: ConsultaHHEE,
     db: AsyncSession = Depends(get_db),
     current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
 ):
-    token = await geovictoria_service.obtener_token_geovictoria()
-    if not token:
+    gv_disponible = await geovictoria_service.puede_consultar_asistencia()
+    if not gv_disponible:
         raise HTTPException(status_code=503, detail="No se pudo comunicar con el servicio externo (GeoVictoria).")
 
-    rut_limpio_api = consulta.rut.replace('-', '').replace('.', '').upper()
+    rut_limpio_api = limpiar_rut(consulta.rut)
     fecha_inicio_dt = datetime.combine(consulta.fecha_inicio, datetime.min.time())
     fecha_fin_dt = datetime.combine(consulta.fecha_fin, datetime.max.time())
 
-    datos_gv = await geovictoria_service.obtener_datos_completos_periodo(
-        token, [rut_limpio_api], fecha_inicio_dt, fecha_fin_dt
+    datos_gv = await asistencia_cache_service.obtener_datos_periodo(
+        [rut_limpio_api], fecha_inicio_dt, fecha_fin_dt
     )
 
     if not datos_gv:
         raise HTTPException(status_code=404, detail="No se encontraron datos en GeoVictoria para el RUT y período seleccionados.")
 
     query_guardados = select(models.ValidacionHHEE).filter(
-        models.ValidacionHHEE.rut == consulta.rut,
+        models.ValidacionHHEE.rut_limpio == rut_limpio_api,
         models.ValidacionHHEE.fecha_hhee.between(consulta.fecha_inicio, consulta.fecha_fin)
     )
     result_guardados = await db.execute(query_guardados)
-    validaciones_guardadas = result_guardados.scalars().all()
+    datos_guardados = _agrupar_guardados(result_guardados.scalars().all())
 
-    datos_guardados_por_fecha = {}
-    for v in validaciones_guardadas:
-        fecha_str = v.fecha_hhee.strftime('%Y-%m-%d')
-        if fecha_str not in datos_guardados_por_fecha:
-            datos_guardados_por_fecha[fecha_str] = []
-        datos_guardados_por_fecha[fecha_str].append(v)
-
-    resultados_finales = []
-    for datos_dia_gv in datos_gv:
-        logica_negocio = geovictoria_service.aplicar_logica_de_negocio(datos_dia_gv)
-        datos_dia_completo = {**datos_dia_gv, **logica_negocio}
-        fecha = datos_dia_completo['fecha']
-
-        registros_del_dia = datos_guardados_por_fecha.get(fecha, [])
-
-        # Inicializamos los campos que vendrán de la BD
-        datos_dia_completo['estado_final'] = 'No Guardado'
-        datos_dia_completo['notas'] = ''
-        datos_dia_completo['hhee_aprobadas_inicio'] = 0
-        datos_dia_completo['hhee_aprobadas_fin'] = 0
-        datos_dia_completo['hhee_aprobadas_descanso'] = 0
-
-        if registros_del_dia:
-            # Si hay CUALQUIER registro pendiente para el día, el estado general es pendiente
-            registro_pendiente = next((r for r in registros_del_dia if r.estado == 'Pendiente por Corrección'), None)
-            if registro_pendiente:
-                datos_dia_completo['estado_final'] = 'Pendiente por Corrección'
-                datos_dia_completo['notas'] = registro_pendiente.notas
-            else:
-                # Si no hay pendientes, es Validado y sumamos las horas aprobadas
-                datos_dia_completo['estado_final'] = 'Validado'
-                for registro in registros_del_dia:
-                    if registro.tipo_hhee == 'Antes de Turno':
-                        datos_dia_completo['hhee_aprobadas_inicio'] = registro.cantidad_hhee_aprobadas
-                    elif registro.tipo_hhee == 'Después de Turno':
-                        datos_dia_completo['hhee_aprobadas_fin'] = registro.cantidad_hhee_aprobadas
-                    elif registro.tipo_hhee == 'Día de Descanso':
-                        datos_dia_completo['hhee_aprobadas_descanso'] = registro.cantidad_hhee_aprobadas
-
-        resultados_finales.append(datos_dia_completo)
+    resultados_finales = [
+        _combinar_con_guardados(dia, datos_guardados.get((rut_limpio_api, dia['fecha']), []))
+        for dia in hhee_calculo.enriquecer_con_logica(datos_gv)
+    ]
 
     nombre_agente = resultados_finales[0].get('nombre_apellido', 'No encontrado')
 
     return {"datos_periodo": resultados_finales, "nombre_agente": nombre_agente}
-    
+
+
+async def _transmitir_consulta_empleados(ruts_limpios: List[str], fecha_inicio: date, fecha_fin: date, datos_guardados: dict):
+    """
+    NDJSON con una línea por empleado, emitida en cuanto termina el grupo de RUTs que lo
+    contiene. Los grupos van en paralelo por el pipeline compartido de GeoVictoria
+    (caché, coalescencia y limitador), así la primera fila no espera al equipo completo.
+    """
+    fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
+    fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
+
+    async def consultar_grupo(grupo):
+        try:
+            return grupo, await asistencia_cache_service.obtener_datos_periodo(grupo, fecha_inicio_dt, fecha_fin_dt), None
+        except Exception as e:
+            print(f"ADVERTENCIA: Falló la consulta a GV de {len(grupo)} RUTs: {e}")
+            return grupo, [], "No se pudo consultar GeoVictoria para este empleado."
+
+    grupos = [ruts_limpios[i:i + LOTE_RUTS_CONSULTA] for i in range(0, len(ruts_limpios), LOTE_RUTS_CONSULTA)]
+    con_datos = 0
+    for tarea in asyncio.as_completed([consultar_grupo(g) for g in grupos]):
+        grupo, datos_gv, error = await tarea
+
+        dias_por_rut = {}
+        for dia in hhee_calculo.enriquecer_con_logica(datos_gv):
+            dias_por_rut.setdefault(dia.get('rut_limpio'), []).append(dia)
+
+        for rut_limpio in grupo:
+            dias = dias_por_rut.get(rut_limpio)
+            if not dias:
+                yield json.dumps({
+                    "tipo": "error",
+                    "rut": rut_limpio,
+                    "detail": error or "No se encontraron datos en GeoVictoria para el RUT y período seleccionados."
+                }) + "\n"
+                continue
+
+            con_datos += 1
+            yield json.dumps({
+                "tipo": "empleado",
+                "rut": rut_limpio,
+                "nombre_agente": dias[0].get('nombre_apellido', 'No encontrado'),
+                "datos_periodo": [
+                    _combinar_con_guardados(dia, datos_guardados.get((rut_limpio, dia['fecha']), [])) for dia in dias
+                ]
+            }, default=str) + "\n"
+
+    yield json.dumps({"tipo": "fin", "empleados": len(ruts_limpios), "con_datos": con_datos}) + "\n"
+
+
+@router.post("/consultar-empleados", summary="Consulta HHEE de varios RUTs y transmite un resultado por empleado (NDJSON)")
+async def consultar_empleados(
+    consulta: ConsultaHHEEMultiple,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
+):
+    """
+    Versión de /consultar-empleado para un equipo completo. Responde application/x-ndjson:
+    una línea "empleado" (mismo formato que /consultar-empleado, más el RUT) o "error" por
+    cada RUT, en el orden en que responde GeoVictoria, y una línea final "fin".
+    """
+    ruts_limpios = list(dict.fromkeys(r for r in (limpiar_rut(rut) for rut in consulta.ruts) if r))
+    if not ruts_limpios:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Debe indicar al menos un RUT.")
+    if len(ruts_limpios) > MAX_RUTS_CONSULTA:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Se pueden consultar hasta {MAX_RUTS_CONSULTA} RUTs por vez.")
+
+    gv_disponible = await geovictoria_service.puede_consultar_asistencia()
+    if not gv_disponible:
+        raise HTTPException(status_code=503, detail="No se pudo comunicar con el servicio externo (GeoVictoria).")
+
+    # Estado guardado de todo el equipo en una sola consulta, antes de empezar a transmitir
+    query_guardados = select(models.ValidacionHHEE).filter(
+        models.ValidacionHHEE.rut_limpio.in_(ruts_limpios),
+        models.ValidacionHHEE.fecha_hhee.between(consulta.fecha_inicio, consulta.fecha_fin)
+    )
+    result_guardados = await db.execute(query_guardados)
+    datos_guardados = _agrupar_guardados(result_guardados.scalars().all())
+
+    return StreamingResponse(
+        _transmitir_consulta_empleados(ruts_limpios, consulta.fecha_inicio, consulta.fecha_fin, datos_guardados),
+        media_type="application/x-ndjson"
+    )
+
+async def _rechazar_periodos_cerrados(db: AsyncSession, fechas):
+    """
+    409 si alguna fecha cae en un periodo cerrado: sus números ya están congelados.
+    Los periodos quedan tomados FOR SHARE hasta que la escritura confirme, así un cierre
+    no puede colarse entre esta verificación y el commit.
+    """
+    cerrados = await hhee_periodos_service.bloquear_periodos(db, {periodo_hhee(f) for f in fechas})
+    if cerrados:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"El periodo {', '.join(str(p) for p in sorted(cerrados))} está cerrado y no admite cambios."
+        )
+
 @router.post("/cargar-hhee", summary="Guarda o actualiza las validaciones de HHEE")
 async def cargar_horas_extras(
     request_body: CargarHHEERequest,
     db: AsyncSession = Depends(get_db),
     current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
 ):
-    resumen_operaciones = []
+    await _rechazar_periodos_cerrados(db, [v.fecha for v in request_body.validaciones])
 
-    # Optimización: Obtener todos los registros existentes en un solo query (Batch)
-    ruts_lote = {formatear_rut(v.rut_con_formato) for v in request_body.validaciones}
-    fechas_lote = {v.fecha for v in request_body.validaciones}
-
-    query_batch = select(models.ValidacionHHEE).filter(
-        models.ValidacionHHEE.rut.in_(list(ruts_lote)),
-        models.ValidacionHHEE.fecha_hhee.in_(list(fechas_lote))
-    )
-    result_batch = await db.execute(query_batch)
-    todos_los_registros = result_batch.scalars().all()
+    resumen_operaciones = []
+    # Días que quedan pendientes por corrección de marcas: su asistencia en caché deja de ser confiable
+    dias_sucios = []
 
-    # Mapa para búsqueda rápida: {(rut, fecha): [registros]}
+    # 1. Lectura: solo los pares (RUT, fecha) exactos del lote, no el producto RUTs x fechas
+    pares_lote = list({(limpiar_rut(v.rut_con_formato), v.fecha) for v in request_body.validaciones})
     mapa_registros = {}
-    for reg in todos_los_registros:
-        key = (reg.rut, reg.fecha_hhee)
-        if key not in mapa_registros:
-            mapa_registros[key] = []
-        mapa_registros[key].append(reg)
+    for i in range(0, len(pares_lote), LOTE_VALIDACIONES):
+        query_batch = select(models.ValidacionHHEE).filter(
+            tuple_(models.ValidacionHHEE.rut_limpio, models.ValidacionHHEE.fecha_hhee).in_(pares_lote[i:i + LOTE_VALIDACIONES])
+        )
+        result_batch = await db.execute(query_batch)
+        for reg in result_batch.scalars().all():
+            mapa_registros.setdefault((reg.rut_limpio, reg.fecha_hhee), []).append(reg)
+
+    # 2. Decisión en memoria: filas a borrar (por id), pendientes que se actualizan en su lugar
+    #    (conservan id y autor) y filas a escribir, una por (RUT, fecha, tipo)
+    ids_a_eliminar = set()
+    notas_pendientes = []
+    pendientes_revalidados = []
+    filas_a_guardar = {}
+
+    def guardar_fila(rut, nombre_apellido, campaña, fecha, tipo, estado, aprobadas, notas, supervisor):
+        filas_a_guardar[(limpiar_rut(rut), fecha, tipo)] = {
+            "rut": rut, "nombre_apellido": nombre_apellido, "campaña": campaña, "fecha_hhee": fecha,
+            "tipo_hhee": tipo, "estado": estado, "cantidad_hhee_aprobadas": aprobadas, "notas": notas,
+            "supervisor_carga": supervisor
+        }
 
     for validacion in request_body.validaciones:
         rut_formateado = formatear_rut(validacion.rut_con_formato)
-        registros_del_dia = mapa_registros.get((rut_formateado, validacion.fecha), [])
+        registros_del_dia = mapa_registros.get((limpiar_rut(rut_formateado), validacion.fecha), [])
 
         registros_validados = {r.tipo_hhee: r for r in registros_del_dia if r.estado == 'Validado'}
         pendiente_record = next((r for r in registros_del_dia if r.estado == 'Pendiente por Corrección'), None)
@@ -192,8 +343,7 @@ async def cargar_horas_extras(
             validacion.hhee_aprobadas_descanso
         )
         if pendiente_record and not validacion.turno_es_incorrecto and total_horas_enviadas == 0:
-            await db.delete(pendiente_record)
-            # 2. CAMBIO: Usamos la nueva estructura de objeto
+            ids_a_eliminar.add(pendiente_record.id)
             resumen_operaciones.append({
                 "fecha": validacion.fecha.isoformat(),
                 "rut": validacion.rut_con_formato,
@@ -202,27 +352,24 @@ async def cargar_horas_extras(
             continue
 
         if validacion.turno_es_incorrecto:
+            dias_sucios.append((rut_formateado, validacion.fecha))
             if pendiente_record:
                 if pendiente_record.notas != validacion.nota:
-                    pendiente_record.notas = bleach.clean(validacion.nota) if validacion.nota else None
+                    notas_pendientes.append({
+                        "id": pendiente_record.id,
+                        "notas": bleach.clean(validacion.nota) if validacion.nota else None
+                    })
                     resumen_operaciones.append({"fecha": validacion.fecha.isoformat(), "rut": validacion.rut_con_formato, "accion": "Nota de pendiente actualizada."})
             else:
-                for reg in registros_validados.values():
-                    await db.delete(reg)
-
-                db.add(models.ValidacionHHEE(
-                    rut=rut_formateado, nombre_apellido=validacion.nombre_apellido, campaña=validacion.campaña,
-                    fecha_hhee=validacion.fecha, estado="Pendiente por Corrección", notas=validacion.nota,
-                    supervisor_carga=current_user.email, tipo_hhee="General"
-                ))
+                ids_a_eliminar.update(reg.id for reg in registros_validados.values())
+                guardar_fila(
+                    rut_formateado, validacion.nombre_apellido, validacion.campaña, validacion.fecha,
+                    "General", "Pendiente por Corrección", 0.0,
+                    bleach.clean(validacion.nota) if validacion.nota else None, current_user.email
+                )
                 resumen_operaciones.append({"fecha": validacion.fecha.isoformat(), "rut": validacion.rut_con_formato, "accion": f"Marcado como 'Pendiente': {validacion.nota}"})
             continue
 
-        base_datos_bd = {
-            "rut": rut_formateado, "nombre_apellido": validacion.nombre_apellido, "campaña": validacion.campaña,
-            "fecha_hhee": validacion.fecha, "supervisor_carga": current_user.email, "estado": "Validado"
-        }
-
         hhee_a_procesar = {
             "Antes de Turno": validacion.hhee_aprobadas_inicio,
             "Después de Turno": validacion.hhee_aprobadas_fin,
@@ -238,261 +385,316 @@ async def cargar_horas_extras(
                 continue
 
             if aprobadas > 0:
-                if pendiente_record and not pendiente_actualizado_en_este_ciclo:
-                    pendiente_record.estado = "Validado"
-                    pendiente_record.tipo_hhee = tipo
-                    pendiente_record.cantidad_hhee_aprobadas = aprobadas
-                    pendiente_record.notas = None
+                # El pendiente pasa a ser la fila validada del primer tipo con horas, en su lugar
+                # (si ya hay una fila validada de ese tipo, esa es la que se actualiza)
+                if pendiente_record and not pendiente_actualizado_en_este_ciclo and not registro_existente:
+                    pendientes_revalidados.append({
+                        "id": pendiente_record.id, "estado": "Validado", "tipo_hhee": tipo,
+                        "cantidad_hhee_aprobadas": aprobadas, "notas": None
+                    })
                     resumen_operaciones.append({
                         "fecha": validacion.fecha.isoformat(),
                         "rut": validacion.rut_con_formato,
-                        # --- CAMBIO AQUÍ ---
                         "accion": f"Re-validado desde pendiente ({tipo}): {decimal_to_hhmm(aprobadas)} hs."
                     })
                     pendiente_actualizado_en_este_ciclo = True
                 else:
-                    nueva_validacion = models.ValidacionHHEE(**base_datos_bd, tipo_hhee=tipo, cantidad_hhee_aprobadas=aprobadas)
-                    db.add(nueva_validacion)
+                    guardar_fila(
+                        rut_formateado, validacion.nombre_apellido, validacion.campaña, validacion.fecha,
+                        tipo, "Validado", aprobadas, None, current_user.email
+                    )
                     resumen_operaciones.append({
                         "fecha": validacion.fecha.isoformat(),
                         "rut": validacion.rut_con_formato,
-                        # --- Y CAMBIO AQUÍ ---
                         "accion": f"Nuevo registro ({tipo}): {decimal_to_hhmm(aprobadas)} hs."
                     })
 
+    # 3. Escritura por conjuntos en una sola transacción: un DELETE, UPDATE por id de los
+    #    pendientes (executemany) y un INSERT ... ON CONFLICT por lote
+    filas = list(filas_a_guardar.values())
     try:
+        if ids_a_eliminar:
+            await db.execute(delete(models.ValidacionHHEE).where(models.ValidacionHHEE.id.in_(list(ids_a_eliminar))))
+        for actualizaciones in (notas_pendientes, pendientes_revalidados):
+            if actualizaciones:
+                await db.execute(update(models.ValidacionHHEE), actualizaciones)
+        await _guardar_validaciones(db, filas)
+        await hhee_resumen_service.actualizar_resumen(db, pares_lote)
         await db.commit()
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al guardar en la base de datos: {e}")
 
-    # 3. CAMBIO: Devolvemos un objeto con el resumen detallado
+    await cache_respuestas.invalidar(etiquetas_fechas("validaciones", (fecha for _, fecha in pares_lote)))
+
+    try:
+        await asistencia_cache_service.marcar_dias_sucios(dias_sucios)
+    except Exception as e:
+        print(f"ADVERTENCIA: No se pudieron marcar los días a resincronizar con GeoVictoria: {e}")
+
     return {
         "mensaje": "Proceso finalizado con éxito.",
         "resumen_detallado": resumen_operaciones
     }
 
-@router.get("/pendientes", summary="Consulta registros pendientes de HHEE (con filtro opcional de fecha)")
+def _codificar_cursor_pendiente(p) -> str:
+    clave = [p.nombre_apellido or "", p.fecha_hhee.isoformat(), p.id]
+    return base64.urlsafe_b64encode(json.dumps(clave).encode()).decode()
+
+
+def _decodificar_cursor_pendiente(cursor: str):
+    try:
+        nombre, fecha_str, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return nombre, date.fromisoformat(fecha_str), int(id_)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación inválido.")
+
+
+async def _datos_gv_pendientes(pendientes, inicio: date, fin: date) -> dict:
+    """Datos de GeoVictoria, con la lógica de negocio aplicada, de los días pendientes recibidos."""
+    if not await geovictoria_service.puede_consultar_asistencia():
+        return {}
+    try:
+        datos_completos_gv = await asistencia_cache_service.obtener_datos_periodo(
+            list({p.rut_limpio for p in pendientes}),
+            datetime.combine(inicio, datetime.min.time()),
+            datetime.combine(fin, datetime.max.time())
+        )
+    except Exception as e:
+        print(f"ADVERTENCIA: Falló la consulta masiva a GV: {e}")
+        return {}
+
+    # Solo calculamos la lógica de negocio de los días que tienen un pendiente asociado
+    claves_pendientes = {(p.rut_limpio, p.fecha_hhee.strftime('%Y-%m-%d')) for p in pendientes}
+    dias_relevantes = [d for d in datos_completos_gv if (d.get('rut_limpio'), d.get('fecha')) in claves_pendientes]
+    return {
+        (d.get('rut_limpio'), d.get('fecha')): d for d in hhee_calculo.enriquecer_con_logica(dias_relevantes)
+    }
+
+
+def _fila_pendiente(p, lookup_data: dict) -> dict:
+    fecha_str = p.fecha_hhee.strftime('%Y-%m-%d')
+
+    # Si no consultamos GV, lookup_data estará vacío y usará valores por defecto (00:00)
+    datos_dia_gv = lookup_data.get((p.rut_limpio, fecha_str), {})
+
+    # Si hay datos de GV ya vienen con la lógica de negocio calculada. Si no, devolvemos básicos.
+    if datos_dia_gv:
+        datos_combinados = datos_dia_gv
+    else:
+        # Datos mínimos para visualización sin GV
+        datos_combinados = {
+            "rut_limpio": p.rut_limpio,
+            "rut": p.rut,
+            "campaña": p.campaña,
+            "inicio_turno_teorico": p.turno_teorico_inicio or "N/A", # Recuperamos de BD si existe
+            "fin_turno_teorico": p.turno_teorico_fin or "N/A",
+            "marca_real_inicio": p.marca_real_inicio or "N/A",
+            "marca_real_fin": p.marca_real_fin or "N/A",
+            "hhee_inicio_calculadas": 0,
+            "hhee_fin_calculadas": 0,
+            "cantidad_hhee_calculadas": 0,
+            "hhee_autorizadas_antes_gv": 0,
+            "hhee_autorizadas_despues_gv": 0
+        }
+
+    return {
+        **datos_combinados,
+        "id": p.id,
+        "nombre_apellido": p.nombre_apellido,
+        "rut_con_formato": p.rut,
+        "fecha": fecha_str,
+        "estado_final": 'Pendiente por Corrección',
+        "notas": p.notas,
+        "hhee_aprobadas_inicio": 0,
+        "hhee_aprobadas_fin": 0,
+        "hhee_aprobadas_descanso": 0,
+    }
+
+
+async def _transmitir_pendientes(pendientes, inicio: date, fin: date, debe_consultar_gv: bool, siguiente_cursor: Optional[str]):
+    """
+    NDJSON: primero la página con los datos de la BD y luego, a medida que responde
+    GeoVictoria, las mismas filas enriquecidas en grupos de RUTs.
+    """
+    yield json.dumps({
+        "tipo": "pagina",
+        "datos_periodo": [_fila_pendiente(p, {}) for p in pendientes],
+        "nombre_agente": "Múltiples Agentes con Pendientes",
+        "siguiente_cursor": siguiente_cursor
+    }, default=str) + "\n"
+
+    if not debe_consultar_gv or not pendientes:
+        return
+
+    por_rut = {}
+    for p in pendientes:
+        por_rut.setdefault(p.rut_limpio, []).append(p)
+    ruts = list(por_rut)
+    grupos = [
+        [p for rut in ruts[i:i + LOTE_RUTS_PENDIENTES] for p in por_rut[rut]]
+        for i in range(0, len(ruts), LOTE_RUTS_PENDIENTES)
+    ]
+
+    async def enriquecer(grupo):
+        return grupo, await _datos_gv_pendientes(grupo, inicio, fin)
+
+    for tarea in asyncio.as_completed([enriquecer(g) for g in grupos]):
+        grupo, lookup_data = await tarea
+        if lookup_data:
+            yield json.dumps({
+                "tipo": "enriquecimiento",
+                "datos_periodo": [_fila_pendiente(p, lookup_data) for p in grupo]
+            }, default=str) + "\n"
+
+
+@router.get("/pendientes", summary="Consulta registros pendientes de HHEE (con filtro opcional de fecha), paginados")
 async def consultar_pendientes(
     fecha_inicio: Optional[date] = Query(None),
     fecha_fin: Optional[date] = Query(None),
+    limite: int = Query(100, ge=1, le=500, description="Registros por página"),
+    cursor: Optional[str] = Query(None, description="'siguiente_cursor' de la página anterior"),
+    transmitir: bool = Query(False, description="Devuelve NDJSON: primero la página y luego el enriquecimiento de GeoVictoria"),
     db: AsyncSession = Depends(get_db),
     current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
 ):
-    # 1. Consulta Base (Igual que antes)
-    base_query = select(models.ValidacionHHEE).filter(
-        models.ValidacionHHEE.estado == 'Pendiente por Corrección'
-    )
+    """
+    Paginación por cursor (keyset) ordenada por nombre y fecha: cada página es una
+    consulta acotada y solo sus RUTs se consultan en GeoVictoria.
+    """
+    # 1. Consulta Base
+    v = models.ValidacionHHEE
+    query = select(v).filter(v.estado == 'Pendiente por Corrección')
 
     if current_user.role == UserRole.SUPERVISOR_OPERACIONES:
-        query = base_query.filter(models.ValidacionHHEE.supervisor_carga == current_user.email)
-    else:
-        query = base_query
+        query = query.filter(v.supervisor_carga == current_user.email)
 
     # Si no se pasan fechas, traemos solo el periodo actual para todos
     filtro_inicio, filtro_fin = fecha_inicio, fecha_fin
     if not filtro_inicio or not filtro_fin:
         filtro_inicio, filtro_fin = get_current_hhee_period()
+    query = query.filter(hhee_periodos_service.filtro_fechas(v, filtro_inicio, filtro_fin))
+
+    # 2. Página: (nombre, fecha, id) posteriores al cursor; el id desempata filas iguales
+    nombre_orden = func.coalesce(v.nombre_apellido, '')
+    if cursor:
+        query = query.filter(tuple_(nombre_orden, v.fecha_hhee, v.id) > tuple_(*_decodificar_cursor_pendiente(cursor)))
+    query = query.order_by(nombre_orden.asc(), v.fecha_hhee.asc(), v.id.asc()).limit(limite + 1)
 
-    if filtro_inicio and filtro_fin:
-        query = query.filter(models.ValidacionHHEE.fecha_hhee.between(filtro_inicio, filtro_fin))
-    
-    query = query.order_by(models.ValidacionHHEE.nombre_apellido.asc(), models.ValidacionHHEE.fecha_hhee.asc())
-    
     result = await db.execute(query)
     pendientes = result.scalars().all()
+    siguiente_cursor = None
+    if len(pendientes) > limite:
+        pendientes = pendientes[:limite]
+        siguiente_cursor = _codificar_cursor_pendiente(pendientes[-1])
 
-    if not pendientes:
-        return {"datos_periodo": [], "nombre_agente": "Múltiples Agentes con Pendientes"}
-
-    # --- CAMBIO CLAVE AQUÍ ---
     # Solo consultamos GeoVictoria si:
     # A) Es un Supervisor de Operaciones (necesita el detalle para corregir).
     # B) O si se ha filtrado por un rango de fechas específico (asumimos que quiere ver detalle).
     # Si es un Supervisor GTR viendo el global histórico, NO consultamos GV.
-    
-    debe_consultar_gv = (current_user.role == UserRole.SUPERVISOR_OPERACIONES) or (fecha_inicio and fecha_fin)
+    debe_consultar_gv = (current_user.role == UserRole.SUPERVISOR_OPERACIONES) or bool(fecha_inicio and fecha_fin)
 
-    lookup_data = {}
-    
-    if debe_consultar_gv:
-        ruts_limpios_unicos = list({p.rut.strip().replace('-', '').replace('.', '').upper() for p in pendientes})
-        
-        if filtro_inicio and filtro_fin:
-            start_date = filtro_inicio
-            end_date = filtro_fin
-        else:
-            start_date = min(p.fecha_hhee for p in pendientes)
-            end_date = max(p.fecha_hhee for p in pendientes)
-
-        fecha_inicio_dt = datetime.combine(start_date, datetime.min.time())
-        fecha_fin_dt = datetime.combine(end_date, datetime.max.time())
-
-        token = await geovictoria_service.obtener_token_geovictoria()
-        datos_completos_gv = []
-        if token:
-            try:
-                datos_completos_gv = await geovictoria_service.obtener_datos_completos_periodo(
-                    token, ruts_limpios_unicos, fecha_inicio_dt, fecha_fin_dt
-                )
-            except Exception as e:
-                print(f"ADVERTENCIA: Falló la consulta masiva a GV: {e}")
+    # Rango de GV acotado a los días de esta página
+    inicio_gv = min((p.fecha_hhee for p in pendientes), default=filtro_inicio)
+    fin_gv = max((p.fecha_hhee for p in pendientes), default=filtro_fin)
 
-        lookup_data = {
-            (d.get('rut_limpio'), d.get('fecha')): d for d in datos_completos_gv
-        }
+    if transmitir:
+        return StreamingResponse(
+            _transmitir_pendientes(pendientes, inicio_gv, fin_gv, debe_consultar_gv, siguiente_cursor),
+            media_type="application/x-ndjson"
+        )
 
-    # Construimos la respuesta
-    resultados_enriquecidos = []
-    for p in pendientes:
-        rut_limpio = p.rut.strip().replace('-', '').replace('.', '').upper()
-        fecha_str = p.fecha_hhee.strftime('%Y-%m-%d')
-        
-        # Si no consultamos GV, lookup_data estará vacío y usará valores por defecto (00:00)
-        datos_dia_gv = lookup_data.get((rut_limpio, fecha_str), {})
-        
-        # Si hay datos de GV, calculamos lógica de negocio. Si no, devolvemos básicos.
-        if datos_dia_gv:
-            logica_negocio = geovictoria_service.aplicar_logica_de_negocio(datos_dia_gv)
-            datos_combinados = {**datos_dia_gv, **logica_negocio}
-        else:
-            # Datos mínimos para visualización sin GV
-            datos_combinados = {
-                "rut_limpio": rut_limpio,
-                "rut": p.rut,
-                "campaña": p.campaña,
-                "inicio_turno_teorico": p.turno_teorico_inicio or "N/A", # Recuperamos de BD si existe
-                "fin_turno_teorico": p.turno_teorico_fin or "N/A",
-                "marca_real_inicio": p.marca_real_inicio or "N/A",
-                "marca_real_fin": p.marca_real_fin or "N/A",
-                "hhee_inicio_calculadas": 0,
-                "hhee_fin_calculadas": 0,
-                "cantidad_hhee_calculadas": 0,
-                "hhee_autorizadas_antes_gv": 0,
-                "hhee_autorizadas_despues_gv": 0
-            }
-        
-        datos_dia_completo = {
-            **datos_combinados,
-            "nombre_apellido": p.nombre_apellido,
-            "rut_con_formato": p.rut,
-            "fecha": fecha_str, 
-            "estado_final": 'Pendiente por Corrección',
-            "notas": p.notas,
-            "hhee_aprobadas_inicio": 0,
-            "hhee_aprobadas_fin": 0, 
-            "hhee_aprobadas_descanso": 0,
-        }
-        
-        resultados_enriquecidos.append(datos_dia_completo)
+    lookup_data = await _datos_gv_pendientes(pendientes, inicio_gv, fin_gv) if debe_consultar_gv and pendientes else {}
 
     return {
-        "datos_periodo": resultados_enriquecidos,
-        "nombre_agente": "Múltiples Agentes con Pendientes"
+        "datos_periodo": [_fila_pendiente(p, lookup_data) for p in pendientes],
+        "nombre_agente": "Múltiples Agentes con Pendientes",
+        "siguiente_cursor": siguiente_cursor
     }
 
-@router.post("/exportar", summary="Exporta validaciones de HHEE a un archivo Excel (Solo Lectura)")
+@router.post("/exportar", summary="Exporta validaciones de HHEE a un archivo Excel o CSV (Solo Lectura)")
 async def exportar_hhee_a_excel(
     request: ExportRequest,
     db: AsyncSession = Depends(get_db),
     current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
 ):
+    fuente = None
     try:
-        # Consulta base para obtener registros validados en el rango de fechas
-        base_query = select(models.ValidacionHHEE).filter(
-            models.ValidacionHHEE.estado == 'Validado',
-            models.ValidacionHHEE.fecha_hhee.between(request.fecha_inicio, request.fecha_fin)
+        # Registros validados del rango; el Supervisor de Operaciones solo ve los suyos
+        # y el formato RRHH solo muestra los que aún no han sido reportados
+        # El formato Operaciones de periodos cerrados sale de la foto del cierre, sin GeoVictoria
+        es_operaciones = request.formato == ExportFormat.OPERACIONES
+        if es_operaciones and not await hhee_periodos_service.rango_cerrado(db, request.fecha_inicio, request.fecha_fin):
+            gv_disponible = await geovictoria_service.puede_consultar_asistencia()
+            if not gv_disponible: raise HTTPException(status_code=503, detail="No se pudo conectar con GeoVictoria.")
+        query, columnas, formateador = await hhee_exportacion.preparar_exportacion(
+            db, request.fecha_inicio, request.fecha_fin, es_operaciones,
+            supervisor_email=current_user.email if current_user.role == UserRole.SUPERVISOR_OPERACIONES else None
         )
 
-        # Filtro adicional si el usuario es Supervisor de Operaciones
-        if current_user.role == UserRole.SUPERVISOR_OPERACIONES:
-            query = base_query.filter(models.ValidacionHHEE.supervisor_carga == current_user.email)
-        else:
-            query = base_query
-
-        # Si el formato es para RRHH, solo mostramos los que aún no han sido reportados
-        if request.formato == ExportFormat.RRHH:
-            query = query.filter(models.ValidacionHHEE.reportado_a_rrhh == False)
-
-        result = await db.execute(query.order_by(models.ValidacionHHEE.rut, models.ValidacionHHEE.fecha_hhee))
-        validaciones = result.scalars().all()
-
-        if not validaciones:
+        # Las filas se leen con un cursor del servidor y se escriben a medida que llegan
+        fuente = exportacion_service.FuenteFilas(query)
+        if not await fuente.abrir():
             raise HTTPException(status_code=404, detail="No se encontraron HHEE para los filtros seleccionados.")
 
-        # Lógica para generar el formato de Operaciones
-        if request.formato == ExportFormat.OPERACIONES:
-            ruts_unicos = list({v.rut.replace('.', '').replace('-', '') for v in validaciones})
-            token_gv = await geovictoria_service.obtener_token_geovictoria()
-            if not token_gv: raise HTTPException(status_code=503, detail="No se pudo conectar con GeoVictoria.")
-
-            fecha_inicio_dt = datetime.combine(request.fecha_inicio, datetime.min.time())
-            fecha_fin_dt = datetime.combine(request.fecha_fin, datetime.max.time())
-            datos_gv = await geovictoria_service.obtener_datos_completos_periodo(token_gv, ruts_unicos, fecha_inicio_dt, fecha_fin_dt)
-            
-            rrhh_lookup = {}
-            for dia in datos_gv:
-                key = (dia['rut_limpio'], dia['fecha'])
-                rrhh_lookup[key] = {
-                    "antes": dia.get('hhee_autorizadas_antes_gv', 0) or 0,
-                    "despues": dia.get('hhee_autorizadas_despues_gv', 0) or 0
-                }
-            
-            datos_para_excel = []
-            for v in validaciones:
-                rut_limpio_actual = v.rut.replace('.', '').replace('-', '')
-                fecha_actual_str = v.fecha_hhee.strftime('%Y-%m-%d')
-                horas_rrhh_dict = rrhh_lookup.get((rut_limpio_actual, fecha_actual_str), {"antes": 0, "despues": 0})
-                
-                horas_rrhh_especificas = 0
-                if v.tipo_hhee == "Antes de Turno":
-                    horas_rrhh_especificas = horas_rrhh_dict.get("antes", 0)
-                elif v.tipo_hhee == "Después de Turno":
-                    horas_rrhh_especificas = horas_rrhh_dict.get("despues", 0)
-                elif v.tipo_hhee == "Día de Descanso":
-                    horas_rrhh_especificas = horas_rrhh_dict.get("antes", 0) + horas_rrhh_dict.get("despues", 0)
-
-                datos_para_excel.append({
-                    "ID": v.id, "RUT": v.rut, "Nombre Completo": v.nombre_apellido, "Campaña": v.campaña,
-                    "Fecha HHEE": v.fecha_hhee.strftime('%d-%m-%Y'), "Tipo HHEE": v.tipo_hhee,
-                    "Horas Aprobadas (Operaciones)": decimal_to_hhmm(v.cantidad_hhee_aprobadas),
-                    "Horas Aprobadas (RRHH)": decimal_to_hhmm(horas_rrhh_especificas),
-                    "Estado": v.estado, "Validado Por": v.supervisor_carga,
-                    "Fecha de Carga": v.fecha_carga.strftime('%d-%m-%Y %H:%M') if v.fecha_carga else None
-                })
-        
-        # Lógica para generar el formato de RRHH
-        elif request.formato == ExportFormat.RRHH:
-            permiso_map = {"Antes de Turno": 10, "Después de Turno": 5, "Día de Descanso": 10}
-            datos_para_excel = [{
-                "Cod Funcionario": v.rut, "Nombre": v.nombre_apellido,
-                "Num Permiso": permiso_map.get(v.tipo_hhee, ''),
-                "Fecha Inicio": v.fecha_hhee.strftime('%d/%m/%Y'),
-                "Fecha Fin": v.fecha_hhee.strftime('%d/%m/%Y'),
-                "Cant Horas": decimal_to_hhmm(v.cantidad_hhee_aprobadas)
-            } for v in validaciones]
-
-        # Creación y envío del archivo Excel
-        df = pd.DataFrame(datos_para_excel)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name=f'Reporte {request.formato.value}')
-        output.seek(0)
-
-        headers = {'Content-Disposition': f'attachment; filename="reporte_hhee_{request.formato.value}_{request.fecha_inicio}_a_{request.fecha_fin}.xlsx"'}
-        return StreamingResponse(output, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers=headers)
+        contenido = await exportacion_service.contenido_respuesta(
+            request.archivo, columnas,
+            exportacion_service.formatear(fuente.particiones(), formateador),
+            f'Reporte {request.formato.value}'
+        )
+
+        headers = exportacion_service.encabezados_descarga(f"reporte_hhee_{request.formato.value}_{request.fecha_inicio}_a_{request.fecha_fin}", request.archivo)
+        return StreamingResponse(contenido, media_type=exportacion_service.MEDIA_TYPES[request.archivo], headers=headers)
         
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        # Usamos rollback por seguridad, aunque esta función ya no escribe en la BD
-        await db.rollback() 
+        if fuente:
+            await fuente.cerrar()
         raise HTTPException(status_code=500, detail=f"Ocurrió un error inesperado al generar el reporte: {e}")
 
+@router.post("/exportar/trabajos", status_code=status.HTTP_202_ACCEPTED, summary="Encola la exportación de HHEE y devuelve el id del trabajo")
+async def encolar_exportacion_hhee(
+    request: ExportRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
+):
+    """
+    Versión asíncrona de /exportar para rangos grandes: devuelve de inmediato el id
+    del trabajo; el avance y la descarga se consultan en /exportaciones/{id}.
+    """
+    es_operaciones = request.formato == ExportFormat.OPERACIONES
+    if es_operaciones and not await hhee_periodos_service.rango_cerrado(db, request.fecha_inicio, request.fecha_fin):
+        gv_disponible = await geovictoria_service.puede_consultar_asistencia()
+        if not gv_disponible: raise HTTPException(status_code=503, detail="No se pudo conectar con GeoVictoria.")
+
+    supervisor_email = current_user.email if current_user.role == UserRole.SUPERVISOR_OPERACIONES else None
+    try:
+        trabajo = await gestor_exportaciones.encolar(
+            "hhee", request.model_dump(mode="json"), supervisor_email, current_user.id,
+            request.archivo, f"reporte_hhee_{request.formato.value}_{request.fecha_inicio}_a_{request.fecha_fin}",
+            lambda t: hhee_exportacion.producir_exportacion(
+                t, request.fecha_inicio, request.fecha_fin, es_operaciones,
+                f'Reporte {request.formato.value}', supervisor_email
+            )
+        )
+    except ColaExportacionLlenaError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return trabajo.a_dict()
+
 class MetricasRequest(BaseModel):
     fecha_inicio: date
     fecha_fin: date
 
+async def _ttl_cache_periodos(db: AsyncSession, periodos: Optional[List[int]]) -> Optional[float]:
+    """TTL largo si la respuesta solo abarca periodos cerrados; si no, el TTL por defecto de la caché."""
+    if periodos and await hhee_periodos_service.periodos_cerrados(db, periodos) == set(periodos):
+        return cache_respuestas.ttl_cerrado_seg
+    return None
+
+
 @router.post("/metricas", response_model=DashboardHHEEMetricas, summary="Obtiene métricas clave del módulo HHEE")
 async def get_hhee_metricas(
     request: MetricasRequest,
@@ -502,47 +704,68 @@ async def get_hhee_metricas(
     fecha_inicio = request.fecha_inicio
     fecha_fin = request.fecha_fin
 
-    # --- 1. CONSULTA DE VALIDACIONES (CARGA MANUAL) - Agregada por día/tipo ---
-    # Optimizamos trayendo solo los campos necesarios y agrupando si hay duplicados
-    base_query = select(
-        models.ValidacionHHEE.rut,
-        models.ValidacionHHEE.nombre_apellido,
-        models.ValidacionHHEE.campaña,
-        models.ValidacionHHEE.fecha_hhee,
-        models.ValidacionHHEE.tipo_hhee,
-        func.sum(models.ValidacionHHEE.cantidad_hhee_aprobadas).label("cantidad_hhee_aprobadas")
-    ).filter(
-        models.ValidacionHHEE.estado == 'Validado',
-        models.ValidacionHHEE.fecha_hhee.between(fecha_inicio, fecha_fin)
-    )
+    supervisor_email = current_user.email if current_user.role == UserRole.SUPERVISOR_OPERACIONES else None
 
-    if current_user.role == UserRole.SUPERVISOR_OPERACIONES:
-        base_query = base_query.filter(models.ValidacionHHEE.supervisor_carga == current_user.email)
-
-    query = base_query.group_by(
-        models.ValidacionHHEE.rut,
-        models.ValidacionHHEE.nombre_apellido,
-        models.ValidacionHHEE.campaña,
-        models.ValidacionHHEE.fecha_hhee,
-        models.ValidacionHHEE.tipo_hhee
+    # --- 0. CACHÉ: la respuesta solo cambia cuando se escriben validaciones, solicitudes o totales RRHH ---
+    alcance_cache = [fecha_inicio, fecha_fin, current_user.role.value, supervisor_email or "*"]
+    etiquetas_cache = (
+        etiquetas_rango("validaciones", fecha_inicio, fecha_fin)
+        + etiquetas_rango("solicitudes", fecha_inicio, fecha_fin)
+        + ["consolidado"]
     )
-    
-    result = await db.execute(query)
-    validaciones_periodo = result.all()
+    respuesta_cacheada = await cache_respuestas.obtener("metricas", alcance_cache, etiquetas_cache)
+    if respuesta_cacheada is not None:
+        return respuesta_cacheada
+
+    # --- 1. CONSULTA DE VALIDACIONES (CARGA MANUAL) - Totales por empleado/campaña ---
+    periodos = periodos_completos_en_rango(fecha_inicio, fecha_fin)
+    # Periodos cerrados: todo sale de la foto del cierre, sin GeoVictoria
+    periodos_cerrados = await hhee_periodos_service.rango_cerrado(db, fecha_inicio, fecha_fin)
+    if periodos_cerrados:
+        validaciones_periodo = await hhee_cierre_service.leer_resumen(db, periodos_cerrados, supervisor_email)
+    elif periodos:
+        # Periodos completos (26 al 25): se leen del resumen precalculado
+        validaciones_periodo = await hhee_resumen_service.leer_resumen(db, periodos, supervisor_email)
+    else:
+        # Rango a medida: agregamos las validaciones directamente
+        base_query = select(
+            func.max(models.ValidacionHHEE.rut).label("rut"),
+            models.ValidacionHHEE.rut_limpio,
+            func.max(models.ValidacionHHEE.nombre_apellido).label("nombre_apellido"),
+            models.ValidacionHHEE.campaña,
+            func.sum(models.ValidacionHHEE.cantidad_hhee_aprobadas).label("cantidad_hhee_aprobadas")
+        ).filter(
+            models.ValidacionHHEE.estado == 'Validado',
+            models.ValidacionHHEE.fecha_hhee.between(fecha_inicio, fecha_fin)
+        )
+
+        if supervisor_email:
+            base_query = base_query.filter(models.ValidacionHHEE.supervisor_carga == supervisor_email)
+
+        query = base_query.group_by(
+            models.ValidacionHHEE.rut_limpio,
+            models.ValidacionHHEE.campaña
+        )
+        
+        result = await db.execute(query)
+        validaciones_periodo = result.all()
 
     # --- 2. CONSULTA DE SOLICITUDES (Optimizado con agregación en DB) ---
     solicitudes_pendientes = 0
     horas_aprobadas_sol = 0
     horas_rechazadas_sol = 0
 
-    if current_user.role != UserRole.SUPERVISOR_OPERACIONES:
+    if current_user.role != UserRole.SUPERVISOR_OPERACIONES and periodos_cerrados:
+        # Al cierre no quedan solicitudes pendientes
+        horas_aprobadas_sol, horas_rechazadas_sol = await hhee_cierre_service.leer_totales_solicitudes(db, periodos_cerrados)
+    elif current_user.role != UserRole.SUPERVISOR_OPERACIONES:
         stats_query = select(
             models.SolicitudHHEE.estado,
             func.count(models.SolicitudHHEE.id).label("cantidad"),
             func.sum(models.SolicitudHHEE.horas_aprobadas).label("sum_aprobadas"),
             func.sum(models.SolicitudHHEE.horas_solicitadas).label("sum_solicitadas")
         ).filter(
-            models.SolicitudHHEE.fecha_hhee.between(fecha_inicio, fecha_fin)
+            hhee_periodos_service.filtro_fechas(models.SolicitudHHEE, fecha_inicio, fecha_fin)
         ).group_by(models.SolicitudHHEE.estado)
 
         stats_result = await db.execute(stats_query)
@@ -557,22 +780,24 @@ async def get_hhee_metricas(
 
     # --- 3. CONSULTA A GEOVICTORIA (API CONSOLIDADA - OPTIMIZADA) ---
     # Usamos set comprehension para obtener RUTs únicos ya formateados
-    ruts_unicos = {v.rut.strip().replace('-', '').replace('.', '').upper() for v in validaciones_periodo if v.rut}
+    ruts_unicos = {v.rut_limpio for v in validaciones_periodo if v.rut_limpio}
     mapa_datos_gv = {} # rut_limpio -> total_hhee_rrhh_periodo
-    
-    if ruts_unicos:
-        token = await geovictoria_service.obtener_token_geovictoria()
-        if token:
-            fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
-            fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
-            
-            try:
-                # Usamos la nueva función consolidada que es mucho más rápida
-                mapa_datos_gv = await geovictoria_service.obtener_datos_consolidados(
-                    token, list(ruts_unicos), fecha_inicio_dt, fecha_fin_dt
-                )
-            except Exception as e:
-                print(f"Error consultando GeoVictoria (API Consolidada): {e}")
+    rrhh_disponible = True
+    antiguedad_rrhh_seg = None
+
+    if ruts_unicos and periodos_cerrados:
+        mapa_datos_gv = await hhee_cierre_service.leer_totales_rrhh(db, periodos_cerrados, list(ruts_unicos))
+    elif ruts_unicos:
+        try:
+            # Totales precalculados por el job nocturno; solo los RUTs sin total guardado van a la API.
+            # Si GeoVictoria no responde se usan los últimos totales guardados, informando su antigüedad.
+            mapa_datos_gv, antiguedad_rrhh_seg = await asistencia_cache_service.obtener_consolidados(
+                list(ruts_unicos), fecha_inicio, fecha_fin
+            )
+        except Exception as e:
+            print(f"Error consultando GeoVictoria (API Consolidada): {e}")
+        # Sin ningún total (ni guardado) no informamos ceros como si fueran reales
+        rrhh_disponible = bool(mapa_datos_gv)
 
     # --- 4. PROCESAMIENTO Y CÁLCULOS ---
     total_declaradas = 0
@@ -583,7 +808,7 @@ async def get_hhee_metricas(
     empleado_a_campana = {}
 
     for v in validaciones_periodo:
-        rut_limpio = v.rut.replace('-', '').replace('.', '').upper() if v.rut else None
+        rut_limpio = v.rut_limpio
         campana_nombre = v.campaña or "Sin Campaña"
         
         # --- ACUMULADORES GLOBALES ---
@@ -639,7 +864,7 @@ async def get_hhee_metricas(
         key=lambda x: x.total_horas_declaradas, reverse=True
     )
     
-    return DashboardHHEEMetricas(
+    respuesta = DashboardHHEEMetricas(
         total_hhee_declaradas=total_declaradas,
         total_hhee_aprobadas_rrhh=total_rrhh,
         
@@ -650,8 +875,17 @@ async def get_hhee_metricas(
         
         empleado_top=None, # Ya no lo usamos en el frontend
         desglose_por_empleado=desglose_por_empleado_lista,
-        desglose_por_campana=desglose_por_campana_lista
+        desglose_por_campana=desglose_por_campana_lista,
+        rrhh_disponible=rrhh_disponible,
+        antiguedad_rrhh_seg=antiguedad_rrhh_seg
     )
+    # Sin totales RRHH no se guarda: la próxima consulta vuelve a intentar con GeoVictoria
+    if rrhh_disponible:
+        await cache_respuestas.guardar(
+            "metricas", alcance_cache, etiquetas_cache, respuesta.model_dump(mode="json"),
+            ttl_seg=await _ttl_cache_periodos(db, periodos)
+        )
+    return respuesta
     
 @router.get("/metricas-pendientes", response_model=MetricasPendientesHHEE, summary="Obtener métricas de HHEE pendientes de validación")
 async def get_hhee_metricas_pendientes(
@@ -663,45 +897,44 @@ async def get_hhee_metricas_pendientes(
     """
     Calcula y devuelve un resumen de HHEE en estado 'Pendiente por Corrección',
     filtrado por un rango de fechas.
-    OPTIMIZADO: Solo consulta la BD local, no llama a GeoVictoria.
+    OPTIMIZADO: Se cuenta en la BD local (COUNT con FILTER), sin cargar los registros ni llamar a GeoVictoria.
     """
 
-    # 1. Filtramos en la BD Local por estado y fecha
-    base_query = select(models.ValidacionHHEE).filter(
-        models.ValidacionHHEE.estado == 'Pendiente por Corrección'
-    )
+    supervisor_email = current_user.email if current_user.role == UserRole.SUPERVISOR_OPERACIONES else None
+    alcance_cache = [fecha_inicio, fecha_fin, current_user.role.value, supervisor_email or "*"]
+    etiquetas_cache = etiquetas_rango("validaciones", fecha_inicio, fecha_fin)
+    respuesta_cacheada = await cache_respuestas.obtener("metricas-pendientes", alcance_cache, etiquetas_cache)
+    if respuesta_cacheada is not None:
+        return respuesta_cacheada
+
+    # 1. Conteo en la BD: una sola fila con el total y los conteos por motivo (índice estado, fecha, supervisor)
+    v = models.ValidacionHHEE
+    query = select(
+        func.count(v.id).label("total"),
+        func.count(v.id).filter(v.notas == "Pendiente de cambio de turno").label("cambio_turno"),
+        func.count(v.id).filter(v.notas == "Pendiente de corrección de marcas").label("correccion_marcas")
+    ).filter(v.estado == 'Pendiente por Corrección')
 
     if fecha_inicio and fecha_fin:
-        base_query = base_query.filter(
-            models.ValidacionHHEE.fecha_hhee.between(fecha_inicio, fecha_fin)
-        )
+        query = query.filter(hhee_periodos_service.filtro_fechas(v, fecha_inicio, fecha_fin))
 
-    # 2. Filtro de Rol
-    if current_user.role == UserRole.SUPERVISOR_OPERACIONES:
-        query = base_query.filter(models.ValidacionHHEE.supervisor_carga == current_user.email)
-    else:
-        query = base_query # Global para GTR
-    
-    result = await db.execute(query)
-    pendientes = result.scalars().all()
+    # 2. Filtro de Rol (global para GTR)
+    if supervisor_email:
+        query = query.filter(v.supervisor_carga == supervisor_email)
 
-    # 3. Conteo en memoria (Rápido y sin API externa)
-    total_pendientes = len(pendientes)
-    cambio_turno_count = 0
-    correccion_marcas_count = 0
+    conteos = (await db.execute(query)).one()
 
-    for p in pendientes:
-        # Usamos el campo 'notas' que ya guardaste en la BD
-        if p.notas == "Pendiente de cambio de turno":
-            cambio_turno_count += 1
-        elif p.notas == "Pendiente de corrección de marcas":
-            correccion_marcas_count += 1
-            
-    return MetricasPendientesHHEE(
-        total_pendientes=total_pendientes,
-        por_cambio_turno=cambio_turno_count,
-        por_correccion_marcas=correccion_marcas_count
+    respuesta = MetricasPendientesHHEE(
+        total_pendientes=conteos.total,
+        por_cambio_turno=conteos.cambio_turno,
+        por_correccion_marcas=conteos.correccion_marcas
+    )
+    periodos = periodos_completos_en_rango(fecha_inicio, fecha_fin) if fecha_inicio and fecha_fin else None
+    await cache_respuestas.guardar(
+        "metricas-pendientes", alcance_cache, etiquetas_cache, respuesta.model_dump(mode="json"),
+        ttl_seg=await _ttl_cache_periodos(db, periodos)
     )
+    return respuesta
 
 # ===================================================================
 # === NENDPOINTS PARA EL FLUJO DE SOLICITUD DE HHEE ===
@@ -719,6 +952,8 @@ async def crear_solicitud_hhee(
     validando que no exista una activa para la misma fecha y tipo.
     """
     
+    await _rechazar_periodos_cerrados(db, [solicitud_data.fecha_hhee])
+
     # 1. Buscamos si ya existen solicitudes para el mismo analista, fecha y tipo.
     query_existente = select(models.SolicitudHHEE).filter(
         models.SolicitudHHEE.analista_id == current_user.id,
@@ -746,6 +981,7 @@ async def crear_solicitud_hhee(
     db.add(nueva_solicitud)
     await db.commit()
     await db.refresh(nueva_solicitud)
+    await cache_respuestas.invalidar(etiquetas_fechas("solicitudes", [nueva_solicitud.fecha_hhee]))
     
     # Recargamos para devolver el objeto completo con relaciones
     result = await db.execute(
@@ -767,51 +1003,19 @@ async def obtener_mis_solicitudes(
     """
     Devuelve el historial de solicitudes de HHEE para el analista actual.
     """
-    # 1. Filtramos las solicitudes por analista y por rango de fecha (esto estaba bien)
-    query = select(models.SolicitudHHEE).options(
-        selectinload(models.SolicitudHHEE.solicitante),
-        selectinload(models.SolicitudHHEE.supervisor)
-    ).filter(
-        models.SolicitudHHEE.analista_id == current_user.id,
-        models.SolicitudHHEE.fecha_hhee.between(fecha_inicio, fecha_fin)
-    ).order_by(models.SolicitudHHEE.fecha_solicitud.desc())
-    
-    result = await db.execute(query)
-    solicitudes = result.scalars().all()
-
-    if not solicitudes:
-        return []
-
-    # --- INICIO DE LA LÓGICA CORREGIDA (añadida) ---
-    # 2. Hacemos una única llamada a GeoVictoria para el rango de fechas solicitado
-    rut_analista = getattr(current_user, 'rut', None)
-    datos_gv_lista = []
-    if rut_analista:
-        rut_limpio = rut_analista.replace('-', '').replace('.', '').upper()
-        fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
-        fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
-        
-        token = await geovictoria_service.obtener_token_geovictoria()
-        if token:
-            datos_gv_lista = await geovictoria_service.obtener_datos_completos_periodo(
-                token, [rut_limpio], fecha_inicio_dt, fecha_fin_dt
-            )
-
-    # Creamos un mapa para buscar los datos de GV fácilmente
-    mapa_datos_gv = {item['fecha']: item for item in datos_gv_lista}
-
-    # 3. Unimos los datos de las solicitudes con los de GeoVictoria
-    respuesta_enriquecida = []
-    for sol in solicitudes:
-        fecha_str_solicitud = sol.fecha_hhee.strftime('%Y-%m-%d')
-        datos_gv_del_dia = mapa_datos_gv.get(fecha_str_solicitud, {})
-        
-        solicitud_dict = SolicitudHHEE.model_validate(sol).model_dump()
-        solicitud_dict['datos_geovictoria'] = datos_gv_del_dia
-        respuesta_enriquecida.append(solicitud_dict)
-
-    return respuesta_enriquecida
-    # --- FIN DE LA LÓGICA CORREGIDA ---
+    # Los RUTs ya se conocen (el propio analista): la carga de la BD y GeoVictoria arrancan juntas
+    return await hhee_solicitudes_service.solicitudes_enriquecidas(
+        db,
+        filtros=[
+            models.SolicitudHHEE.analista_id == current_user.id,
+            hhee_periodos_service.filtro_fechas(models.SolicitudHHEE, fecha_inicio, fecha_fin)
+        ],
+        orden=[models.SolicitudHHEE.fecha_solicitud.desc()],
+        opciones=[selectinload(models.SolicitudHHEE.solicitante), selectinload(models.SolicitudHHEE.supervisor)],
+        inicio=fecha_inicio,
+        fin=fecha_fin,
+        ruts_limpios=[current_user.rut_limpio] if current_user.rut_limpio else []
+    )
 
 
 @router.get("/solicitudes/pendientes/", summary="[Supervisor] Ver solicitudes pendientes por rango de fecha con datos de GV")
@@ -825,57 +1029,17 @@ async def obtener_solicitudes_pendientes(
     Devuelve una lista de solicitudes PENDIENTES dentro de un rango de fechas,
     enriquecidas con los datos de marcación de GeoVictoria.
     """
-    query = select(models.SolicitudHHEE).options(
-        selectinload(models.SolicitudHHEE.solicitante)
-    ).filter(
-        models.SolicitudHHEE.estado == EstadoSolicitudHHEE.PENDIENTE,
-        models.SolicitudHHEE.fecha_hhee.between(fecha_inicio, fecha_fin)
-    ).order_by(models.SolicitudHHEE.analista_id, models.SolicitudHHEE.fecha_hhee)
-
-    result = await db.execute(query)
-    solicitudes = result.scalars().all()
-
-    if not solicitudes:
-        return []
-
-    ruts_unicos = {sol.solicitante.rut.replace('-', '').replace('.', '').upper() for sol in solicitudes if hasattr(sol.solicitante, 'rut') and sol.solicitante.rut}
-    
-    fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
-    fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
-    
-    datos_gv_lista = []
-    if ruts_unicos:
-        token = await geovictoria_service.obtener_token_geovictoria()
-        if token:
-            datos_gv_lista = await geovictoria_service.obtener_datos_completos_periodo(
-                token, list(ruts_unicos), fecha_inicio_dt, fecha_fin_dt
-            )
-    
-    # --- INICIO DE LA CORRECCIÓN CLAVE ---
-    # Procesamos los datos de GeoVictoria para añadir nuestro cálculo
-    datos_gv_procesados = []
-    for dia in datos_gv_lista:
-        logica = geovictoria_service.aplicar_logica_de_negocio(dia)
-        datos_gv_procesados.append({**dia, **logica})
-    
-    # Creamos el mapa con los datos ya procesados
-    mapa_datos_gv = {
-        (item['rut_limpio'], item['fecha']): item for item in datos_gv_procesados
-    }
-    # --- FIN DE LA CORRECCIÓN CLAVE ---
-    
-    respuesta_enriquecida = []
-    for sol in solicitudes:
-        rut_limpio_solicitud = sol.solicitante.rut.replace('-', '').replace('.', '').upper() if hasattr(sol.solicitante, 'rut') and sol.solicitante.rut else None
-        fecha_str_solicitud = sol.fecha_hhee.strftime('%Y-%m-%d')
-        
-        datos_gv_del_dia = mapa_datos_gv.get((rut_limpio_solicitud, fecha_str_solicitud), {})
-        
-        solicitud_dict = SolicitudHHEE.model_validate(sol).model_dump()
-        solicitud_dict['datos_geovictoria'] = datos_gv_del_dia
-        respuesta_enriquecida.append(solicitud_dict)
-
-    return respuesta_enriquecida
+    return await hhee_solicitudes_service.solicitudes_enriquecidas(
+        db,
+        filtros=[
+            models.SolicitudHHEE.estado == EstadoSolicitudHHEE.PENDIENTE,
+            hhee_periodos_service.filtro_fechas(models.SolicitudHHEE, fecha_inicio, fecha_fin)
+        ],
+        orden=[models.SolicitudHHEE.analista_id, models.SolicitudHHEE.fecha_hhee],
+        opciones=[selectinload(models.SolicitudHHEE.solicitante)],
+        inicio=fecha_inicio,
+        fin=fecha_fin
+    )
 
 
 @router.post("/solicitudes/{solicitud_id}/procesar/", response_model=SolicitudHHEE, summary="[Supervisor] Aprobar o Rechazar una solicitud")
@@ -903,6 +1067,17 @@ async def procesar_solicitud(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada.")
     if solicitud.estado != EstadoSolicitudHHEE.PENDIENTE:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Esta solicitud ya ha sido procesada.")
+    await _rechazar_periodos_cerrados(db, [solicitud.fecha_hhee])
+
+    # Aprobar no reemplaza una validación ya aprobada o reportada a RRHH del mismo RUT, fecha y tipo
+    tipo_hhee_validacion = hhee_solicitudes_service.TIPO_VALIDACION.get(solicitud.tipo)
+    if decision.estado == EstadoSolicitudHHEE.APROBADA and decision.horas_aprobadas > 0 and tipo_hhee_validacion:
+        clave = (solicitud.solicitante.rut_limpio, solicitud.fecha_hhee, tipo_hhee_validacion)
+        if await hhee_solicitudes_service.claves_validadas(db, [clave]):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=hhee_solicitudes_service.mensaje_conflicto(solicitud, tipo_hhee_validacion)
+            )
 
     # Actualizamos la solicitud con la decisión
     solicitud.estado = decision.estado
@@ -915,35 +1090,31 @@ async def procesar_solicitud(
     # Si la solicitud es APROBADA y tiene horas, la insertamos en la tabla de validaciones
     # para que sea considerada en los reportes de RRHH y Operaciones.
     if solicitud.estado == EstadoSolicitudHHEE.APROBADA and solicitud.horas_aprobadas > 0:
-        
-        # Mapeamos el tipo de solicitud al tipo de validación existente
-        tipo_validacion_map = {
-            TipoSolicitudHHEE.ANTES_TURNO: "Antes de Turno",
-            TipoSolicitudHHEE.DESPUES_TURNO: "Después de Turno",
-            TipoSolicitudHHEE.DIA_DESCANSO: "Día de Descanso",
-        }
-        tipo_hhee_validacion = tipo_validacion_map.get(solicitud.tipo)
-
         if tipo_hhee_validacion:
             # Necesitamos el RUT y nombre del solicitante
             rut_formateado = formatear_rut(solicitud.solicitante.rut) if hasattr(solicitud.solicitante, 'rut') else ""
             nombre_completo = f"{solicitud.solicitante.nombre} {solicitud.solicitante.apellido}"
 
-            nueva_validacion = models.ValidacionHHEE(
-                rut=rut_formateado,
-                nombre_apellido=nombre_completo,
-                campaña=solicitud.solicitante.campanas_asignadas[0].nombre if solicitud.solicitante.campanas_asignadas else "General",
-                fecha_hhee=solicitud.fecha_hhee,
-                tipo_hhee=tipo_hhee_validacion,
-                cantidad_hhee_aprobadas=solicitud.horas_aprobadas,
-                estado="Validado",
-                supervisor_carga=current_user.email,
-                notas=f"Aprobado desde solicitud #{solicitud.id}"
-            )
-            db.add(nueva_validacion)
+            # Upsert: solo puede reemplazar una fila no validada (p. ej. sin horas) del mismo RUT, fecha y tipo
+            await db.flush()
+            await _guardar_validaciones(db, reemplazar_validadas=False, filas=[{
+                "rut": rut_formateado,
+                "nombre_apellido": nombre_completo,
+                "campaña": solicitud.solicitante.campanas_asignadas[0].nombre if solicitud.solicitante.campanas_asignadas else "General",
+                "fecha_hhee": solicitud.fecha_hhee,
+                "tipo_hhee": tipo_hhee_validacion,
+                "cantidad_hhee_aprobadas": solicitud.horas_aprobadas,
+                "estado": "Validado",
+                "supervisor_carga": current_user.email,
+                "notas": f"Aprobado desde solicitud #{solicitud.id}"
+            }])
+            await hhee_resumen_service.actualizar_resumen(db, [(limpiar_rut(rut_formateado), solicitud.fecha_hhee)])
 
     await db.commit()
     await db.refresh(solicitud)
+    await cache_respuestas.invalidar(
+        etiquetas_fechas("solicitudes", [solicitud.fecha_hhee]) + etiquetas_fechas("validaciones", [solicitud.fecha_hhee])
+    )
     return solicitud
 
 @router.get("/solicitudes/{solicitud_id}/detalle-validacion/", summary="[Supervisor] Obtener detalle de una solicitud + datos de GeoVictoria")
@@ -956,40 +1127,26 @@ async def obtener_detalle_solicitud_para_validacion(
     Obtiene los datos de una solicitud específica y los enriquece
     con la información de marcación de GeoVictoria para ese día y analista.
     """
-    # 1. Obtenemos la solicitud de nuestra base de datos
-    result = await db.execute(
-        select(models.SolicitudHHEE)
-        .options(selectinload(models.SolicitudHHEE.solicitante))
-        .filter(models.SolicitudHHEE.id == solicitud_id)
-    )
-    solicitud = result.scalars().first()
-    if not solicitud:
+    # 1. RUT y fecha de la solicitud (consulta liviana) para lanzar GeoVictoria junto con la carga completa
+    ruts, fecha_hhee, _ = await hhee_solicitudes_service.ruts_de_solicitudes(db, models.SolicitudHHEE.id == solicitud_id)
+    if fecha_hhee is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada.")
-
-    # 2. Obtenemos el RUT y la fecha para consultar el servicio externo
-    rut_analista = getattr(solicitud.solicitante, 'rut', None)
-    if not rut_analista:
+    if not ruts:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="El analista solicitante no tiene un RUT configurado.")
-    
-    rut_limpio = rut_analista.replace('-', '').replace('.', '').upper()
-    fecha_dt = datetime.combine(solicitud.fecha_hhee, datetime.min.time())
 
-    # 3. Consultamos a GeoVictoria
-    token = await geovictoria_service.obtener_token_geovictoria()
-    if not token:
+    # 2. Solicitud y GeoVictoria en paralelo
+    query = select(models.SolicitudHHEE).options(
+        selectinload(models.SolicitudHHEE.solicitante)
+    ).filter(models.SolicitudHHEE.id == solicitud_id)
+    solicitudes, mapa_gv, gv_disponible = await hhee_solicitudes_service.cargar_con_gv(db, query, ruts, fecha_hhee, fecha_hhee)
+    if not gv_disponible:
         raise HTTPException(status_code=503, detail="No se pudo comunicar con GeoVictoria.")
-    
-    datos_gv = await geovictoria_service.obtener_datos_completos_periodo(token, [rut_limpio], fecha_dt, fecha_dt)
-    
-    # 4. Procesamos los datos and devolvemos todo junto
-    datos_dia_gv = {}
-    if datos_gv:
-        logica_negocio = geovictoria_service.aplicar_logica_de_negocio(datos_gv[0])
-        datos_dia_gv = {**datos_gv[0], **logica_negocio}
 
+    # 3. Devolvemos todo junto
+    respuesta = hhee_solicitudes_service.armar_respuesta(solicitudes, mapa_gv)[0]
     return {
-        "solicitud": SolicitudHHEE.model_validate(solicitud).model_dump(),
-        "datos_geovictoria": datos_dia_gv
+        "solicitud": {k: v for k, v in respuesta.items() if k != "datos_geovictoria"},
+        "datos_geovictoria": respuesta["datos_geovictoria"]
     }
     
 
@@ -999,102 +1156,71 @@ async def procesar_solicitudes_lote(
     db: AsyncSession = Depends(get_db),
     current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
 ):
-    solicitud_ids = [d.solicitud_id for d in lote_data.decisiones]
-    if not solicitud_ids:
+    """
+    Procesa el lote por conjuntos: valida todas las decisiones en una pasada, actualiza las
+    solicitudes con un UPDATE ... FROM (VALUES ...) e inserta las validaciones aprobadas en bloque.
+    Las decisiones que no pasan la validación se informan en 'errores' sin frenar al resto.
+    """
+    if not lote_data.decisiones:
         return {"detail": "No se proporcionaron decisiones para procesar."}
+    decisiones, errores_duplicadas = hhee_solicitudes_service.deduplicar_decisiones(lote_data.decisiones)
+    solicitud_ids = [d.solicitud_id for d in decisiones]
 
     try:
-        # 1. Obtenemos todas las solicitudes para tener los datos originales
-        query = select(models.SolicitudHHEE).options(
-            selectinload(models.SolicitudHHEE.solicitante)
-            .selectinload(models.Analista.campanas_asignadas)
-        ).filter(models.SolicitudHHEE.id.in_(solicitud_ids))
-        
-        result = await db.execute(query)
-        solicitudes_a_procesar = result.scalars().all()
-        solicitudes_map = {s.id: s for s in solicitudes_a_procesar}
-
-        # 2. Obtenemos los datos de GeoVictoria para estas solicitudes para verificar los máximos
-        ruts_unicos = {s.solicitante.rut.replace('-', '').replace('.', '').upper() for s in solicitudes_a_procesar if hasattr(s.solicitante, 'rut') and s.solicitante.rut}
-        if ruts_unicos:
-            fecha_min = min(s.fecha_hhee for s in solicitudes_a_procesar)
-            fecha_max = max(s.fecha_hhee for s in solicitudes_a_procesar)
-            fecha_inicio_dt = datetime.combine(fecha_min, datetime.min.time())
-            fecha_fin_dt = datetime.combine(fecha_max, datetime.max.time())
-            token = await geovictoria_service.obtener_token_geovictoria()
-            datos_gv_lista = await geovictoria_service.obtener_datos_completos_periodo(token, list(ruts_unicos), fecha_inicio_dt, fecha_fin_dt) if token else []
-            
-            datos_gv_procesados = [{**dia, **geovictoria_service.aplicar_logica_de_negocio(dia)} for dia in datos_gv_lista]
-            mapa_datos_gv = {(item['rut_limpio'], item['fecha']): item for item in datos_gv_procesados}
-        else:
-            mapa_datos_gv = {}
-
-        # 3. Iteramos sobre las decisiones y VALIDAMOS antes de guardar
-        for decision in lote_data.decisiones:
-            solicitud = solicitudes_map.get(decision.solicitud_id)
-            if not solicitud or solicitud.estado != EstadoSolicitudHHEE.PENDIENTE:
-                continue
-
-            # Validamos que las horas aprobadas no excedan el máximo calculado desde GeoVictoria
-            rut_limpio = solicitud.solicitante.rut.replace('-', '').replace('.', '').upper() if hasattr(solicitud.solicitante, 'rut') and solicitud.solicitante.rut else None
-            fecha_str = solicitud.fecha_hhee.strftime('%Y-%m-%d')
-            gv_data = mapa_datos_gv.get((rut_limpio, fecha_str), {})
-            
-            max_calculado = 0
-            if solicitud.tipo == TipoSolicitudHHEE.ANTES_TURNO:
-                max_calculado = gv_data.get('hhee_inicio_calculadas', 0)
-            elif solicitud.tipo == TipoSolicitudHHEE.DESPUES_TURNO:
-                max_calculado = gv_data.get('hhee_fin_calculadas', 0)
-            else: # DIA_DESCANSO
-                max_calculado = gv_data.get('cantidad_hhee_calculadas', 0)
-
-            if decision.horas_aprobadas > max_calculado:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Para la solicitud #{solicitud.id}, no se pueden aprobar {decision.horas_aprobadas} horas. El máximo calculado es {max_calculado:.2f}."
-                )
-           
-
-            # Actualizamos la solicitud con los datos de la decisión
-            solicitud.estado = decision.estado
-            solicitud.horas_aprobadas = decision.horas_aprobadas
-            solicitud.comentario_supervisor = decision.comentario_supervisor
-            solicitud.supervisor_id = current_user.id
-            solicitud.fecha_decision = datetime.utcnow()
-
-            # Si se aprueba, creamos la entrada en la tabla de validaciones
-            if solicitud.estado == EstadoSolicitudHHEE.APROBADA and solicitud.horas_aprobadas > 0:
-                tipo_validacion_map = {
-                    TipoSolicitudHHEE.ANTES_TURNO: "Antes de Turno",
-                    TipoSolicitudHHEE.DESPUES_TURNO: "Después de Turno",
-                    TipoSolicitudHHEE.DIA_DESCANSO: "Día de Descanso",
-                }
-                tipo_hhee_validacion = tipo_validacion_map.get(solicitud.tipo)
-                
-                if tipo_hhee_validacion:
-                    nueva_validacion = models.ValidacionHHEE(
-                        rut=formatear_rut(solicitud.solicitante.rut) if hasattr(solicitud.solicitante, 'rut') else "",
-                        nombre_apellido=f"{solicitud.solicitante.nombre} {solicitud.solicitante.apellido}",
-                        campaña=solicitud.solicitante.campanas_asignadas[0].nombre if solicitud.solicitante.campanas_asignadas else "General",
-                        fecha_hhee=solicitud.fecha_hhee,
-                        tipo_hhee=tipo_hhee_validacion,
-                        cantidad_hhee_aprobadas=solicitud.horas_aprobadas,
-                        estado="Validado",
-                        supervisor_carga=current_user.email,
-                        notas=f"Aprobado desde solicitud #{solicitud.id}. Comentario: {decision.comentario_supervisor or ''}".strip()
-                    )
-                    db.add(nueva_validacion)
+        # 1. Datos de las solicitudes (solo columnas) y de GeoVictoria para verificar los máximos, en paralelo
+        ruts_unicos, fecha_min, fecha_max = await hhee_solicitudes_service.ruts_de_solicitudes(
+            db, models.SolicitudHHEE.id.in_(solicitud_ids)
+        )
+        filas, mapa_datos_gv, _ = await hhee_solicitudes_service.cargar_con_gv(
+            db, hhee_solicitudes_service.consulta_para_decision(solicitud_ids),
+            ruts_unicos, fecha_min, fecha_max, escalares=False
+        )
 
+        # 2. Validación de todo el lote en una pasada
+        aceptadas, errores = hhee_solicitudes_service.validar_decisiones(
+            decisiones, {f.id: f for f in filas}, mapa_datos_gv
+        )
+        # Periodos tomados FOR SHARE hasta el commit (ya fuera de la consulta a GeoVictoria)
+        cerrados = await hhee_periodos_service.bloquear_periodos(db, {periodo_hhee(fila.fecha_hhee) for _, fila in aceptadas})
+        errores_cerrados = [
+            {"solicitud_id": fila.id, "detail": f"El periodo {periodo_hhee(fila.fecha_hhee)} está cerrado y no admite cambios."}
+            for _, fila in aceptadas if periodo_hhee(fila.fecha_hhee) in cerrados
+        ]
+        aceptadas = [(d, fila) for d, fila in aceptadas if periodo_hhee(fila.fecha_hhee) not in cerrados]
+        aceptadas, errores_conflicto = await hhee_solicitudes_service.descartar_conflictos(db, aceptadas)
+        errores = errores_duplicadas + errores + errores_cerrados + errores_conflicto
+
+        # 3. Escritura por conjuntos: decisiones, validaciones aprobadas y resumen
+        actualizadas = await hhee_solicitudes_service.aplicar_decisiones(db, aceptadas, current_user.id)
+        validaciones = hhee_solicitudes_service.validaciones_aprobadas(aceptadas, actualizadas, current_user.email)
+        if validaciones:
+            await _guardar_validaciones(db, validaciones, reemplazar_validadas=False)
+            await hhee_resumen_service.actualizar_resumen(
+                db, [(limpiar_rut(v["rut"]), v["fecha_hhee"]) for v in validaciones]
+            )
         await db.commit()
 
     except Exception as e:
         await db.rollback()
-        # Si el error ya es una HTTPException, lo relanzamos. Si no, lo envolvemos.
-        if isinstance(e, HTTPException):
-            raise e
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ocurrió un error al procesar el lote: {e}")
 
-    return {"detail": f"{len(lote_data.decisiones)} decisiones procesadas con éxito."}
+    # Decisiones que otra persona tomó mientras tanto (la fila ya no estaba pendiente al actualizar)
+    errores += [
+        {"solicitud_id": fila.id, "detail": "Esta solicitud ya ha sido procesada."}
+        for _, fila in aceptadas if fila.id not in actualizadas
+    ]
+
+    fechas_procesadas = {fila.fecha_hhee for _, fila in aceptadas if fila.id in actualizadas}
+    if fechas_procesadas:
+        await cache_respuestas.invalidar(
+            etiquetas_fechas("solicitudes", fechas_procesadas)
+            + etiquetas_fechas("validaciones", (v["fecha_hhee"] for v in validaciones))
+        )
+
+    detalle = f"{len(actualizadas)} decisiones procesadas con éxito."
+    if errores:
+        detalle += f" {len(errores)} no se procesaron."
+    return {"detail": detalle, "procesadas": len(actualizadas), "errores": errores}
 
 
 @router.get("/solicitudes/historial/", summary="[Supervisor] Ver historial de solicitudes procesadas")
@@ -1108,56 +1234,23 @@ async def obtener_historial_solicitudes(
     Devuelve un historial de solicitudes de HHEE que ya han sido APROBADAS o RECHAZADAS
     dentro de un rango de fechas, enriquecido con datos de GeoVictoria.
     """
-    # 1. Buscamos solicitudes que NO estén pendientes en el rango de fechas
-    query = select(models.SolicitudHHEE).options(
-        selectinload(models.SolicitudHHEE.solicitante),
-        selectinload(models.SolicitudHHEE.supervisor) # Incluimos quién tomó la decisión
-    ).filter(
-        models.SolicitudHHEE.estado.in_([EstadoSolicitudHHEE.APROBADA, EstadoSolicitudHHEE.RECHAZADA]),
-        models.SolicitudHHEE.fecha_hhee.between(fecha_inicio, fecha_fin)
-    ).order_by(models.SolicitudHHEE.fecha_decision.desc())
-
-    result = await db.execute(query)
-    solicitudes = result.scalars().all()
-
-    if not solicitudes:
-        return []
-
-    # 2. La lógica para enriquecer con datos de GeoVictoria es la misma que ya usamos
-    ruts_unicos = {sol.solicitante.rut.replace('-', '').replace('.', '').upper() for sol in solicitudes if hasattr(sol.solicitante, 'rut') and sol.solicitante.rut}
-    
-    fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
-    fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
-    
-    datos_gv_lista = []
-    if ruts_unicos:
-        token = await geovictoria_service.obtener_token_geovictoria()
-        if token:
-            datos_gv_lista = await geovictoria_service.obtener_datos_completos_periodo(
-                token, list(ruts_unicos), fecha_inicio_dt, fecha_fin_dt
-            )
-
-    datos_gv_procesados = [{**dia, **geovictoria_service.aplicar_logica_de_negocio(dia)} for dia in datos_gv_lista]
-    mapa_datos_gv = {(item['rut_limpio'], item['fecha']): item for item in datos_gv_procesados}
-    
-    # 3. Unimos los datos para la respuesta
-    respuesta_enriquecida = []
-    for sol in solicitudes:
-        rut_limpio_solicitud = sol.solicitante.rut.replace('-', '').replace('.', '').upper() if hasattr(sol.solicitante, 'rut') and sol.solicitante.rut else None
-        fecha_str_solicitud = sol.fecha_hhee.strftime('%Y-%m-%d')
-        datos_gv_del_dia = mapa_datos_gv.get((rut_limpio_solicitud, fecha_str_solicitud), {})
-        
-        solicitud_dict = SolicitudHHEE.model_validate(sol).model_dump()
-        solicitud_dict['datos_geovictoria'] = datos_gv_del_dia
-        respuesta_enriquecida.append(solicitud_dict)
-
-    return respuesta_enriquecida
+    # Solicitudes que NO están pendientes en el rango, con quién tomó la decisión
+    return await hhee_solicitudes_service.solicitudes_enriquecidas(
+        db,
+        filtros=[
+            models.SolicitudHHEE.estado.in_([EstadoSolicitudHHEE.APROBADA, EstadoSolicitudHHEE.RECHAZADA]),
+            hhee_periodos_service.filtro_fechas(models.SolicitudHHEE, fecha_inicio, fecha_fin)
+        ],
+        orden=[models.SolicitudHHEE.fecha_decision.desc()],
+        opciones=[selectinload(models.SolicitudHHEE.solicitante), selectinload(models.SolicitudHHEE.supervisor)],
+        inicio=fecha_inicio,
+        fin=fecha_fin
+    )
 
 
 @router.post("/exportar-y-marcar-rrhh", summary="[GTR] Exporta para RRHH y marca registros como enviados")
 async def exportar_y_marcar_rrhh(
     request: ExportRequest, # Reutilizamos el mismo modelo de solicitud
-    db: AsyncSession = Depends(get_db),
     current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
 ):
     """
@@ -1165,58 +1258,40 @@ async def exportar_y_marcar_rrhh(
     como 'reportado_a_rrhh = true' y guarda quién y cuándo lo hizo.
     Esta es una acción final y solo para roles GTR.
     """
+    # 1. Una sola sentencia marca los registros y devuelve sus columnas (UPDATE ... RETURNING),
+    #    leída con un cursor del servidor. Sin lista de IDs y sin doble exportación concurrente.
+    query = hhee_exportacion.consulta_marcar_rrhh(request.fecha_inicio, request.fecha_fin, current_user.id)
+    fuente = exportacion_service.FuenteFilas(query)
     try:
-        # 1. Buscamos los registros que cumplen las condiciones (igual que antes)
-        query = select(models.ValidacionHHEE).filter(
-            models.ValidacionHHEE.estado == 'Validado',
-            models.ValidacionHHEE.fecha_hhee.between(request.fecha_inicio, request.fecha_fin),
-            models.ValidacionHHEE.reportado_a_rrhh == False
-        ).order_by(models.ValidacionHHEE.rut, models.ValidacionHHEE.fecha_hhee)
-        
-        result = await db.execute(query)
-        validaciones = result.scalars().all()
-
-        if not validaciones:
+        if not await fuente.abrir():
             raise HTTPException(status_code=404, detail="No se encontraron HHEE nuevas para reportar a RRHH en el período seleccionado.")
 
-        # 2. Generamos los datos para el Excel (lógica sin cambios)
-        permiso_map = {"Antes de Turno": 10, "Después de Turno": 5, "Día de Descanso": 10}
-        datos_para_excel = [{
-            "Cod Funcionario": v.rut, "Nombre": v.nombre_apellido,
-            "Num Permiso": permiso_map.get(v.tipo_hhee, ''),
-            "Fecha Inicio": v.fecha_hhee.strftime('%d/%m/%Y'),
-            "Fecha Fin": v.fecha_hhee.strftime('%d/%m/%Y'),
-            "Cant Horas": decimal_to_hhmm(v.cantidad_hhee_aprobadas)
-        } for v in validaciones]
-
-        df = pd.DataFrame(datos_para_excel)
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Reporte RRHH')
-        output.seek(0)
-        
-        # 3. Actualizamos la bandera y los nuevos campos en la base de datos
-        ids_a_actualizar = [v.id for v in validaciones]
-        if ids_a_actualizar:
-            update_stmt = update(models.ValidacionHHEE).where(
-                models.ValidacionHHEE.id.in_(ids_a_actualizar)
-            ).values(
-                reportado_a_rrhh=True,
-                reportado_por_id=current_user.id,
-                fecha_reportado=func.now() # La base de datos pone la hora actual
-            )
-            await db.execute(update_stmt)
-            await db.commit()
+        # 2. Escribimos el archivo a medida que llegan las filas devueltas
+        archivo = await exportacion_service.generar_archivo(
+            request.archivo, hhee_exportacion.COLUMNAS_RRHH,
+            exportacion_service.formatear(fuente.particiones(cerrar_al_terminar=False), hhee_exportacion.fila_rrhh),
+            'Reporte RRHH'
+        )
+
+        # 3. Con el archivo completo se confirma la marca; si algo falló antes, se revierte
+        try:
+            await fuente.sesion.commit()
+        except Exception:
+            archivo.close()
+            raise
 
-        # 4. Devolvemos el archivo Excel al usuario
-        headers = {'Content-Disposition': f'attachment; filename="REPORTE_FINAL_RRHH_{request.fecha_inicio}_a_{request.fecha_fin}.xlsx"'}
-        return StreamingResponse(output, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers=headers)
+        # 4. Devolvemos el archivo al usuario
+        headers = exportacion_service.encabezados_descarga(f"REPORTE_FINAL_RRHH_{request.fecha_inicio}_a_{request.fecha_fin}", request.archivo)
+        return StreamingResponse(exportacion_service.transmitir_archivo(archivo), media_type=exportacion_service.MEDIA_TYPES[request.archivo], headers=headers)
         
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        await db.rollback()
+        if fuente.sesion:
+            await fuente.sesion.rollback()
         raise HTTPException(status_code=500, detail=f"Ocurrió un error inesperado: {e}")
+    finally:
+        await fuente.cerrar()
     
 class ConfirmacionEnvio(BaseModel):
     fecha_inicio: date
@@ -1264,8 +1339,73 @@ async def obtener_ids_pendientes_rrhh(
     """
     query = select(models.ValidacionHHEE.id).filter(
         models.ValidacionHHEE.estado == 'Validado',
-        models.ValidacionHHEE.fecha_hhee.between(fecha_inicio, fecha_fin),
+        hhee_periodos_service.filtro_fechas(models.ValidacionHHEE, fecha_inicio, fecha_fin),
         models.ValidacionHHEE.reportado_a_rrhh == False
     )
     result = await db.execute(query)
     return result.scalars().all()
+
+@router.get("/periodos", summary="[GTR] Lista los periodos de HHEE y si están cerrados")
+async def listar_periodos_hhee(
+    limite: int = Query(24, ge=1, le=120),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.SUPERVISOR_OPERACIONES], use_simple_auth=True))
+):
+    periodos = await hhee_periodos_service.listar_periodos(db, limite)
+    return [
+        {
+            "periodo": p.id,
+            "fecha_inicio": p.fecha_inicio,
+            "fecha_fin": p.fecha_fin,
+            "cerrado": p.cerrado,
+            "fecha_cierre": p.fecha_cierre,
+            "cerrado_por_id": p.cerrado_por_id
+        } for p in periodos
+    ]
+
+@router.post("/periodos/{periodo}/cerrar", summary="[GTR] Cierra un periodo de HHEE ya reportado a RRHH y congela sus números")
+async def cerrar_periodo_hhee(
+    periodo: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE], use_simple_auth=True))
+):
+    """
+    Guarda la foto final del periodo (totales por empleado, campaña y tipo, totales RRHH de
+    GeoVictoria y detalle para re-exportar). Desde entonces el dashboard y la exportación de
+    Operaciones del periodo no consultan GeoVictoria, y el periodo no admite más cambios.
+    """
+    if not 190001 <= periodo <= 999912 or not 1 <= periodo % 100 <= 12:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El periodo debe tener formato YYYYMM.")
+    if not await geovictoria_service.puede_consultar_asistencia():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="No se pudo conectar con GeoVictoria.")
+
+    try:
+        resultado = await hhee_cierre_service.cerrar_periodo(db, periodo, current_user.id)
+    except CierrePeriodoError as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Ocurrió un error al cerrar el periodo: {e}")
+
+    # Las respuestas cacheadas del periodo se rearman desde la foto (y con TTL largo)
+    await cache_respuestas.invalidar([f"validaciones:{periodo}", f"solicitudes:{periodo}"])
+    return resultado
+
+@router.get("/geovictoria/estadisticas", summary="[GTR] Estadísticas de la caché de asistencia y del limitador de GeoVictoria")
+async def obtener_estadisticas_geovictoria(
+    current_user: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE], use_simple_auth=True))
+):
+    """
+    Devuelve los contadores de aciertos y fallos de la caché de asistencia,
+    para medir cuánto tráfico hacia GeoVictoria se está evitando, y el estado
+    actual del limitador adaptativo (tasa, concurrencia y cola).
+    """
+    return {
+        "cache_asistencia": asistencia_cache_service.obtener_estadisticas_cache(),
+        "limitador": limitador_gv.estado(),
+        "circuito": circuito_gv.estado(),
+        "planificador": geovictoria_service.estadisticas_planificador,
+        "coalescencia": coalescedor_gv.estadisticas,
+        "cache_respuestas": cache_respuestas.estado()
+    }
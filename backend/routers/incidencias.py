@@ -14,6 +14,9 @@ from ..sql_app import models
 from ..enums import UserRole, EstadoIncidencia
 from ..dependencies import get_current_analista, require_role
 from ..services.incidencia_service import IncidenciaService
+from ..services import reportes_exportacion
+from ..services.exportacion_service import FormatoArchivo
+from ..services.exportacion_trabajos import gestor_exportaciones, ColaExportacionLlenaError
 from ..schemas.models import (
     Incidencia, IncidenciaCreate, IncidenciaUpdate, IncidenciaSimple,
     IncidenciaEstadoUpdate, ActualizacionIncidencia, ActualizacionIncidenciaBase,
@@ -318,28 +321,7 @@ async def exportar_incidencias(
     db: AsyncSession = Depends(get_db),
     current_analista: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.ANALISTA]))
 ):
-    query = select(models.Incidencia).options(
-        selectinload(models.Incidencia.campana),
-        selectinload(models.Incidencia.lobs),
-        selectinload(models.Incidencia.creador),
-        selectinload(models.Incidencia.asignado_a),
-        selectinload(models.Incidencia.cerrado_por),
-        selectinload(models.Incidencia.actualizaciones)
-    ).order_by(models.Incidencia.fecha_apertura.desc())
-
-    if filtros.fecha_inicio:
-        query = query.filter(models.Incidencia.fecha_apertura >= datetime.combine(filtros.fecha_inicio, time.min))
-    if filtros.fecha_fin:
-        query = query.filter(models.Incidencia.fecha_apertura <= datetime.combine(filtros.fecha_fin, time.max))
-    if filtros.campana_id:
-        query = query.filter(models.Incidencia.campana_id == filtros.campana_id)
-    if filtros.estado:
-        query = query.filter(models.Incidencia.estado == filtros.estado)
-    if filtros.asignado_a_id is not None:
-        if filtros.asignado_a_id == 0:
-            query = query.filter(models.Incidencia.asignado_a_id.is_(None))
-        else:
-            query = query.filter(models.Incidencia.asignado_a_id == filtros.asignado_a_id)
+    query = reportes_exportacion.consulta_incidencias(filtros)
             
     result = await db.execute(query)
     incidencias = result.scalars().unique().all()
@@ -347,42 +329,7 @@ async def exportar_incidencias(
     if not incidencias:
         raise HTTPException(status_code=404, detail="No se encontraron incidencias con los filtros seleccionados.")
 
-    datos_para_excel = []
-    for inc in incidencias:
-        comentario_cierre = "N/A"
-        if inc.estado == EstadoIncidencia.CERRADA:
-            # Ordenamos asegurando que todas las fechas sean comparables (aware) y manejando None
-            def safe_date(d):
-                if not d:
-                    return datetime(1970, 1, 1, tzinfo=timezone.utc)
-                if d.tzinfo is None:
-                    return d.replace(tzinfo=timezone.utc)
-                return d
-
-            actualizaciones_ordenadas = sorted(
-                inc.actualizaciones, 
-                key=lambda x: safe_date(x.fecha_actualizacion), 
-                reverse=True
-            )
-            for act in actualizaciones_ordenadas:
-                if "Comentario de Cierre: " in act.comentario:
-                    comentario_cierre = act.comentario.split("Comentario de Cierre: ")[1]
-                    break
-
-        datos_para_excel.append({
-            "ID": inc.id,
-            "Titulo": inc.titulo,
-            "Campaña": inc.campana.nombre if inc.campana else "N/A",
-            "LOBs": ", ".join([lob.nombre for lob in inc.lobs]) if inc.lobs else "N/A",
-            "Gravedad": inc.gravedad.value if inc.gravedad else "N/A",
-            "Estado": inc.estado.value if inc.estado else "N/A",
-            "Creador": f"{inc.creador.nombre} {inc.creador.apellido}" if inc.creador else "N/A",
-            "Asignado a": f"{inc.asignado_a.nombre} {inc.asignado_a.apellido}" if inc.asignado_a else "Sin Asignar",
-            "Cerrado por": f"{inc.cerrado_por.nombre} {inc.cerrado_por.apellido}" if inc.cerrado_por else "N/A",
-            "Fecha Apertura": inc.fecha_apertura.strftime("%d-%m-%Y %H:%M") if inc.fecha_apertura else "N/A",
-            "Fecha Cierre": inc.fecha_cierre.strftime("%d-%m-%Y %H:%M") if inc.fecha_cierre else "N/A",
-            "Comentario de Cierre": comentario_cierre
-        })
+    datos_para_excel = [reportes_exportacion.fila_incidencia(inc) for inc in incidencias]
     
     df = pd.DataFrame(datos_para_excel)
     output = io.BytesIO()
@@ -395,3 +342,20 @@ async def exportar_incidencias(
     }
     
     return StreamingResponse(output, headers=headers, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+@router.post("/incidencias/exportar/trabajos/", status_code=status.HTTP_202_ACCEPTED, summary="Encola la exportación de incidencias y devuelve el id del trabajo")
+async def encolar_exportacion_incidencias(
+    filtros: IncidenciaExportFilters,
+    current_analista: models.Analista = Depends(require_role([UserRole.SUPERVISOR, UserRole.RESPONSABLE, UserRole.ANALISTA]))
+):
+    try:
+        trabajo = await gestor_exportaciones.encolar(
+            "incidencias", filtros.model_dump(mode="json"), None, current_analista.id,
+            FormatoArchivo.XLSX, f"Reporte_Incidencias_{date.today().isoformat()}",
+            lambda t: reportes_exportacion.producir_incidencias(t, filtros)
+        )
+    except ColaExportacionLlenaError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return trabajo.a_dict()
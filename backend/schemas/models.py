@@ -544,6 +544,10 @@ class DashboardHHEEMetricas(BaseModel):
     empleado_top: Optional[MetricasPorEmpleado] = None # Lo dejo opcional por compatibilidad, pero por ahora no lo voy a usar en el frontend
     desglose_por_empleado: List[MetricasPorEmpleado]
     desglose_por_campana: List[MetricasPorCampana]
+
+    # Estado de los totales RRHH (GeoVictoria): si no se pudieron obtener o vienen de la caché vencida
+    rrhh_disponible: bool = True
+    antiguedad_rrhh_seg: Optional[int] = None
     
 class MetricasPendientesHHEE(BaseModel):
     total_pendientes: int
@@ -0,0 +1,502 @@
+# /backend/services/asistencia_cache_service.py
+"""
+Caché persistente de asistencia de GeoVictoria por (rut_limpio, fecha).
+
+Los días cerrados (anteriores a la ventana "abierta") se sirven desde la tabla
+`asistencia_diaria_gv` mientras no superen el TTL configurado, o sin vencimiento si
+su periodo de HHEE ya está cerrado (asentados): RRHH autoriza horas hasta el final del
+periodo, así que antes de eso ningún día deja de cambiar. Solo los días que faltan, están
+vencidos, marcados como sucios o siguen abiertos se piden a la API.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, date, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..database import AsyncSessionLocal
+from ..sql_app import models
+from ..utils import limpiar_rut, periodo_hhee
+from . import geovictoria_service, hhee_periodos_service
+from .geovictoria_parser import DiaAsistencia
+from .geovictoria_circuito import circuito_gv, CircuitoAbiertoError
+
+
+# TTL de un día cerrado dentro de la caché (en horas)
+CACHE_TTL_HORAS = float(os.getenv("GV_CACHE_TTL_HORAS", "24"))
+# Cantidad de días (contando hoy) que se consideran abiertos y siempre se consultan a la API
+DIAS_ABIERTOS = int(os.getenv("GV_CACHE_DIAS_ABIERTOS", "2"))
+# Vigencia de los totales consolidados guardados (en horas); el job nocturno los renueva
+CONSOLIDADO_TTL_HORAS = float(os.getenv("GV_CONSOLIDADO_TTL_HORAS", "24"))
+# Tamaño de los lotes de escritura en la caché
+UPSERT_BATCH_SIZE = 1000
+
+# Contadores expuestos en /hhee/geovictoria/estadisticas (por día-RUT)
+estadisticas_cache = {
+    "hits": 0,
+    "misses": 0,
+    "consultas_api": 0,
+    "errores_cache": 0,
+    "consolidados_hits": 0,
+    "consolidados_misses": 0,
+    "servidos_desactualizados": 0,
+}
+
+# Resultado de la última corrida del precalentamiento nocturno (lo completa jobs.py)
+ultimo_precalentamiento: Dict[str, Any] = {}
+
+ESTADO_PENDIENTE_CORRECCION = 'Pendiente por Corrección'
+
+
+def obtener_estadisticas_cache() -> Dict[str, Any]:
+    total = estadisticas_cache["hits"] + estadisticas_cache["misses"]
+    return {
+        **estadisticas_cache,
+        "tasa_aciertos": round(estadisticas_cache["hits"] / total, 4) if total else 0,
+        "ttl_horas": CACHE_TTL_HORAS,
+        "dias_abiertos": DIAS_ABIERTOS,
+        "ultimo_precalentamiento": ultimo_precalentamiento or None,
+    }
+
+
+def dia_esta_abierto(fecha: date, hoy: date = None) -> bool:
+    """Un día está abierto si cae dentro de los últimos DIAS_ABIERTOS (incluido hoy) o en el futuro."""
+    hoy = hoy or date.today()
+    return fecha > hoy - timedelta(days=DIAS_ABIERTOS)
+
+
+def dia_esta_asentado(fila: models.AsistenciaDiariaGV, periodos_cerrados: set) -> bool:
+    """
+    El periodo de HHEE del día ya está cerrado, así que GeoVictoria no debería cambiarlo.
+    Mientras el periodo siga abierto RRHH puede autorizar horas de cualquiera de sus días.
+    """
+    return fila.fecha_actualizacion is not None and periodo_hhee(fila.fecha) in periodos_cerrados
+
+
+def _fila_a_dict(fila: models.AsistenciaDiariaGV) -> Dict[str, Any]:
+    """Reconstruye el mismo diccionario que devuelve obtener_datos_completos_periodo."""
+    return {
+        "fecha": fila.fecha.strftime('%Y-%m-%d'),
+        "nombre_apellido": fila.nombre_apellido or "",
+        "rut_limpio": fila.rut_limpio,
+        "rut": fila.rut_limpio,
+        "campaña": fila.campaña,
+        "inicio_turno_teorico": fila.inicio_turno_teorico,
+        "fin_turno_teorico": fila.fin_turno_teorico,
+        "marca_real_inicio": fila.marca_real_inicio,
+        "marca_real_fin": fila.marca_real_fin,
+        "hhee_autorizadas_antes_gv": fila.hhee_autorizadas_antes_gv or 0,
+        "hhee_autorizadas_despues_gv": fila.hhee_autorizadas_despues_gv or 0,
+        "permisos": fila.permisos or [],
+    }
+
+
+def _fila_desactualizada(fila: models.AsistenciaDiariaGV, ahora: datetime) -> Dict[str, Any]:
+    """Día servido desde la caché aunque no esté vigente (GeoVictoria no respondió), con su antigüedad."""
+    dia = _fila_a_dict(fila)
+    dia["desactualizado"] = True
+    dia["antiguedad_seg"] = round((ahora - fila.fecha_actualizacion).total_seconds())
+    return dia
+
+
+def _tiene_datos(fila) -> bool:
+    # Las filas creadas solo para marcar un día como sucio no traen datos de GeoVictoria
+    return fila is not None and fila.nombre_apellido is not None and fila.fecha_actualizacion is not None
+
+
+def _registro_a_valores(dia: DiaAsistencia, ahora: datetime) -> Dict[str, Any]:
+    return {
+        "rut_limpio": dia.rut_limpio,
+        "fecha": date.fromisoformat(dia.fecha),
+        "nombre_apellido": dia.nombre_apellido,
+        "campaña": dia.campaña,
+        "inicio_turno_teorico": dia.inicio_turno_teorico,
+        "fin_turno_teorico": dia.fin_turno_teorico,
+        "marca_real_inicio": dia.marca_real_inicio,
+        "marca_real_fin": dia.marca_real_fin,
+        "hhee_autorizadas_antes_gv": dia.hhee_autorizadas_antes_gv or 0,
+        "hhee_autorizadas_despues_gv": dia.hhee_autorizadas_despues_gv or 0,
+        "permisos": dia.permisos or [],
+        "sucio": False,
+        "fecha_actualizacion": ahora,
+    }
+
+
+async def _leer_cache(ruts_limpios: List[str], inicio: date, fin: date) -> Tuple[Dict[tuple, models.AsistenciaDiariaGV], set]:
+    """(filas por (rut, fecha), periodos cerrados del rango)."""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.AsistenciaDiariaGV).filter(
+                models.AsistenciaDiariaGV.rut_limpio.in_(ruts_limpios),
+                models.AsistenciaDiariaGV.fecha.between(inicio, fin)
+            )
+        )
+        cache = {(f.rut_limpio, f.fecha): f for f in result.scalars().all()}
+        cerrados = await hhee_periodos_service.periodos_cerrados(db, hhee_periodos_service.periodos_del_rango(inicio, fin))
+        return cache, cerrados
+
+
+async def guardar_en_cache(dias: List[DiaAsistencia]):
+    """Inserta o actualiza en la caché los días recibidos desde GeoVictoria."""
+    if not dias:
+        return
+    ahora = datetime.now(timezone.utc)
+    # Deduplicamos por (rut, fecha) para no chocar dos veces con la misma fila en un mismo INSERT
+    valores = list({(d.rut_limpio, d.fecha): _registro_a_valores(d, ahora) for d in dias}.values())
+
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(valores), UPSERT_BATCH_SIZE):
+            lote = valores[i:i + UPSERT_BATCH_SIZE]
+            stmt = pg_insert(models.AsistenciaDiariaGV).values(lote)
+            columnas_actualizables = {
+                col: stmt.excluded[col] for col in lote[0].keys() if col not in ("rut_limpio", "fecha")
+            }
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_asistencia_gv_rut_fecha",
+                set_=columnas_actualizables
+            )
+            await db.execute(stmt)
+        await db.commit()
+
+
+async def _consultar_faltantes(faltantes_por_rut: Dict[str, List[date]]) -> List[DiaAsistencia]:
+    """Pide a GeoVictoria los días faltantes de cada RUT y los guarda en la caché."""
+    # Cada RUT se parte en tramos de días consecutivos (solo se piden los huecos reales)
+    # y los RUTs con el mismo tramo se piden juntos
+    grupos = {}
+    for rut, dias in faltantes_por_rut.items():
+        for tramo in _tramos_consecutivos(dias):
+            grupos.setdefault(tramo, []).append(rut)
+    return await _consultar_grupos(grupos)
+
+
+def _tramos_consecutivos(dias: List[date]) -> List[tuple]:
+    """[(desde, hasta)] de los días agrupados en rangos sin huecos."""
+    tramos = []
+    for dia in sorted(set(dias)):
+        if tramos and dia - tramos[-1][1] == timedelta(days=1):
+            tramos[-1] = (tramos[-1][0], dia)
+        else:
+            tramos.append((dia, dia))
+    return tramos
+
+
+async def _consultar_grupos(grupos: Dict[tuple, List[str]]) -> List[DiaAsistencia]:
+    """
+    Consulta los grupos {(desde, hasta): [ruts]} a GeoVictoria en paralelo (la concurrencia
+    real la regula el limitador global) y guarda lo recibido en la caché.
+    """
+    async def consultar(desde: date, hasta: date, ruts_grupo: List[str]) -> List[DiaAsistencia]:
+        estadisticas_cache["consultas_api"] += 1
+        dias_api = await geovictoria_service.obtener_registros_periodo(
+            ruts_grupo,
+            datetime.combine(desde, datetime.min.time()),
+            datetime.combine(hasta, datetime.max.time())
+        )
+        try:
+            await guardar_en_cache(dias_api)
+        except Exception as e:
+            estadisticas_cache["errores_cache"] += 1
+            print(f"ADVERTENCIA: No se pudo guardar la asistencia GV en caché: {e}")
+        return dias_api
+
+    resultados = await asyncio.gather(
+        *(consultar(desde, hasta, ruts_grupo) for (desde, hasta), ruts_grupo in grupos.items())
+    )
+    return [dia for dias_api in resultados for dia in dias_api]
+
+
+async def obtener_datos_periodo(ruts_limpios: List[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime, forzar: bool = False) -> List[Dict[str, Any]]:
+    """
+    Reemplazo con caché de geovictoria_service.obtener_datos_completos_periodo.
+    Devuelve la misma estructura (una lista de días por RUT), ordenada por RUT y fecha.
+    Con `forzar` todos los días se piden a la API; la caché solo cubre lo que GeoVictoria
+    no devuelva (marcado como desactualizado).
+    """
+    ruts_limpios = list(dict.fromkeys(limpiar_rut(r) for r in ruts_limpios if r))
+    if not ruts_limpios:
+        return []
+
+    inicio = fecha_inicio_dt.date()
+    fin = fecha_fin_dt.date()
+    hoy = date.today()
+    ahora = datetime.now(timezone.utc)
+    ttl = timedelta(hours=CACHE_TTL_HORAS)
+    dias_rango = [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)]
+
+    try:
+        cache, cerrados = await _leer_cache(ruts_limpios, inicio, fin)
+    except Exception as e:
+        estadisticas_cache["errores_cache"] += 1
+        print(f"ADVERTENCIA: No se pudo leer la caché de asistencia GV: {e}")
+        cache, cerrados = {}, set()
+
+    resultado = {}
+    faltantes_por_rut = {}
+    for rut in ruts_limpios:
+        for dia in dias_rango:
+            fila = cache.get((rut, dia))
+            vigente = (
+                not forzar
+                and fila is not None
+                and not fila.sucio
+                and not dia_esta_abierto(dia, hoy)
+                and fila.fecha_actualizacion is not None
+                and (dia_esta_asentado(fila, cerrados) or ahora - fila.fecha_actualizacion <= ttl)
+            )
+            if vigente:
+                estadisticas_cache["hits"] += 1
+                resultado[(rut, dia)] = _fila_a_dict(fila)
+            else:
+                estadisticas_cache["misses"] += 1
+                faltantes_por_rut.setdefault(rut, []).append(dia)
+
+    try:
+        registros = await _consultar_faltantes(faltantes_por_rut)
+    except CircuitoAbiertoError:
+        # GeoVictoria no está respondiendo: se refresca en segundo plano cuando el circuito se semiabra
+        registros = []
+        pendientes = {rut: list(dias) for rut, dias in faltantes_por_rut.items()}
+        clave = ("asistencia", inicio, fin, tuple(sorted(pendientes)))
+        circuito_gv.programar_refresco(clave, lambda: _consultar_faltantes(pendientes))
+
+    for d in registros:
+        fecha_dia = date.fromisoformat(d.fecha)
+        if inicio <= fecha_dia <= fin:
+            resultado[(d.rut_limpio, fecha_dia)] = d.a_dict()
+
+    # Lo que GeoVictoria no devolvió se sirve desde la caché vencida, marcado con su antigüedad
+    for rut, dias in faltantes_por_rut.items():
+        for dia in dias:
+            fila = cache.get((rut, dia))
+            if (rut, dia) not in resultado and _tiene_datos(fila):
+                estadisticas_cache["servidos_desactualizados"] += 1
+                resultado[(rut, dia)] = _fila_desactualizada(fila, ahora)
+
+    orden_rut = {rut: i for i, rut in enumerate(ruts_limpios)}
+    claves = sorted(resultado.keys(), key=lambda k: (orden_rut.get(k[0], len(orden_rut)), k[1]))
+    return [resultado[k] for k in claves]
+
+
+# --- SINCRONIZACIÓN INCREMENTAL ---
+
+async def marcar_dias_sucios(pares: List[tuple]):
+    """
+    Marca (rut, fecha) como sucios para que la próxima lectura o sincronización los vuelva a pedir.
+    Se usa, por ejemplo, cuando un día queda 'Pendiente por Corrección' porque se están arreglando marcas.
+    """
+    valores = list({
+        (limpiar_rut(rut), fecha): {"rut_limpio": limpiar_rut(rut), "fecha": fecha, "sucio": True}
+        for rut, fecha in pares if rut and fecha
+    }.values())
+    if not valores:
+        return
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(valores), UPSERT_BATCH_SIZE):
+            stmt = pg_insert(models.AsistenciaDiariaGV).values(valores[i:i + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(constraint="uq_asistencia_gv_rut_fecha", set_={"sucio": True})
+            await db.execute(stmt)
+        await db.commit()
+
+
+async def _dias_a_resincronizar(db, ruts_limpios: List[str], desde: date, hasta: date) -> Dict[str, set]:
+    """Días marcados como sucios más los que siguen 'Pendiente por Corrección', por RUT."""
+    por_rut: Dict[str, set] = {}
+    result = await db.execute(
+        select(models.AsistenciaDiariaGV.rut_limpio, models.AsistenciaDiariaGV.fecha).filter(
+            models.AsistenciaDiariaGV.rut_limpio.in_(ruts_limpios),
+            models.AsistenciaDiariaGV.sucio == True,
+            models.AsistenciaDiariaGV.fecha.between(desde, hasta)
+        )
+    )
+    for rut, fecha in result.all():
+        por_rut.setdefault(rut, set()).add(fecha)
+
+    result = await db.execute(
+        select(models.ValidacionHHEE.rut_limpio, models.ValidacionHHEE.fecha_hhee).distinct().filter(
+            models.ValidacionHHEE.rut_limpio.in_(ruts_limpios),
+            models.ValidacionHHEE.estado == ESTADO_PENDIENTE_CORRECCION,
+            models.ValidacionHHEE.fecha_hhee.between(desde, hasta)
+        )
+    )
+    for rut, fecha in result.all():
+        por_rut.setdefault(rut, set()).add(fecha)
+    return por_rut
+
+
+async def sincronizar_delta(ruts_limpios: List[str], desde: date, hasta: date) -> Dict[str, int]:
+    """
+    Sincronización incremental: por cada RUT pide solo la ventana posterior a su último día asentado
+    (o desde `desde` si nunca se sincronizó) más los días sucios o pendientes de corrección.
+    Un día solo se asienta cuando su periodo de HHEE está cerrado, así que los periodos abiertos
+    del rango se vuelven a pedir completos en cada corrida.
+    El resultado se guarda en asistencia_diaria_gv y avanza la fecha asentada y la marca de agua.
+    """
+    ruts_limpios = list(dict.fromkeys(limpiar_rut(r) for r in ruts_limpios if r))
+    if not ruts_limpios or hasta < desde:
+        return {"ruts": 0, "dias_consultados": 0, "dias_sucios": 0, "dias_recibidos": 0}
+
+    hoy = date.today()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.SincronizacionGV).filter(models.SincronizacionGV.rut_limpio.in_(ruts_limpios))
+        )
+        estado_por_rut = {e.rut_limpio: e for e in result.scalars().all()}
+        sucios_por_rut = await _dias_a_resincronizar(db, ruts_limpios, desde, hasta)
+        primer_abierto = await hhee_periodos_service.primer_dia_abierto(db, desde, hasta)
+
+    # Último día que ya no puede cambiar al terminar esta sincronización: ni abierto ni en un periodo sin cerrar
+    asentable = min(hasta, hoy - timedelta(days=DIAS_ABIERTOS))
+    if primer_abierto:
+        asentable = min(asentable, primer_abierto - timedelta(days=1))
+
+    # Ventana final no asentada: se agrupan los RUTs que comparten el mismo inicio
+    grupos: Dict[tuple, List[str]] = {}
+    ventana_por_rut = {}
+    for rut in ruts_limpios:
+        estado = estado_por_rut.get(rut)
+        inicio = desde
+        if estado and estado.fecha_asentada and estado.fecha_asentada >= desde:
+            inicio = estado.fecha_asentada + timedelta(days=1)
+        if primer_abierto:
+            inicio = min(inicio, primer_abierto)
+        if inicio <= hasta:
+            ventana_por_rut[rut] = inicio
+            grupos.setdefault((inicio, hasta), []).append(rut)
+
+    # Días sucios que quedan fuera de la ventana: se piden de a un día, todos los RUTs juntos
+    dias_sucios = 0
+    for rut, fechas in sucios_por_rut.items():
+        for fecha in fechas:
+            if fecha < ventana_por_rut.get(rut, hasta + timedelta(days=1)):
+                dias_sucios += 1
+                grupos.setdefault((fecha, fecha), []).append(rut)
+
+    registros = await _consultar_grupos(grupos)
+
+    # Solo avanza la fecha asentada de los RUTs que efectivamente devolvió GeoVictoria
+    ruts_recibidos = {d.rut_limpio for d in registros}
+    ahora = datetime.now(timezone.utc)
+    valores = []
+    for rut in ruts_limpios:
+        if rut not in ruts_recibidos and rut in ventana_por_rut:
+            continue
+        anterior = estado_por_rut.get(rut)
+        fecha_asentada = asentable
+        # Se conserva una fecha asentada posterior (de una corrida más amplia) si su periodo sigue cerrado
+        if anterior and anterior.fecha_asentada and anterior.fecha_asentada > asentable \
+                and not (primer_abierto and anterior.fecha_asentada >= primer_abierto):
+            fecha_asentada = anterior.fecha_asentada
+        valores.append({"rut_limpio": rut, "fecha_asentada": fecha_asentada, "marca_agua": ahora})
+
+    if valores:
+        async with AsyncSessionLocal() as db:
+            for i in range(0, len(valores), UPSERT_BATCH_SIZE):
+                stmt = pg_insert(models.SincronizacionGV).values(valores[i:i + UPSERT_BATCH_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["rut_limpio"],
+                    set_={"fecha_asentada": stmt.excluded.fecha_asentada, "marca_agua": stmt.excluded.marca_agua}
+                )
+                await db.execute(stmt)
+            await db.commit()
+
+    return {
+        "ruts": len(ruts_limpios),
+        "dias_consultados": sum(((h - d).days + 1) * len(r) for (d, h), r in grupos.items()),
+        "dias_sucios": dias_sucios,
+        "dias_recibidos": len(registros),
+    }
+
+
+# --- TOTALES CONSOLIDADOS ---
+
+async def guardar_consolidados(totales: Dict[str, float], inicio: date, fin: date):
+    if not totales:
+        return
+    ahora = datetime.now(timezone.utc)
+    valores = [
+        {"rut_limpio": rut, "fecha_inicio": inicio, "fecha_fin": fin, "total_hhee": total or 0, "fecha_actualizacion": ahora}
+        for rut, total in totales.items()
+    ]
+    async with AsyncSessionLocal() as db:
+        for i in range(0, len(valores), UPSERT_BATCH_SIZE):
+            stmt = pg_insert(models.ConsolidadoGV).values(valores[i:i + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_consolidado_gv_rut_rango",
+                set_={"total_hhee": stmt.excluded.total_hhee, "fecha_actualizacion": stmt.excluded.fecha_actualizacion}
+            )
+            await db.execute(stmt)
+        await db.commit()
+
+
+async def _consultar_consolidados(ruts_limpios: List[str], inicio: date, fin: date) -> Dict[str, float]:
+    nuevos = await geovictoria_service.obtener_datos_consolidados(
+        ruts_limpios,
+        datetime.combine(inicio, datetime.min.time()),
+        datetime.combine(fin, datetime.max.time())
+    )
+    try:
+        await guardar_consolidados(nuevos, inicio, fin)
+    except Exception as e:
+        estadisticas_cache["errores_cache"] += 1
+        print(f"ADVERTENCIA: No se pudieron guardar los consolidados: {e}")
+    return nuevos
+
+
+async def obtener_consolidados(ruts_limpios: List[str], inicio: date, fin: date, forzar: bool = False) -> Tuple[Dict[str, float], Optional[int]]:
+    """
+    Totales HHEE del rango por RUT (endpoint Consolidated). Se sirven desde `consolidado_gv`
+    mientras estén vigentes; solo los RUTs sin total guardado se piden a la API.
+    Devuelve (totales, antigüedad en segundos del dato más viejo servido vencido, o None si todo está vigente).
+    """
+    ruts_limpios = list(dict.fromkeys(limpiar_rut(r) for r in ruts_limpios if r))
+    if not ruts_limpios:
+        return {}, None
+
+    ahora = datetime.now(timezone.utc)
+    limite = ahora - timedelta(hours=CONSOLIDADO_TTL_HORAS)
+    guardados = {}
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.ConsolidadoGV).filter(
+                    models.ConsolidadoGV.rut_limpio.in_(ruts_limpios),
+                    models.ConsolidadoGV.fecha_inicio == inicio,
+                    models.ConsolidadoGV.fecha_fin == fin
+                )
+            )
+            guardados = {f.rut_limpio: f for f in result.scalars().all()}
+    except Exception as e:
+        estadisticas_cache["errores_cache"] += 1
+        print(f"ADVERTENCIA: No se pudieron leer los consolidados guardados: {e}")
+
+    totales = {}
+    if not forzar:
+        totales = {rut: f.total_hhee for rut, f in guardados.items() if f.fecha_actualizacion >= limite}
+
+    faltantes = [r for r in ruts_limpios if r not in totales]
+    estadisticas_cache["consolidados_hits"] += len(ruts_limpios) - len(faltantes)
+    estadisticas_cache["consolidados_misses"] += len(faltantes)
+
+    antiguedad = None
+    if faltantes:
+        try:
+            totales.update(await _consultar_consolidados(faltantes, inicio, fin))
+        except CircuitoAbiertoError:
+            circuito_gv.programar_refresco(
+                ("consolidado", inicio, fin, tuple(sorted(faltantes))),
+                lambda: _consultar_consolidados(faltantes, inicio, fin)
+            )
+
+        # Los RUTs que GeoVictoria no devolvió se completan con el último total guardado
+        for rut in faltantes:
+            fila = guardados.get(rut)
+            if rut not in totales and fila is not None:
+                totales[rut] = fila.total_hhee
+                estadisticas_cache["servidos_desactualizados"] += 1
+                edad = round((ahora - fila.fecha_actualizacion).total_seconds())
+                antiguedad = max(antiguedad or 0, edad)
+
+    return totales, antiguedad
@@ -0,0 +1,193 @@
+# /backend/services/cache_respuestas.py
+"""
+Caché de respuestas de los dashboards de HHEE (/hhee/metricas, /hhee/metricas-pendientes).
+
+Cada respuesta se guarda bajo (endpoint, alcance) más las versiones actuales de sus
+etiquetas (p. ej. "validaciones:202602"). Los endpoints que escriben incrementan la
+versión de las etiquetas afectadas: las entradas viejas dejan de encontrarse al
+instante y expiran solas por TTL.
+
+Usa el Redis que abre el lifespan de la app (compartido entre procesos); si no hay
+Redis o falla, usa un LRU en memoria del proceso.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from ..utils import periodo_hhee, periodos_en_rango
+
+PREFIJO = "cache_hhee:"
+# Tras un error de Redis se usa solo el LRU local durante este tiempo
+SEGUNDOS_SIN_REDIS = 30
+
+
+def etiquetas_rango(familia: str, fecha_inicio: Optional[date], fecha_fin: Optional[date]) -> List[str]:
+    """Etiquetas de los periodos que toca un rango; sin rango, la etiqueta global de la familia."""
+    if not fecha_inicio or not fecha_fin:
+        return [f"{familia}:todos"]
+    return [f"{familia}:{periodo}" for periodo in periodos_en_rango(fecha_inicio, fecha_fin)]
+
+
+def etiquetas_fechas(familia: str, fechas: Iterable[date]) -> List[str]:
+    """Etiquetas a invalidar cuando cambian datos de esas fechas (incluye la global)."""
+    return sorted({f"{familia}:{periodo_hhee(f)}" for f in fechas if f} | {f"{familia}:todos"})
+
+
+class CacheRespuestas:
+    def __init__(self, ttl_seg: float = 300, max_entradas: int = 256, ttl_cerrado_seg: float = 86400):
+        self.ttl_seg = ttl_seg
+        # Respuestas que solo abarcan periodos cerrados (no cambian salvo invalidación explícita)
+        self.ttl_cerrado_seg = ttl_cerrado_seg
+        self.max_entradas = max_entradas
+        self._redis = None
+        self._redis_pausado_hasta = 0.0
+
+        # Respaldo en memoria: clave -> (expira, valor) y etiqueta -> versión
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._versiones_locales: Dict[str, int] = {}
+        # Etiquetas invalidadas mientras Redis estaba en pausa: se incrementan allí al volver
+        self._invalidaciones_pendientes: Set[str] = set()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.errores_redis = 0
+
+    @classmethod
+    def desde_entorno(cls) -> "CacheRespuestas":
+        return cls(
+            ttl_seg=float(os.getenv("HHEE_CACHE_TTL_SEG", "300")),
+            max_entradas=int(os.getenv("HHEE_CACHE_MAX_ENTRADAS", "256")),
+            ttl_cerrado_seg=float(os.getenv("HHEE_CACHE_TTL_CERRADO_SEG", "86400")),
+        )
+
+    def configurar_redis(self, conexion):
+        """Recibe la conexión abierta en el lifespan (con decode_responses=True)."""
+        self._redis = conexion
+
+    def _redis_activo(self):
+        if self._redis is not None and time.monotonic() >= self._redis_pausado_hasta:
+            return self._redis
+        return None
+
+    async def _redis_listo(self):
+        """Redis si está disponible, después de aplicarle las invalidaciones que quedaron pendientes."""
+        redis = self._redis_activo()
+        if redis is None or not self._invalidaciones_pendientes:
+            return redis
+        pendientes = sorted(self._invalidaciones_pendientes)
+        try:
+            await self._incrementar(redis, pendientes)
+        except Exception as e:
+            self._falla_redis(e)
+            return None
+        self._invalidaciones_pendientes.difference_update(pendientes)
+        return redis
+
+    @staticmethod
+    async def _incrementar(redis, etiquetas: List[str]):
+        async with redis.pipeline(transaction=False) as pipe:
+            for etiqueta in etiquetas:
+                pipe.incr(f"{PREFIJO}tag:{etiqueta}")
+            await pipe.execute()
+
+    def _falla_redis(self, e: Exception):
+        self.errores_redis += 1
+        self._redis_pausado_hasta = time.monotonic() + SEGUNDOS_SIN_REDIS
+        print(f"ADVERTENCIA: Caché de HHEE sin Redis por {SEGUNDOS_SIN_REDIS}s, se usa memoria local: {e}")
+
+    async def _versiones(self, etiquetas: List[str]) -> List[int]:
+        redis = await self._redis_listo()
+        if redis is not None:
+            try:
+                valores = await redis.mget([f"{PREFIJO}tag:{e}" for e in etiquetas])
+                return [int(v or 0) for v in valores]
+            except Exception as e:
+                self._falla_redis(e)
+        return [self._versiones_locales.get(e, 0) for e in etiquetas]
+
+    async def _clave(self, endpoint: str, alcance: Any, etiquetas: List[str]) -> str:
+        versiones = await self._versiones(etiquetas)
+        firma = json.dumps([alcance, etiquetas, versiones], sort_keys=True, default=str)
+        return f"{PREFIJO}{endpoint}:{hashlib.sha1(firma.encode()).hexdigest()}"
+
+    async def obtener(self, endpoint: str, alcance: Any, etiquetas: List[str]) -> Optional[Any]:
+        clave = await self._clave(endpoint, alcance, etiquetas)
+        redis = await self._redis_listo()
+        if redis is not None:
+            try:
+                valor = await redis.get(clave)
+                if valor is not None:
+                    self.aciertos += 1
+                    return json.loads(valor)
+                self.fallos += 1
+                return None
+            except Exception as e:
+                self._falla_redis(e)
+
+        entrada = self._lru.get(clave)
+        if entrada and entrada[0] > time.monotonic():
+            self._lru.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+        self._lru.pop(clave, None)
+        self.fallos += 1
+        return None
+
+    async def guardar(self, endpoint: str, alcance: Any, etiquetas: List[str], valor: Any, ttl_seg: Optional[float] = None):
+        clave = await self._clave(endpoint, alcance, etiquetas)
+        ttl_seg = ttl_seg or self.ttl_seg
+        redis = await self._redis_listo()
+        if redis is not None:
+            try:
+                await redis.set(clave, json.dumps(valor, default=str), ex=int(ttl_seg))
+                return
+            except Exception as e:
+                self._falla_redis(e)
+
+        self._lru[clave] = (time.monotonic() + ttl_seg, valor)
+        self._lru.move_to_end(clave)
+        while len(self._lru) > self.max_entradas:
+            self._lru.popitem(last=False)
+
+    async def invalidar(self, etiquetas: Iterable[str]):
+        """Incrementa la versión de las etiquetas: las respuestas que dependen de ellas dejan de servirse."""
+        etiquetas = list(etiquetas)
+        if not etiquetas:
+            return
+        self.invalidaciones += 1
+        # Siempre también en local, por si el proceso está sirviendo desde el LRU
+        for etiqueta in etiquetas:
+            self._versiones_locales[etiqueta] = self._versiones_locales.get(etiqueta, 0) + 1
+
+        redis = await self._redis_listo()
+        if redis is not None:
+            try:
+                await self._incrementar(redis, etiquetas)
+                return
+            except Exception as e:
+                self._falla_redis(e)
+        if self._redis is not None:
+            # Sin esto, al volver Redis se servirían las respuestas guardadas con las versiones viejas
+            self._invalidaciones_pendientes.update(etiquetas)
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis" if self._redis_activo() is not None else "memoria",
+            "ttl_seg": self.ttl_seg,
+            "ttl_cerrado_seg": self.ttl_cerrado_seg,
+            "entradas_locales": len(self._lru),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "invalidaciones": self.invalidaciones,
+            "errores_redis": self.errores_redis,
+            "invalidaciones_pendientes": len(self._invalidaciones_pendientes),
+        }
+
+
+# Instancia única por proceso; el lifespan le entrega la conexión a Redis
+cache_respuestas = CacheRespuestas.desde_entorno()
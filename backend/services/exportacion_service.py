@@ -0,0 +1,195 @@
+# /backend/services/exportacion_service.py
+"""
+Motor de exportación en streaming (Excel y CSV) con memoria constante.
+
+Las filas se leen de un cursor del lado del servidor (`AsyncSession.stream`) en
+particiones y se escriben a medida que llegan; nunca se arma la lista completa
+de filas ni un DataFrame:
+- CSV: cada trozo se envía al cliente apenas se completa.
+- XLSX: openpyxl en modo write-only vuelca las filas a disco y el libro terminado
+  se envía por trozos desde un archivo temporal.
+"""
+import asyncio
+import csv
+import io
+import shutil
+import tempfile
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, List, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from ..database import AsyncSessionLocal
+
+# Filas que trae el cursor por cada viaje a la base de datos
+FILAS_POR_LECTURA = 1000
+# Tamaño de los trozos enviados al cliente
+TAMANO_TROZO = 64 * 1024
+# Hasta este tamaño el archivo temporal vive en memoria; por encima pasa a disco
+MEMORIA_MAX_ARCHIVO = 8 * 1024 * 1024
+# Separador del CSV: Excel en español espera punto y coma
+SEPARADOR_CSV = ";"
+
+
+class FormatoArchivo(str, Enum):
+    XLSX = "XLSX"
+    CSV = "CSV"
+
+
+MEDIA_TYPES = {
+    FormatoArchivo.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    FormatoArchivo.CSV: "text/csv; charset=utf-8",
+}
+
+
+def encabezados_descarga(nombre_base: str, formato: FormatoArchivo) -> dict:
+    return {'Content-Disposition': f'attachment; filename="{nombre_base}.{formato.value.lower()}"'}
+
+
+class FuenteFilas:
+    """
+    Cursor del lado del servidor con sesión propia: la sesión de `Depends(get_db)`
+    se cierra antes de que termine de enviarse una StreamingResponse.
+    """
+
+    def __init__(self, query, escalares: bool = False):
+        self.query = query
+        # Con escalares=True cada fila es el objeto ORM en lugar de una tupla de columnas
+        self.escalares = escalares
+        self.sesion = None
+        self._resultado = None
+        self._primera: List[Any] = []
+
+    async def abrir(self) -> bool:
+        """Abre el cursor y lee la primera partición. Devuelve False (y cierra) si no hay filas."""
+        self.sesion = AsyncSessionLocal()
+        try:
+            self._resultado = await self.sesion.stream(self.query.execution_options(yield_per=FILAS_POR_LECTURA))
+            if self.escalares:
+                self._resultado = self._resultado.scalars()
+            self._primera = await self._resultado.fetchmany(FILAS_POR_LECTURA)
+        except Exception:
+            await self.cerrar()
+            raise
+        if not self._primera:
+            await self.cerrar()
+            return False
+        return True
+
+    async def particiones(self, cerrar_al_terminar: bool = True) -> AsyncIterator[List[Any]]:
+        try:
+            particion, self._primera = self._primera, []
+            while particion:
+                yield particion
+                particion = await self._resultado.fetchmany(FILAS_POR_LECTURA)
+        finally:
+            if cerrar_al_terminar:
+                await self.cerrar()
+
+    async def cerrar(self):
+        if self._resultado is not None:
+            await self._resultado.close()
+            self._resultado = None
+        if self.sesion is not None:
+            await self.sesion.close()
+            self.sesion = None
+
+
+async def formatear(particiones: AsyncIterator[List[Any]], formateador: Callable[[Any], Sequence[Any]]) -> AsyncIterator[List[Sequence[Any]]]:
+    """Convierte cada fila de la base de datos en la fila del archivo, partición por partición."""
+    async for particion in particiones:
+        yield [formateador(fila) for fila in particion]
+
+
+def _agregar_filas(hoja, filas):
+    for fila in filas:
+        hoja.append(fila)
+
+
+async def generar_xlsx(columnas: Sequence[str], particiones: AsyncIterator[List[Sequence[Any]]], nombre_hoja: str):
+    """Escribe el libro en modo write-only y lo devuelve como archivo temporal posicionado al inicio."""
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=nombre_hoja[:31])
+    encabezado = []
+    for columna in columnas:
+        celda = WriteOnlyCell(hoja, value=columna)
+        celda.font = Font(bold=True)
+        encabezado.append(celda)
+    hoja.append(encabezado)
+
+    async for filas in particiones:
+        await asyncio.to_thread(_agregar_filas, hoja, filas)
+
+    archivo = tempfile.SpooledTemporaryFile(max_size=MEMORIA_MAX_ARCHIVO)
+    await asyncio.to_thread(libro.save, archivo)
+    archivo.seek(0)
+    return archivo
+
+
+async def transmitir_csv(columnas: Sequence[str], particiones: AsyncIterator[List[Sequence[Any]]]) -> AsyncIterator[bytes]:
+    """Genera el CSV por trozos a medida que llegan las particiones."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=SEPARADOR_CSV, lineterminator="\r\n")
+    # BOM para que Excel reconozca el UTF-8 (tildes y eñes)
+    buffer.write("\ufeff")
+    escritor.writerow(columnas)
+    async for filas in particiones:
+        escritor.writerows(filas)
+        if buffer.tell() >= TAMANO_TROZO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def generar_csv(columnas: Sequence[str], particiones: AsyncIterator[List[Sequence[Any]]]):
+    archivo = tempfile.SpooledTemporaryFile(max_size=MEMORIA_MAX_ARCHIVO)
+    async for trozo in transmitir_csv(columnas, particiones):
+        archivo.write(trozo)
+    archivo.seek(0)
+    return archivo
+
+
+async def generar_archivo(formato: FormatoArchivo, columnas: Sequence[str], particiones: AsyncIterator[List[Sequence[Any]]], nombre_hoja: str):
+    if formato == FormatoArchivo.CSV:
+        return await generar_csv(columnas, particiones)
+    return await generar_xlsx(columnas, particiones, nombre_hoja)
+
+
+def _copiar_y_cerrar(archivo, ruta: str):
+    try:
+        with open(ruta, "wb") as destino:
+            shutil.copyfileobj(archivo, destino, TAMANO_TROZO)
+    finally:
+        archivo.close()
+
+
+async def guardar_en_ruta(archivo, ruta: str):
+    """Vuelca un archivo temporal a disco (p. ej. para los trabajos de exportación) y lo cierra."""
+    await asyncio.to_thread(_copiar_y_cerrar, archivo, ruta)
+
+
+async def transmitir_archivo(archivo) -> AsyncIterator[bytes]:
+    """Envía un archivo temporal por trozos y lo cierra al terminar."""
+    try:
+        while True:
+            trozo = archivo.read(TAMANO_TROZO)
+            if not trozo:
+                break
+            yield trozo
+    finally:
+        archivo.close()
+
+
+async def contenido_respuesta(formato: FormatoArchivo, columnas: Sequence[str], particiones: AsyncIterator[List[Sequence[Any]]], nombre_hoja: str) -> AsyncIterator[bytes]:
+    """
+    Cuerpo para una StreamingResponse: el CSV sale directo del cursor; el XLSX se
+    genera completo (en disco) antes de empezar a enviarse.
+    """
+    if formato == FormatoArchivo.CSV:
+        return transmitir_csv(columnas, particiones)
+    archivo = await generar_xlsx(columnas, particiones, nombre_hoja)
+    return transmitir_archivo(archivo)
@@ -0,0 +1,451 @@
+# /backend/services/exportacion_trabajos.py
+"""
+Trabajos de exportación asíncronos (HHEE, bitácora e incidencias).
+
+Las exportaciones grandes (p. ej. HHEE formato Operaciones, que además consulta
+GeoVictoria) superan el timeout del proxy de Render si se generan dentro de la
+petición. Aquí la petición solo encola un trabajo y devuelve su id; un número
+acotado de workers los procesa en segundo plano, el cliente consulta el avance
+y descarga el archivo terminado desde el disco local hasta que expira.
+
+Dos pedidos idénticos (mismo tipo, parámetros y alcance) mientras el primero
+sigue pendiente o en proceso comparten el mismo trabajo.
+
+Con varios procesos (gunicorn con más de un worker) el registro se comparte por
+Redis: estado y avance del trabajo, quiénes lo pidieron, la clave de deduplicación
+y la ruta del archivo. Los archivos quedan en EXPORTACION_DIR, que los workers de
+una instancia comparten, y nunca se copian a Redis (el mismo que usa el rate
+limiter). Así /exportaciones/{id} y /descargar responden desde cualquier proceso,
+no solo desde el que lo encoló. Sin Redis el registro es local al proceso y la app
+debe correr con un solo worker.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+import redis.asyncio as redis
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from ..database import AsyncSessionLocal
+from . import exportacion_service
+from .exportacion_service import FormatoArchivo
+
+PENDIENTE = "pendiente"
+EN_PROCESO = "en_proceso"
+COMPLETADO = "completado"
+ERROR = "error"
+
+PREFIJO = "exportacion:"
+# Cada cuánto se publica en Redis el avance de un trabajo en proceso
+SEGUNDOS_PUBLICAR_AVANCE = 2
+
+
+class ColaExportacionLlenaError(Exception):
+    """Se alcanzó el máximo de trabajos en espera."""
+
+
+class SinResultadosError(Exception):
+    """La consulta del trabajo no devolvió filas (equivalente al 404 de la exportación directa)."""
+
+
+class TrabajoExportacion:
+    def __init__(self, trabajo_id: str, tipo: str, clave: str, formato: FormatoArchivo, nombre_archivo: str, ruta: str,
+                 productor: Callable[["TrabajoExportacion"], Awaitable[None]], propietario_id: int):
+        self.id = trabajo_id
+        self.tipo = tipo
+        self.clave = clave
+        self.formato = formato
+        self.nombre_archivo = nombre_archivo
+        self.ruta = ruta
+        self.productor = productor
+        self.interesados: Set[int] = {propietario_id}
+
+        self.estado = PENDIENTE
+        self.progreso = 0
+        self.total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.creado = time.time()
+        self.terminado: Optional[float] = None
+        self.expira: Optional[float] = None
+
+    @property
+    def expirado(self) -> bool:
+        return self.expira is not None and time.time() >= self.expira
+
+    @classmethod
+    def desde_registro(cls, datos: Dict[str, Any]) -> "TrabajoExportacion":
+        """Vista de un trabajo publicado en Redis por otro proceso (sin productor)."""
+        trabajo = cls(datos["id"], datos["tipo"], datos["clave"], FormatoArchivo(datos["formato"]),
+                      datos["nombre_archivo"], datos.get("ruta"), None, None)
+        trabajo.interesados = set()
+        for campo in ("estado", "progreso", "total", "error", "creado", "terminado", "expira"):
+            setattr(trabajo, campo, datos.get(campo))
+        return trabajo
+
+    def a_registro(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "tipo": self.tipo, "clave": self.clave, "formato": self.formato.value,
+            "nombre_archivo": self.nombre_archivo, "ruta": self.ruta, "estado": self.estado, "progreso": self.progreso,
+            "total": self.total, "error": self.error, "creado": self.creado,
+            "terminado": self.terminado, "expira": self.expira,
+        }
+
+    def a_dict(self) -> Dict[str, Any]:
+        porcentaje = None
+        if self.estado == COMPLETADO:
+            porcentaje = 100
+        elif self.total:
+            porcentaje = min(99, int(self.progreso * 100 / self.total))
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "progreso": self.progreso,
+            "total": self.total,
+            "porcentaje": porcentaje,
+            "error": self.error,
+            "nombre_archivo": self.nombre_archivo,
+            "segundos_para_expirar": max(0, int(self.expira - time.time())) if self.expira else None,
+        }
+
+
+class GestorExportaciones:
+    def __init__(self, workers: int = 2, ttl_seg: float = 1800, max_en_cola: int = 50,
+                 timeout_seg: float = 900, directorio: Optional[str] = None):
+        self.workers = workers
+        self.ttl_seg = ttl_seg
+        self.max_en_cola = max_en_cola
+        self.timeout_seg = timeout_seg
+        self.directorio = directorio or os.path.join(tempfile.gettempdir(), "portal_exportaciones")
+
+        self._trabajos: Dict[str, TrabajoExportacion] = {}
+        # Trabajos pendientes o en proceso por clave, para deduplicar pedidos idénticos
+        self._activos: Dict[str, TrabajoExportacion] = {}
+        self._cola: Optional[asyncio.Queue] = None
+        self._tareas: List[asyncio.Task] = []
+        # Registro compartido entre procesos (solo metadatos; los archivos quedan en el directorio)
+        self._redis = None
+
+        self.total_encolados = 0
+        self.total_deduplicados = 0
+        self.total_completados = 0
+        self.total_fallidos = 0
+
+    @classmethod
+    def desde_entorno(cls) -> "GestorExportaciones":
+        return cls(
+            workers=int(os.getenv("EXPORTACION_WORKERS", "2")),
+            ttl_seg=float(os.getenv("EXPORTACION_TTL_MIN", "30")) * 60,
+            max_en_cola=int(os.getenv("EXPORTACION_MAX_EN_COLA", "50")),
+            timeout_seg=float(os.getenv("EXPORTACION_TIMEOUT_SEG", "900")),
+            directorio=os.getenv("EXPORTACION_DIR"),
+        )
+
+    # --- CICLO DE VIDA (lifespan de la app) ---
+    async def iniciar(self, redis_url: Optional[str] = None):
+        if redis_url:
+            try:
+                self._redis = redis.from_url(redis_url)
+                await self._redis.ping()
+            except Exception as e:
+                self._redis = None
+                print(f"ADVERTENCIA: Exportaciones sin Redis, el registro de trabajos queda local al proceso: {e}")
+        os.makedirs(self.directorio, exist_ok=True)
+        self.borrar_huerfanos()
+        self._cola = asyncio.Queue(maxsize=self.max_en_cola)
+        self._tareas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tareas.append(asyncio.create_task(self._limpiar_periodicamente()))
+
+    async def detener(self):
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        self._cola = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    # --- REGISTRO COMPARTIDO (Redis) ---
+    @staticmethod
+    def _clave_activo(clave: str) -> str:
+        return f"{PREFIJO}activo:{hashlib.sha1(clave.encode()).hexdigest()}"
+
+    def _falla_redis(self, accion: str, e: Exception):
+        print(f"ADVERTENCIA: Falló Redis al {accion} un trabajo de exportación: {e}")
+
+    def _ttl_registro(self, trabajo: TrabajoExportacion) -> int:
+        if trabajo.expira is not None:
+            return max(1, int(trabajo.expira - time.time()))
+        return int(self.timeout_seg + self.ttl_seg)
+
+    async def _publicar(self, trabajo: TrabajoExportacion):
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(f"{PREFIJO}{trabajo.id}", json.dumps(trabajo.a_registro()), ex=self._ttl_registro(trabajo))
+        except Exception as e:
+            self._falla_redis("publicar", e)
+
+    async def _agregar_interesado(self, trabajo_id: str, analista_id: int, ttl: int):
+        if self._redis is None:
+            return
+        try:
+            clave = f"{PREFIJO}{trabajo_id}:interesados"
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.sadd(clave, analista_id)
+                pipe.expire(clave, ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._falla_redis("registrar", e)
+
+    async def _trabajo_compartido(self, trabajo_id: str) -> Optional[TrabajoExportacion]:
+        if self._redis is None:
+            return None
+        try:
+            datos = await self._redis.get(f"{PREFIJO}{trabajo_id}")
+        except Exception as e:
+            self._falla_redis("leer", e)
+            return None
+        return TrabajoExportacion.desde_registro(json.loads(datos)) if datos else None
+
+    async def _es_interesado(self, trabajo_id: str, analista_id: int) -> bool:
+        if self._redis is None:
+            return False
+        try:
+            return bool(await self._redis.sismember(f"{PREFIJO}{trabajo_id}:interesados", analista_id))
+        except Exception as e:
+            self._falla_redis("leer", e)
+            return False
+
+    async def _activo_en_otro_proceso(self, clave: str, trabajo_id: str) -> Optional[TrabajoExportacion]:
+        """
+        Reserva la clave de deduplicación para `trabajo_id`. Si otro proceso ya tiene un
+        trabajo idéntico pendiente o en proceso, devuelve ese trabajo.
+        """
+        if self._redis is None:
+            return None
+        clave_activo = self._clave_activo(clave)
+        try:
+            if await self._redis.set(clave_activo, trabajo_id, nx=True, ex=int(self.timeout_seg + self.ttl_seg)):
+                return None
+            existente_id = await self._redis.get(clave_activo)
+        except Exception as e:
+            self._falla_redis("deduplicar", e)
+            return None
+        existente = await self._trabajo_compartido(existente_id.decode()) if existente_id else None
+        if existente and existente.estado in (PENDIENTE, EN_PROCESO):
+            return existente
+        # Reserva huérfana (p. ej. el proceso que la tomó se reinició): se reemplaza
+        try:
+            await self._redis.set(clave_activo, trabajo_id, ex=int(self.timeout_seg + self.ttl_seg))
+        except Exception as e:
+            self._falla_redis("deduplicar", e)
+        return None
+
+    async def _liberar_activo(self, clave: str, trabajo_id: str):
+        if self._redis is None:
+            return
+        clave_activo = self._clave_activo(clave)
+        try:
+            if (await self._redis.get(clave_activo) or b"").decode() == trabajo_id:
+                await self._redis.delete(clave_activo)
+        except Exception as e:
+            self._falla_redis("liberar", e)
+
+    # --- API ---
+    async def encolar(self, tipo: str, parametros: Dict[str, Any], alcance: Optional[str], propietario_id: int,
+                      formato: FormatoArchivo, nombre_base: str,
+                      productor: Callable[[TrabajoExportacion], Awaitable[None]]) -> TrabajoExportacion:
+        """
+        Encola un trabajo o devuelve el pendiente idéntico (de este u otro proceso). `alcance`
+        distingue pedidos con los mismos parámetros cuyo resultado depende del usuario
+        (p. ej. filtro por supervisor).
+        """
+        if self._cola is None:
+            raise RuntimeError("El gestor de exportaciones no está iniciado.")
+
+        clave = json.dumps([tipo, parametros, alcance, formato.value], sort_keys=True, default=str)
+        existente = self._activos.get(clave)
+        trabajo_id = uuid.uuid4().hex
+        if existente is None:
+            existente = await self._activo_en_otro_proceso(clave, trabajo_id)
+        if existente:
+            existente.interesados.add(propietario_id)
+            await self._agregar_interesado(existente.id, propietario_id, self._ttl_registro(existente))
+            self.total_deduplicados += 1
+            return existente
+
+        trabajo = TrabajoExportacion(
+            trabajo_id, tipo, clave, formato, f"{nombre_base}.{formato.value.lower()}",
+            os.path.join(self.directorio, f"{trabajo_id}.{formato.value.lower()}"),
+            productor, propietario_id
+        )
+        try:
+            self._cola.put_nowait(trabajo)
+        except asyncio.QueueFull:
+            await self._liberar_activo(clave, trabajo_id)
+            raise ColaExportacionLlenaError("Hay demasiadas exportaciones en espera. Intenta nuevamente en unos minutos.")
+
+        self._trabajos[trabajo.id] = trabajo
+        self._activos[clave] = trabajo
+        self.total_encolados += 1
+        await self._publicar(trabajo)
+        await self._agregar_interesado(trabajo.id, propietario_id, self._ttl_registro(trabajo))
+        return trabajo
+
+    async def obtener(self, trabajo_id: str, analista_id: int) -> Optional[TrabajoExportacion]:
+        """
+        Devuelve el trabajo solo si el analista lo pidió (o pidió uno idéntico). Los trabajos
+        de otros procesos se leen del registro compartido.
+        """
+        trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None:
+            trabajo = await self._trabajo_compartido(trabajo_id)
+        if trabajo is None:
+            return None
+        if analista_id not in trabajo.interesados and not await self._es_interesado(trabajo_id, analista_id):
+            return None
+        return trabajo
+
+    def estado(self) -> Dict[str, Any]:
+        por_estado: Dict[str, int] = {}
+        for trabajo in self._trabajos.values():
+            por_estado[trabajo.estado] = por_estado.get(trabajo.estado, 0) + 1
+        return {
+            "registro": "redis" if self._redis is not None else "proceso",
+            "workers": self.workers,
+            "en_cola": self._cola.qsize() if self._cola else 0,
+            "trabajos_por_estado": por_estado,
+            "total_encolados": self.total_encolados,
+            "total_deduplicados": self.total_deduplicados,
+            "total_completados": self.total_completados,
+            "total_fallidos": self.total_fallidos,
+        }
+
+    # --- PROCESAMIENTO ---
+    async def _worker(self):
+        while True:
+            trabajo = await self._cola.get()
+            try:
+                await self._procesar(trabajo)
+            finally:
+                self._cola.task_done()
+
+    async def _publicar_avance(self, trabajo: TrabajoExportacion):
+        while True:
+            await asyncio.sleep(SEGUNDOS_PUBLICAR_AVANCE)
+            await self._publicar(trabajo)
+
+    async def _procesar(self, trabajo: TrabajoExportacion):
+        trabajo.estado = EN_PROCESO
+        await self._publicar(trabajo)
+        publicador = asyncio.create_task(self._publicar_avance(trabajo)) if self._redis is not None else None
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(trabajo.productor(trabajo), timeout=self.timeout_seg)
+            trabajo.estado = COMPLETADO
+            self.total_completados += 1
+            print(f"Exportación {trabajo.tipo} {trabajo.id} lista: {trabajo.progreso} filas en {time.perf_counter() - inicio:.1f}s.")
+        except asyncio.CancelledError:
+            raise
+        except SinResultadosError as e:
+            trabajo.estado = ERROR
+            trabajo.error = str(e)
+        except asyncio.TimeoutError:
+            trabajo.estado = ERROR
+            trabajo.error = f"La exportación superó el tiempo máximo de {self.timeout_seg:.0f}s."
+            self.total_fallidos += 1
+        except Exception as e:
+            trabajo.estado = ERROR
+            trabajo.error = f"Ocurrió un error inesperado al generar el reporte: {e}"
+            self.total_fallidos += 1
+            print(f"ERROR en exportación {trabajo.tipo} {trabajo.id}: {e}")
+        finally:
+            if publicador is not None:
+                publicador.cancel()
+            self._activos.pop(trabajo.clave, None)
+            trabajo.productor = None
+            trabajo.terminado = time.time()
+            trabajo.expira = trabajo.terminado + self.ttl_seg
+            if trabajo.estado != COMPLETADO:
+                self._borrar_archivo(trabajo.ruta)
+            await self._liberar_activo(trabajo.clave, trabajo.id)
+            await self._publicar(trabajo)
+
+    async def _limpiar_periodicamente(self):
+        while True:
+            await asyncio.sleep(60)
+            try:
+                self.limpiar_expirados()
+                self.borrar_huerfanos()
+            except Exception as e:
+                print(f"ADVERTENCIA: Falló la limpieza de exportaciones expiradas: {e}")
+
+    def limpiar_expirados(self):
+        for trabajo in [t for t in self._trabajos.values() if t.expirado]:
+            self._borrar_archivo(trabajo.ruta)
+            self._trabajos.pop(trabajo.id, None)
+
+    def borrar_huerfanos(self):
+        """
+        Borra los archivos que ningún trabajo puede seguir usando (más viejos que el TTL más
+        el timeout). El directorio es compartido con los otros workers: un reinicio no puede
+        borrar a ciegas los archivos vigentes de sus trabajos.
+        """
+        limite = time.time() - (self.ttl_seg + self.timeout_seg)
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    self._borrar_archivo(ruta)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _borrar_archivo(ruta: str):
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+
+
+async def contar_progreso(trabajo: TrabajoExportacion, particiones: AsyncIterator[List[Any]]) -> AsyncIterator[List[Any]]:
+    async for particion in particiones:
+        trabajo.progreso += len(particion)
+        yield particion
+
+
+async def exportar_consulta(trabajo: TrabajoExportacion, query, columnas, formateador, nombre_hoja: str,
+                            mensaje_sin_resultados: str, query_total=None, escalares: bool = False):
+    """
+    Productor genérico: cuenta las filas (para el porcentaje), recorre la consulta con
+    un cursor del servidor y escribe el archivo del trabajo en disco.
+    `query_total` permite contar sobre una consulta sin opciones de carga (selectinload).
+    """
+    base_total = query_total if query_total is not None else query
+    async with AsyncSessionLocal() as db:
+        trabajo.total = await db.scalar(select(func.count()).select_from(base_total.order_by(None).subquery()))
+
+    fuente = exportacion_service.FuenteFilas(query, escalares=escalares)
+    if not await fuente.abrir():
+        raise SinResultadosError(mensaje_sin_resultados)
+    try:
+        archivo = await exportacion_service.generar_archivo(
+            trabajo.formato, columnas,
+            exportacion_service.formatear(contar_progreso(trabajo, fuente.particiones()), formateador),
+            nombre_hoja
+        )
+    finally:
+        await fuente.cerrar()
+    await exportacion_service.guardar_en_ruta(archivo, trabajo.ruta)
+
+
+# Instancia única por proceso; la inician y detienen el lifespan de la app
+gestor_exportaciones = GestorExportaciones.desde_entorno()
@@ -0,0 +1,166 @@
+# /backend/services/geovictoria_circuito.py
+"""
+Circuit breaker para el tráfico hacia GeoVictoria.
+
+Se abre tras varias fallas seguidas o respuestas que exceden el presupuesto de
+latencia. Mientras está abierto las consultas fallan al instante (los endpoints
+sirven la caché marcada con su antigüedad); pasado el tiempo de apertura pasa a
+semiabierto, deja pasar una sola consulta de prueba y ejecuta los refrescos que
+quedaron pendientes en segundo plano.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import httpx
+
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class CircuitoAbiertoError(httpx.HTTPError):
+    """GeoVictoria se considera caída: la consulta no se envía."""
+
+    def __init__(self, segundos_restantes: float):
+        super().__init__(f"Circuito de GeoVictoria abierto (reintento en {segundos_restantes:.0f}s).")
+        self.segundos_restantes = segundos_restantes
+
+
+class CircuitoGV:
+    def __init__(self, umbral_fallas: int = 5, presupuesto_latencia_seg: float = 15.0, segundos_apertura: float = 30.0):
+        self.umbral_fallas = umbral_fallas
+        self.presupuesto_latencia_seg = presupuesto_latencia_seg
+        self.segundos_apertura = segundos_apertura
+
+        self.estado_actual = CERRADO
+        self._fallas_consecutivas = 0
+        self._abierto_desde = 0.0
+        self._sonda_en_curso = False
+
+        # Refrescos a ejecutar cuando el circuito se semiabra: clave -> fábrica de corrutina
+        self._refrescos: Dict[Hashable, Callable[[], Awaitable[Any]]] = {}
+        self._tarea_refresco: Optional[asyncio.Task] = None
+
+        self.total_aperturas = 0
+        self.total_rechazadas = 0
+        self.total_lentas = 0
+
+    @classmethod
+    def desde_entorno(cls) -> "CircuitoGV":
+        return cls(
+            umbral_fallas=int(os.getenv("GV_CIRCUITO_FALLAS", "5")),
+            presupuesto_latencia_seg=float(os.getenv("GV_PRESUPUESTO_LATENCIA_SEG", "15")),
+            segundos_apertura=float(os.getenv("GV_CIRCUITO_APERTURA_SEG", "30")),
+        )
+
+    def segundos_para_semiapertura(self) -> float:
+        if self.estado_actual != ABIERTO:
+            return 0.0
+        return max(0.0, self._abierto_desde + self.segundos_apertura - time.monotonic())
+
+    def esta_abierto(self) -> bool:
+        """True si una consulta nueva sería rechazada en este momento."""
+        if self.estado_actual == ABIERTO:
+            return self.segundos_para_semiapertura() > 0
+        return self.estado_actual == SEMIABIERTO and self._sonda_en_curso
+
+    def verificar(self) -> bool:
+        """
+        Llamar antes de cada petición. Lanza CircuitoAbiertoError si no debe enviarse.
+        Devuelve True si la petición es la sonda del estado semiabierto.
+        """
+        if self.estado_actual == ABIERTO:
+            restante = self.segundos_para_semiapertura()
+            if restante > 0:
+                self.total_rechazadas += 1
+                raise CircuitoAbiertoError(restante)
+            self.estado_actual = SEMIABIERTO
+            print("Circuito GeoVictoria semiabierto: se envía una consulta de prueba.")
+
+        if self.estado_actual == SEMIABIERTO:
+            if self._sonda_en_curso:
+                self.total_rechazadas += 1
+                raise CircuitoAbiertoError(0)
+            self._sonda_en_curso = True
+            return True
+        return False
+
+    def registrar_resultado(self, exito: bool, duracion_seg: float, es_sonda: bool = False):
+        if es_sonda:
+            self._sonda_en_curso = False
+        lenta = duracion_seg > self.presupuesto_latencia_seg
+        if lenta:
+            self.total_lentas += 1
+
+        if exito and not lenta:
+            self._fallas_consecutivas = 0
+            if self.estado_actual != CERRADO:
+                print("Circuito GeoVictoria cerrado: la API volvió a responder.")
+                self.estado_actual = CERRADO
+            return
+
+        self._fallas_consecutivas += 1
+        if es_sonda or self._fallas_consecutivas >= self.umbral_fallas:
+            self._abrir()
+
+    def liberar_sonda(self, es_sonda: bool):
+        """La sonda se canceló sin resultado: otra petición podrá probar."""
+        if es_sonda:
+            self._sonda_en_curso = False
+
+    def _abrir(self):
+        if self.estado_actual != ABIERTO:
+            self.total_aperturas += 1
+            print(f"Circuito GeoVictoria abierto tras {self._fallas_consecutivas} fallas/lentitudes seguidas.")
+        self.estado_actual = ABIERTO
+        self._abierto_desde = time.monotonic()
+        self._programar_tarea_refresco()
+
+    # --- REFRESCO EN SEGUNDO PLANO ---
+    def programar_refresco(self, clave: Hashable, fabrica: Callable[[], Awaitable[Any]]):
+        """Registra un refresco (deduplicado por clave) que se ejecutará cuando el circuito se semiabra."""
+        self._refrescos[clave] = fabrica
+        self._programar_tarea_refresco()
+
+    def _programar_tarea_refresco(self):
+        if not self._refrescos or (self._tarea_refresco and not self._tarea_refresco.done()):
+            return
+        try:
+            self._tarea_refresco = asyncio.get_running_loop().create_task(self._ejecutar_refrescos())
+        except RuntimeError:
+            pass  # Sin event loop (scripts síncronos): el próximo llamador lo reintenta
+
+    async def _ejecutar_refrescos(self):
+        while self._refrescos:
+            espera = self.segundos_para_semiapertura()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            clave, fabrica = next(iter(self._refrescos.items()))
+            try:
+                await fabrica()
+                self._refrescos.pop(clave, None)
+            except CircuitoAbiertoError as e:
+                # La sonda sigue en curso o volvió a fallar: esperamos la próxima semiapertura
+                await asyncio.sleep(max(1.0, e.segundos_restantes))
+            except Exception as e:
+                self._refrescos.pop(clave, None)
+                print(f"ADVERTENCIA: Falló el refresco en segundo plano de GeoVictoria ({clave}): {e}")
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado_actual,
+            "fallas_consecutivas": self._fallas_consecutivas,
+            "segundos_para_semiapertura": round(self.segundos_para_semiapertura(), 1),
+            "presupuesto_latencia_seg": self.presupuesto_latencia_seg,
+            "refrescos_pendientes": len(self._refrescos),
+            "total_aperturas": self.total_aperturas,
+            "total_rechazadas": self.total_rechazadas,
+            "total_lentas": self.total_lentas,
+        }
+
+
+# Instancia única por proceso, compartida por todas las consultas a GeoVictoria
+circuito_gv = CircuitoGV.desde_entorno()
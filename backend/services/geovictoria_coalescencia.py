@@ -0,0 +1,114 @@
+# /backend/services/geovictoria_coalescencia.py
+"""
+Coalescencia "single-flight" de consultas a GeoVictoria.
+
+Si varias peticiones piden datos del mismo RUT y rango de fechas mientras ya hay
+una consulta en curso, se suman a esa consulta en lugar de lanzar otra. Los RUTs
+de cada llamada se separan en "ya en curso" (se esperan) y "nuevos" (se piden),
+así también se comparten los solapamientos parciales.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+
+
+class CoalescedorGV:
+    def __init__(self):
+        # (tipo, rut) -> lista de (inicio, fin, future) en curso
+        self._en_curso: Dict[Tuple[str, str], List[Tuple[datetime, datetime, asyncio.Future]]] = {}
+        # Referencias fuertes a las consultas lanzadas: el event loop solo guarda referencias débiles
+        self._tareas: Set[asyncio.Task] = set()
+        self.estadisticas = {"ruts_compartidos": 0, "ruts_nuevos": 0, "consultas_lanzadas": 0}
+
+    def _buscar(self, tipo: str, rut: str, inicio: datetime, fin: datetime, permite_contencion: bool):
+        for ini_curso, fin_curso, futuro in self._en_curso.get((tipo, rut), []):
+            if ini_curso == inicio and fin_curso == fin:
+                return futuro
+            if permite_contencion and ini_curso <= inicio and fin <= fin_curso:
+                return futuro
+        return None
+
+    def _registrar(self, tipo: str, ruts: List[str], inicio: datetime, fin: datetime) -> Dict[str, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        futuros = {}
+        for rut in ruts:
+            futuro = loop.create_future()
+            self._en_curso.setdefault((tipo, rut), []).append((inicio, fin, futuro))
+            futuros[rut] = futuro
+        return futuros
+
+    def _liberar(self, tipo: str, futuros: Dict[str, asyncio.Future]):
+        for rut, futuro in futuros.items():
+            entradas = [e for e in self._en_curso.get((tipo, rut), []) if e[2] is not futuro]
+            if entradas:
+                self._en_curso[(tipo, rut)] = entradas
+            else:
+                self._en_curso.pop((tipo, rut), None)
+
+    async def ejecutar(
+        self,
+        tipo: str,
+        ruts: List[str],
+        inicio: datetime,
+        fin: datetime,
+        consultar: Callable[[List[str], datetime, datetime], Awaitable[Dict[str, Any]]],
+        permite_contencion: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Devuelve {rut: resultado} para los RUTs pedidos.
+        `consultar` recibe solo los RUTs nuevos y debe devolver {rut: resultado}.
+        Con `permite_contencion`, una consulta en curso cuyo rango cubre al pedido también se comparte
+        (el llamador debe recortar el resultado a su rango).
+        """
+        compartidos = {}
+        nuevos = []
+        for rut in dict.fromkeys(ruts):
+            futuro = self._buscar(tipo, rut, inicio, fin, permite_contencion)
+            if futuro is not None:
+                compartidos[rut] = futuro
+            else:
+                nuevos.append(rut)
+
+        self.estadisticas["ruts_compartidos"] += len(compartidos)
+        self.estadisticas["ruts_nuevos"] += len(nuevos)
+
+        propios = {}
+        if nuevos:
+            self.estadisticas["consultas_lanzadas"] += 1
+            propios = self._registrar(tipo, nuevos, inicio, fin)
+
+            async def _correr():
+                try:
+                    resultados = await consultar(nuevos, inicio, fin)
+                    for rut, futuro in propios.items():
+                        if not futuro.done():
+                            futuro.set_result(resultados.get(rut))
+                except BaseException as exc:
+                    for futuro in propios.values():
+                        if not futuro.done():
+                            futuro.set_exception(exc)
+                            # Evita el aviso "exception was never retrieved" si nadie más esperaba
+                            futuro.exception()
+                    if not isinstance(exc, Exception):
+                        raise
+                finally:
+                    self._liberar(tipo, propios)
+
+            # La consulta corre como tarea propia: si el llamador original se cancela,
+            # los que se sumaron a ella igual reciben el resultado.
+            tarea = asyncio.create_task(_correr())
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+        todos = {**compartidos, **propios}
+        valores = await asyncio.shield(asyncio.gather(*todos.values(), return_exceptions=True))
+
+        resultado = {}
+        for rut, valor in zip(todos.keys(), valores):
+            if isinstance(valor, BaseException):
+                raise valor
+            resultado[rut] = valor
+        return resultado
+
+
+coalescedor_gv = CoalescedorGV()
@@ -0,0 +1,163 @@
+# /backend/services/geovictoria_limitador.py
+"""
+Limitador adaptativo global para todo el tráfico hacia GeoVictoria.
+
+Combina un token bucket (peticiones por segundo) con un límite de concurrencia
+AIMD: sube de a poco mientras GeoVictoria responde bien y se reduce a la mitad
+ante un 429, respetando el header Retry-After para pausar a todos los llamadores.
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any
+
+
+def _parsear_retry_after(valor: Optional[str]) -> Optional[float]:
+    """Convierte un header Retry-After (segundos o fecha HTTP) a segundos de espera."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+        return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class LimitadorAdaptativo:
+    def __init__(
+        self,
+        tasa_inicial: float = 5.0,
+        tasa_min: float = 0.5,
+        tasa_max: float = 20.0,
+        concurrencia_inicial: int = 3,
+        concurrencia_max: int = 12,
+        rafaga: float = 5.0,
+    ):
+        self.tasa = tasa_inicial
+        self.tasa_min = tasa_min
+        self.tasa_max = tasa_max
+        self.limite_concurrencia = concurrencia_inicial
+        self.concurrencia_max = concurrencia_max
+        self.rafaga = rafaga
+
+        self._tokens = rafaga
+        self._ultimo_relleno = time.monotonic()
+        self._en_vuelo = 0
+        self._en_cola = 0
+        self._exitos_consecutivos = 0
+        self._pausa_hasta = 0.0
+        self._condicion = asyncio.Condition()
+
+        self.total_peticiones = 0
+        self.total_throttles = 0
+        self.total_errores = 0
+
+    @classmethod
+    def desde_entorno(cls) -> "LimitadorAdaptativo":
+        return cls(
+            tasa_inicial=float(os.getenv("GV_TASA_INICIAL", "5")),
+            tasa_max=float(os.getenv("GV_TASA_MAX", "20")),
+            concurrencia_inicial=int(os.getenv("GV_CONCURRENCIA_INICIAL", "3")),
+            concurrencia_max=int(os.getenv("GV_CONCURRENCIA_MAX", "12")),
+        )
+
+    # --- TOKEN BUCKET ---
+    def _rellenar(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.rafaga, self._tokens + (ahora - self._ultimo_relleno) * self.tasa)
+        self._ultimo_relleno = ahora
+
+    async def _esperar_token(self):
+        while True:
+            pausa = self._pausa_hasta - time.monotonic()
+            if pausa > 0:
+                await asyncio.sleep(pausa)
+                continue
+            self._rellenar()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.tasa)
+
+    @asynccontextmanager
+    async def turno(self):
+        """Reserva un lugar de concurrencia y un token antes de hablar con GeoVictoria."""
+        self._en_cola += 1
+        try:
+            async with self._condicion:
+                await self._condicion.wait_for(lambda: self._en_vuelo < self.limite_concurrencia)
+                self._en_vuelo += 1
+        finally:
+            self._en_cola -= 1
+
+        try:
+            await self._esperar_token()
+            self.total_peticiones += 1
+            yield
+        finally:
+            async with self._condicion:
+                self._en_vuelo -= 1
+                self._condicion.notify_all()
+
+    # --- RETROALIMENTACIÓN (AIMD) ---
+    def registrar_exito(self):
+        self._exitos_consecutivos += 1
+        # Aumento aditivo: +1 de concurrencia cada "limite" éxitos seguidos
+        if self._exitos_consecutivos >= self.limite_concurrencia:
+            self._exitos_consecutivos = 0
+            self.limite_concurrencia = min(self.concurrencia_max, self.limite_concurrencia + 1)
+            self.tasa = min(self.tasa_max, self.tasa + 0.5)
+
+    def registrar_throttle(self, retry_after: Optional[str] = None):
+        """GeoVictoria respondió 429: reducción multiplicativa y pausa global."""
+        self.total_throttles += 1
+        self._exitos_consecutivos = 0
+        self.limite_concurrencia = max(1, self.limite_concurrencia // 2)
+        self.tasa = max(self.tasa_min, self.tasa / 2)
+        self._tokens = min(self._tokens, 0)
+        espera = _parsear_retry_after(retry_after)
+        if espera:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + espera)
+
+    def registrar_error(self):
+        self.total_errores += 1
+        self._exitos_consecutivos = 0
+
+    def registrar_respuesta(self, status_code: int, retry_after: Optional[str] = None):
+        if status_code == 429:
+            self.registrar_throttle(retry_after)
+        elif status_code >= 500:
+            self.registrar_error()
+        elif status_code < 400:
+            self.registrar_exito()
+
+    def backoff(self, intento: int, base: float = 1.0, tope: float = 30.0) -> float:
+        """Espera exponencial con jitter; si hay una pausa por Retry-After vigente, se respeta."""
+        espera = min(tope, base * (2 ** intento)) * random.uniform(0.5, 1.5)
+        return max(espera, self._pausa_hasta - time.monotonic())
+
+    def estado(self) -> Dict[str, Any]:
+        self._rellenar()
+        return {
+            "tasa_por_segundo": round(self.tasa, 2),
+            "limite_concurrencia": self.limite_concurrencia,
+            "en_vuelo": self._en_vuelo,
+            "en_cola": self._en_cola,
+            "tokens_disponibles": round(self._tokens, 2),
+            "pausa_restante_seg": round(max(0.0, self._pausa_hasta - time.monotonic()), 2),
+            "total_peticiones": self.total_peticiones,
+            "total_throttles": self.total_throttles,
+            "total_errores": self.total_errores,
+        }
+
+
+# Instancia única por proceso, compartida por todas las consultas a GeoVictoria
+limitador_gv = LimitadorAdaptativo.desde_entorno()
@@ -0,0 +1,130 @@
+# /backend/services/geovictoria_parser.py
+"""
+Parser liviano de las respuestas de AttendanceBook de GeoVictoria.
+
+Las marcas llegan con el formato fijo YYYYMMDDHHMMSS, así que se decodifican
+por posición (sin strptime ni pandas) y, como el formato es de ancho fijo, la
+marca mínima/máxima se obtiene comparando los textos directamente.
+Cada día se emite como un `DiaAsistencia` con __slots__ en lugar de un dict.
+"""
+import asyncio
+from typing import List, Dict, Any, Iterable
+
+from ..utils import limpiar_rut
+
+# A partir de esta cantidad de días el parseo se hace en un hilo, fuera del event loop
+UMBRAL_PARSEO_EN_HILO = 2000
+
+
+def hhmm_to_decimal(time_str):
+    if not time_str or not isinstance(time_str, str) or ':' not in time_str: return 0
+    parts = time_str.split(':')
+    try:
+        return int(parts[0]) + (int(parts[1]) / 60)
+    except (ValueError, IndexError):
+        return 0
+
+
+def _es_marca_valida(stamp) -> bool:
+    return isinstance(stamp, str) and len(stamp) == 14 and stamp.isdigit()
+
+
+class DiaAsistencia:
+    """Un día de asistencia procesado de un empleado."""
+    __slots__ = (
+        "fecha", "nombre_apellido", "rut_limpio", "campaña",
+        "inicio_turno_teorico", "fin_turno_teorico",
+        "marca_real_inicio", "marca_real_fin",
+        "hhee_autorizadas_antes_gv", "hhee_autorizadas_despues_gv",
+        "permisos",
+    )
+
+    def __init__(self, fecha, nombre_apellido, rut_limpio, campaña, inicio_turno_teorico, fin_turno_teorico,
+                 marca_real_inicio, marca_real_fin, hhee_autorizadas_antes_gv, hhee_autorizadas_despues_gv, permisos):
+        self.fecha = fecha  # 'YYYY-MM-DD'
+        self.nombre_apellido = nombre_apellido
+        self.rut_limpio = rut_limpio
+        self.campaña = campaña
+        self.inicio_turno_teorico = inicio_turno_teorico
+        self.fin_turno_teorico = fin_turno_teorico
+        self.marca_real_inicio = marca_real_inicio
+        self.marca_real_fin = marca_real_fin
+        self.hhee_autorizadas_antes_gv = hhee_autorizadas_antes_gv
+        self.hhee_autorizadas_despues_gv = hhee_autorizadas_despues_gv
+        self.permisos = permisos
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Formato histórico de obtener_datos_completos_periodo (el que consumen los routers)."""
+        return {
+            "fecha": self.fecha,
+            "nombre_apellido": self.nombre_apellido,
+            "rut_limpio": self.rut_limpio,
+            "rut": self.rut_limpio,
+            "campaña": self.campaña,
+            "inicio_turno_teorico": self.inicio_turno_teorico,
+            "fin_turno_teorico": self.fin_turno_teorico,
+            "marca_real_inicio": self.marca_real_inicio,
+            "marca_real_fin": self.marca_real_fin,
+            "hhee_autorizadas_antes_gv": self.hhee_autorizadas_antes_gv,
+            "hhee_autorizadas_despues_gv": self.hhee_autorizadas_despues_gv,
+            "permisos": self.permisos,
+        }
+
+
+def parsear_usuarios(usuarios: Iterable[Dict[str, Any]]) -> List[DiaAsistencia]:
+    """Convierte la lista 'Users' de AttendanceBook en registros DiaAsistencia."""
+    dias = []
+    for usuario in usuarios:
+        rut_usuario_raw = usuario.get('Identifier')
+
+        # --- INICIO DEL CÓDIGO DEFENSIVO ---
+        if not rut_usuario_raw or not isinstance(rut_usuario_raw, str):
+            print(f"ADVERTENCIA: Se recibió un registro de GeoVictoria sin un 'Identifier' válido. Omitiendo. Datos: {usuario}")
+            continue
+
+        rut_usuario = limpiar_rut(rut_usuario_raw)
+        # --- FIN DEL CÓDIGO DEFENSIVO ---
+
+        nombre_apellido = f"{usuario.get('Name', '')} {usuario.get('LastName', '')}".strip()
+        campaña = usuario.get('GroupDescription')
+
+        for intervalo_diario in usuario.get("PlannedInterval", []) or []:
+            fecha_str = intervalo_diario.get("Date", "")
+            if not _es_marca_valida(fecha_str):
+                continue
+
+            # min/max sobre el texto: en YYYYMMDDHHMMSS el orden alfabético es el cronológico
+            marcas = [p["Date"] for p in intervalo_diario.get("Punches", []) or [] if _es_marca_valida(p.get("Date"))]
+            marca_inicio = marca_fin = None
+            if marcas:
+                primera = min(marcas)
+                marca_inicio = f"{primera[8:10]}:{primera[10:12]}"
+                if len(marcas) > 1:
+                    ultima = max(marcas)
+                    marca_fin = f"{ultima[8:10]}:{ultima[10:12]}"
+
+            turno = (intervalo_diario.get("Shifts", []) or [{}])[0]
+            permisos_del_dia = [p.get("TimeOffTypeDescription") for p in intervalo_diario.get("TimeOffs", []) or [] if p.get("TimeOffTypeDescription")]
+
+            dias.append(DiaAsistencia(
+                f"{fecha_str[0:4]}-{fecha_str[4:6]}-{fecha_str[6:8]}",
+                nombre_apellido,
+                rut_usuario,
+                campaña,
+                turno.get('StartTime'),
+                turno.get('ExitTime'),
+                marca_inicio,
+                marca_fin,
+                hhmm_to_decimal(intervalo_diario.get("AuthorizedOvertimeBefore")),
+                hhmm_to_decimal(intervalo_diario.get("AuthorizedOvertimeAfter")),
+                permisos_del_dia,
+            ))
+    return dias
+
+
+async def parsear_usuarios_async(usuarios: List[Dict[str, Any]]) -> List[DiaAsistencia]:
+    """Igual que parsear_usuarios, pero las respuestas grandes se procesan en un hilo aparte."""
+    total_dias = sum(len(u.get("PlannedInterval") or []) for u in usuarios)
+    if total_dias >= UMBRAL_PARSEO_EN_HILO:
+        return await asyncio.to_thread(parsear_usuarios, usuarios)
+    return parsear_usuarios(usuarios)
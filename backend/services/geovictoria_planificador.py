@@ -0,0 +1,98 @@
+# /backend/services/geovictoria_planificador.py
+"""
+Planificador de lotes para las consultas a GeoVictoria.
+
+GeoVictoria rechaza las consultas de más de 1500 registros (usuarios x días).
+El planificador reparte el trabajo en RUTs x ventanas de fechas sin pasar ese
+tope (se usa 1400 como margen), eligiendo la combinación con menos peticiones y
+balanceando el tamaño de los lotes para que terminen a la par.
+"""
+import math
+from datetime import date, timedelta
+from typing import List, NamedTuple
+
+# GeoVictoria admite 1500 registros por petición; dejamos margen de seguridad
+LIMITE_REGISTROS = 1400
+# Tope de RUTs por petición, por estabilidad general de la API
+MAX_RUTS_POR_LOTE = 100
+
+
+class Lote(NamedTuple):
+    ruts: List[str]
+    desde: date
+    hasta: date
+
+    @property
+    def registros(self) -> int:
+        return len(self.ruts) * ((self.hasta - self.desde).days + 1)
+
+
+def _repartir(total: int, partes: int) -> List[int]:
+    """Divide `total` en `partes` tamaños que difieren a lo sumo en uno."""
+    base, resto = divmod(total, partes)
+    return [base + (1 if i < resto else 0) for i in range(partes)]
+
+
+def planificar_lotes(
+    ruts: List[str],
+    desde: date,
+    hasta: date,
+    limite_registros: int = LIMITE_REGISTROS,
+    max_ruts: int = MAX_RUTS_POR_LOTE,
+    permite_ventanas: bool = True,
+) -> List[Lote]:
+    """
+    Devuelve los lotes (RUTs x ventana de fechas) que cubren exactamente ruts x [desde, hasta]
+    con la menor cantidad de peticiones, sin superar `limite_registros` por petición.
+    Sin `permite_ventanas` (p. ej. totales del periodo) se parte solo por RUTs.
+    """
+    ruts = list(dict.fromkeys(ruts))
+    if not ruts or hasta < desde:
+        return []
+
+    total_ruts = len(ruts)
+    total_dias = (hasta - desde).days + 1
+
+    # Probamos cada cantidad de ventanas y nos quedamos con la que requiere menos peticiones
+    mejor = None
+    max_ventanas = total_dias if permite_ventanas else 1
+    for ventanas in range(1, max_ventanas + 1):
+        dias_por_ventana = math.ceil(total_dias / ventanas)
+        ruts_por_lote = min(max_ruts, total_ruts, limite_registros // dias_por_ventana)
+        if ruts_por_lote < 1:
+            continue  # Ni un solo RUT entra en una ventana tan larga: hacen falta más ventanas
+        peticiones = math.ceil(total_ruts / ruts_por_lote) * ventanas
+        if mejor is None or peticiones < mejor[0]:
+            mejor = (peticiones, ventanas, ruts_por_lote)
+        if ruts_por_lote == min(max_ruts, total_ruts):
+            break  # Más ventanas ya no pueden reducir la cantidad de lotes por RUT
+
+    if mejor is None:
+        # Sin ventanas y con más días que el tope no hay plan válido: un RUT por petición es lo mínimo
+        mejor = (total_ruts, 1, 1)
+    _, ventanas, ruts_por_lote = mejor
+    grupos_ruts = []
+    inicio = 0
+    for tamano in _repartir(total_ruts, math.ceil(total_ruts / ruts_por_lote)):
+        grupos_ruts.append(ruts[inicio:inicio + tamano])
+        inicio += tamano
+
+    rangos = []
+    dia = desde
+    for tamano in _repartir(total_dias, ventanas):
+        rangos.append((dia, dia + timedelta(days=tamano - 1)))
+        dia += timedelta(days=tamano)
+
+    return [Lote(grupo, ini, fin) for ini, fin in rangos for grupo in grupos_ruts]
+
+
+def dividir_lote(lote: Lote) -> List[Lote]:
+    """Parte un lote fallido en dos mitades para reintentarlo (por RUTs o, si tiene uno solo, por fechas)."""
+    if len(lote.ruts) > 1:
+        mitad = len(lote.ruts) // 2
+        return [Lote(lote.ruts[:mitad], lote.desde, lote.hasta), Lote(lote.ruts[mitad:], lote.desde, lote.hasta)]
+    dias = (lote.hasta - lote.desde).days + 1
+    if dias > 1:
+        corte = lote.desde + timedelta(days=dias // 2 - 1)
+        return [Lote(lote.ruts, lote.desde, corte), Lote(lote.ruts, corte + timedelta(days=1), lote.hasta)]
+    return [lote]
@@ -1,258 +1,398 @@
 # /backend/services/geovictoria_service.py
 import asyncio
+import base64
+import json
+import time
 import httpx
 import os
-import pandas as pd
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Any, Optional
 
+from ..utils import limpiar_rut
+from .geovictoria_limitador import limitador_gv
+from .geovictoria_circuito import circuito_gv, CircuitoAbiertoError
+from .geovictoria_coalescencia import coalescedor_gv
+from .geovictoria_parser import DiaAsistencia, hhmm_to_decimal, parsear_usuarios_async
+from .geovictoria_planificador import Lote, planificar_lotes, dividir_lote
+
+try:
+    import h2  # noqa: F401  (httpx[http2], en requirements.txt; sin él se usa HTTP/1.1)
+    HTTP2_DISPONIBLE = True
+except ImportError:
+    HTTP2_DISPONIBLE = False
+
 
 GEOVICTORIA_USER = os.getenv("GEOVICTORIA_USER")
 GEOVICTORIA_PASSWORD = os.getenv("GEOVICTORIA_PASSWORD")
-GEOVICTORIA_LOGIN_URL = "https://customerapi.geovictoria.com/api/v1/Login"
-GEOVICTORIA_ATTENDANCE_URL = "https://customerapi.geovictoria.com/api/v1/AttendanceBook"
-GEOVICTORIA_CONSOLIDATED_URL = "https://customerapi.geovictoria.com/api/v1/Consolidated"
+# Configurables para apuntar a un entorno local (p. ej. backend/benchmarks/geovictoria_simulador.py)
+GEOVICTORIA_BASE_URL = os.getenv("GEOVICTORIA_BASE_URL", "https://customerapi.geovictoria.com/api/v1").rstrip("/")
+GEOVICTORIA_LOGIN_URL = os.getenv("GEOVICTORIA_LOGIN_URL", f"{GEOVICTORIA_BASE_URL}/Login")
+GEOVICTORIA_ATTENDANCE_URL = os.getenv("GEOVICTORIA_ATTENDANCE_URL", f"{GEOVICTORIA_BASE_URL}/AttendanceBook")
+GEOVICTORIA_CONSOLIDATED_URL = os.getenv("GEOVICTORIA_CONSOLIDATED_URL", f"{GEOVICTORIA_BASE_URL}/Consolidated")
 
+# Contadores de las consultas planificadas (expuestos en /hhee/geovictoria/estadisticas)
+estadisticas_planificador = {"consultas": 0, "peticiones": 0, "lotes_fallidos": 0, "lotes_perdidos": 0}
 
-async def obtener_token_geovictoria():
-    if not GEOVICTORIA_USER or not GEOVICTORIA_PASSWORD:
-        print("ERROR: Faltan las credenciales de GeoVictoria en las variables de entorno.")
-        return None
+# Tiempo máximo de espera por petición (en segundos)
+GEOVICTORIA_TIMEOUT_SEG = float(os.getenv("GEOVICTORIA_TIMEOUT_SEG", "60"))
+# Vida útil por defecto del token cuando GeoVictoria no informa su expiración (en minutos)
+GEOVICTORIA_TOKEN_TTL_MIN = int(os.getenv("GEOVICTORIA_TOKEN_TTL_MIN", "30"))
+# Margen para renovar el token antes de que venza (en segundos)
+TOKEN_MARGEN_SEG = 60
 
-    payload = {"User": GEOVICTORIA_USER, "Password": GEOVICTORIA_PASSWORD}
-    
+
+def _expiracion_token(token: str) -> float:
+    """
+    Devuelve el instante (time.monotonic) en que conviene renovar el token.
+    Si el token es un JWT con 'exp' se usa ese valor, si no el TTL configurado.
+    """
+    ttl = GEOVICTORIA_TOKEN_TTL_MIN * 60
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(GEOVICTORIA_LOGIN_URL, json=payload)
-            response.raise_for_status()
-            return response.json().get("token")
-    except httpx.RequestError as exc:
-        print(f"Error de conexión al obtener token de GeoVictoria: {exc}")
-        return None
-    
-def hhmm_to_decimal(time_str):
-    if not time_str or not isinstance(time_str, str) or ':' not in time_str: return 0
-    parts = time_str.split(':')
+        partes = token.split('.')
+        if len(partes) == 3:
+            payload = partes[1] + '=' * (-len(partes[1]) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+            if exp:
+                ttl = min(ttl, float(exp) - time.time())
+    except Exception:
+        pass
+    return time.monotonic() + max(0, ttl - TOKEN_MARGEN_SEG)
+
+
+class ClienteGeoVictoria:
+    """
+    Cliente HTTP compartido por todo el proceso para hablar con GeoVictoria.
+    Mantiene conexiones keep-alive (HTTP/2 si está disponible) y reutiliza el
+    token de login hasta que vence. Ante un 401 renueva el token una sola vez;
+    las corrutinas concurrentes esperan a un único login.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expira = 0.0
+        self._lock_login = asyncio.Lock()
+
+    async def iniciar(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=GEOVICTORIA_TIMEOUT_SEG,
+                http2=HTTP2_DISPONIBLE,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+            )
+            print(f"Cliente GeoVictoria iniciado (HTTP/2: {'sí' if HTTP2_DISPONIBLE else 'no'}).")
+
+    async def cerrar(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._token = None
+        self._token_expira = 0.0
+
+    async def _cliente(self) -> httpx.AsyncClient:
+        # Permite usar el servicio fuera del lifespan (scripts, cronjobs)
+        if self._client is None:
+            await self.iniciar()
+        return self._client
+
+    def _token_vigente(self) -> bool:
+        return self._token is not None and time.monotonic() < self._token_expira
+
+    async def obtener_token(self, token_rechazado: Optional[str] = None) -> Optional[str]:
+        """
+        Devuelve un token válido, haciendo login solo si no hay uno vigente.
+        `token_rechazado` indica un token que la API respondió con 401 y debe descartarse.
+        """
+        if self._token_vigente() and self._token != token_rechazado:
+            return self._token
+
+        async with self._lock_login:
+            # Otra corrutina pudo haber renovado el token mientras esperábamos el lock
+            if self._token_vigente() and self._token != token_rechazado:
+                return self._token
+
+            if not GEOVICTORIA_USER or not GEOVICTORIA_PASSWORD:
+                print("ERROR: Faltan las credenciales de GeoVictoria en las variables de entorno.")
+                return None
+
+            payload = {"User": GEOVICTORIA_USER, "Password": GEOVICTORIA_PASSWORD}
+            try:
+                response = await self._enviar(GEOVICTORIA_LOGIN_URL, payload)
+                response.raise_for_status()
+                token = response.json().get("token")
+            except CircuitoAbiertoError:
+                raise
+            except httpx.HTTPError as exc:
+                print(f"Error de conexión al obtener token de GeoVictoria: {exc}")
+                return None
+
+            self._token = token
+            self._token_expira = _expiracion_token(token) if token else 0.0
+            return token
+
+    async def _enviar(self, url: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """Única salida HTTP hacia GeoVictoria: toda petición pasa por el circuito y el limitador global."""
+        client = await self._cliente()
+        es_sonda = circuito_gv.verificar()
+        inicio = time.monotonic()
+        try:
+            async with limitador_gv.turno():
+                # El tiempo en cola del limitador no cuenta para el presupuesto de latencia
+                inicio = time.monotonic()
+                try:
+                    response = await client.post(url, json=payload, headers=headers)
+                except httpx.HTTPError:
+                    limitador_gv.registrar_error()
+                    raise
+        except Exception:
+            circuito_gv.registrar_resultado(False, time.monotonic() - inicio, es_sonda)
+            raise
+        except BaseException:
+            # Cancelación del llamador: no es una falla de GeoVictoria
+            circuito_gv.liberar_sonda(es_sonda)
+            raise
+        circuito_gv.registrar_resultado(response.status_code < 500, time.monotonic() - inicio, es_sonda)
+        limitador_gv.registrar_respuesta(response.status_code, response.headers.get("Retry-After"))
+        return response
+
+    async def post(self, url: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST autenticado. Reintenta una única vez con un token nuevo si la API responde 401."""
+        token = await self.obtener_token()
+        if not token:
+            raise httpx.HTTPError("No se pudo obtener un token de GeoVictoria.")
+
+        response = await self._enviar(url, payload, self._headers(token))
+        if response.status_code == 401:
+            nuevo_token = await self.obtener_token(token_rechazado=token)
+            if nuevo_token:
+                response = await self._enviar(url, payload, self._headers(nuevo_token))
+        return response
+
+    @staticmethod
+    def _headers(token: str) -> Dict[str, str]:
+        return {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+            'Accept': 'application/json'
+        }
+
+
+# Instancia única por proceso; se inicia y se cierra en el lifespan de main.py
+cliente_gv = ClienteGeoVictoria()
+
+
+async def obtener_token_geovictoria():
+    """Devuelve el token compartido (solo hace login si no hay uno vigente)."""
     try:
-        return int(parts[0]) + (int(parts[1]) / 60)
-    except (ValueError, IndexError):
-        return 0
-    
+        return await cliente_gv.obtener_token()
+    except CircuitoAbiertoError:
+        return None
+
+
+async def puede_consultar_asistencia() -> bool:
+    """
+    True si se puede responder con datos de GeoVictoria: hay token o, con el circuito abierto,
+    se servirá la última asistencia guardada en caché marcada con su antigüedad.
+    """
+    if circuito_gv.esta_abierto():
+        return True
+    return bool(await obtener_token_geovictoria())
+
+async def obtener_datos_consolidados(ruts_limpios: list[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime):
+    """
+    Totales del periodo por RUT. Las peticiones concurrentes por el mismo RUT y rango
+    se suman a la consulta que ya está en curso (single-flight).
+    """
+    ruts_limpios = [r.strip().upper() for r in ruts_limpios if r]
+    if not ruts_limpios:
+        return {}
+    resultados = await coalescedor_gv.ejecutar(
+        "consolidado", ruts_limpios, fecha_inicio_dt, fecha_fin_dt, _consultar_datos_consolidados
+    )
+    return {rut: valor for rut, valor in resultados.items() if valor is not None}
 
 
-async def obtener_datos_consolidados(token: str, ruts_limpios: list[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime):
+async def obtener_registros_periodo(ruts_limpios: list[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime) -> List[DiaAsistencia]:
+    """
+    Asistencia diaria procesada por RUT, como registros DiaAsistencia. Los RUTs que ya se están
+    consultando para un rango que cubre al pedido se esperan; solo los nuevos generan tráfico.
+    """
+    ruts_limpios = list(dict.fromkeys(r.strip().upper() for r in ruts_limpios if r))
+    if not ruts_limpios:
+        return []
+
+    async def consultar(ruts_nuevos, inicio_dt, fin_dt):
+        por_rut = {}
+        for dia in await _consultar_datos_completos_periodo(ruts_nuevos, inicio_dt, fin_dt):
+            por_rut.setdefault(dia.rut_limpio, []).append(dia)
+        return por_rut
+
+    resultados = await coalescedor_gv.ejecutar(
+        "asistencia", ruts_limpios, fecha_inicio_dt, fecha_fin_dt, consultar, permite_contencion=True
+    )
+    desde = fecha_inicio_dt.strftime('%Y-%m-%d')
+    hasta = fecha_fin_dt.strftime('%Y-%m-%d')
+    return [
+        dia
+        for rut in ruts_limpios
+        for dia in (resultados.get(rut) or [])
+        if desde <= dia.fecha <= hasta
+    ]
+
+
+async def obtener_datos_completos_periodo(ruts_limpios: list[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime):
+    """Igual que obtener_registros_periodo, pero devuelve un dict por día (formato histórico)."""
+    registros = await obtener_registros_periodo(ruts_limpios, fecha_inicio_dt, fecha_fin_dt)
+    return [dia.a_dict() for dia in registros]
+
+
+async def _consultar_datos_consolidados(ruts_limpios: list[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime):
     """
     Consulta el endpoint Consolidated de GeoVictoria para obtener totales del periodo.
-    Optimizado con paralelismo, semáforo y reintentos para evitar 429.
+    Optimizado con paralelismo y reintentos; la concurrencia la regula el limitador global.
     """
     if not ruts_limpios:
         return {}
 
-    headers = {
-        'Authorization': f'Bearer {token}',
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
     # Formato requerido por GeoVictoria: YYYYMMDDHHMMSS
     start_date = fecha_inicio_dt.strftime("%Y%m%d000000")
     end_date = fecha_fin_dt.strftime("%Y%m%d235959")
 
-    # GeoVictoria tiene un límite de 1500 registros por petición (días * usuarios)
-    # Calculamos el tamaño del lote dinámicamente según el rango de fechas
-    delta = fecha_fin_dt - fecha_inicio_dt
-    num_dias = max(1, delta.days + 1)
-    # Usamos 1400 como margen de seguridad
-    CHUNK_SIZE = max(1, 1400 // num_dias)
-    # Limitamos a un máximo de 100 por lote por estabilidad general
-    CHUNK_SIZE = min(CHUNK_SIZE, 100)
-
     RETRY_COUNT = 3
-    RETRY_DELAY = 1
-    MAX_CONCURRENCY = 3
-
-    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
     resultados_map = {}
 
-    async def realizar_peticion_lote_consolidado(client, lote_ruts, index):
+    async def realizar_peticion_lote_consolidado(lote_ruts, index):
         payload = {
             "StartDate": start_date,
             "EndDate": end_date,
             "IncludeAll": "0", # Mantenemos string "0" como en el script original
             "UserIds": ",".join(lote_ruts)
         }
-        async with semaphore:
-            for attempt in range(RETRY_COUNT):
-                try:
-                    response = await client.post(GEOVICTORIA_CONSOLIDATED_URL, json=payload, headers=headers)
-
-                    if response.status_code == 429:
-                        espera = (attempt + 1) * 2
-                        print(f"ADVERTENCIA: Rate Limit (429) en GeoVictoria Consolidated. Reintentando en {espera}s...")
-                        await asyncio.sleep(espera)
+        for attempt in range(RETRY_COUNT):
+            try:
+                response = await cliente_gv.post(GEOVICTORIA_CONSOLIDATED_URL, payload)
+
+                if response.status_code == 429:
+                    espera = limitador_gv.backoff(attempt, base=2.0)
+                    print(f"ADVERTENCIA: Rate Limit (429) en GeoVictoria Consolidated. Reintentando en {espera:.1f}s...")
+                    await asyncio.sleep(espera)
+                    continue
+
+                if response.status_code == 400:
+                    print(f"ERROR 400 en lote {index}: {response.text} | Payload: {payload}")
+                    # Si es 400, a veces es por saturación momentánea o parámetros mal formados
+                    if attempt < RETRY_COUNT - 1:
+                        await asyncio.sleep(limitador_gv.backoff(attempt))
                         continue
 
-                    if response.status_code == 400:
-                        print(f"ERROR 400 en lote {index}: {response.text} | Payload: {payload}")
-                        # Si es 400, a veces es por saturación momentánea o parámetros mal formados
-                        if attempt < RETRY_COUNT - 1:
-                            await asyncio.sleep(RETRY_DELAY)
-                            continue
-
-                    response.raise_for_status()
-                    datos = response.json()
-
-                    # Mapeo de resultados (Lógica híbrida del script)
-                    lista_usuarios = []
-                    if isinstance(datos, list):
-                        lista_usuarios = datos
-                    elif isinstance(datos, dict):
-                        for key in ("Users", "WorkedHours", "Data"):
-                            if key in datos:
-                                lista_usuarios = datos[key]
-                                break
-
-                    lote_results = {}
-                    for user in lista_usuarios:
-                        rut = str(user.get("Identifier", "")).strip().replace('.', '').replace('-', '').upper()
-                        if rut:
-                            # Nos aseguramos de capturar las HHEE autorizadas
-                            hhee_decimal = hhmm_to_decimal(user.get("TotalAuthorizedExtraTime", "00:00"))
-                            lote_results[rut] = hhee_decimal
-                    return lote_results
-
-                except Exception as e:
-                    print(f"Error en lote consolidado {index}, intento {attempt + 1}/{RETRY_COUNT}: {e}")
-                    if attempt < RETRY_COUNT - 1:
-                        await asyncio.sleep(RETRY_DELAY)
-            return {}
+                response.raise_for_status()
+                datos = response.json()
+
+                # Mapeo de resultados (Lógica híbrida del script)
+                lista_usuarios = []
+                if isinstance(datos, list):
+                    lista_usuarios = datos
+                elif isinstance(datos, dict):
+                    for key in ("Users", "WorkedHours", "Data"):
+                        if key in datos:
+                            lista_usuarios = datos[key]
+                            break
+
+                lote_results = {}
+                for user in lista_usuarios:
+                    rut = limpiar_rut(str(user.get("Identifier", "")))
+                    if rut:
+                        # Nos aseguramos de capturar las HHEE autorizadas
+                        hhee_decimal = hhmm_to_decimal(user.get("TotalAuthorizedExtraTime", "00:00"))
+                        lote_results[rut] = hhee_decimal
+                return lote_results
+
+            except CircuitoAbiertoError:
+                raise
+            except Exception as e:
+                print(f"Error en lote consolidado {index}, intento {attempt + 1}/{RETRY_COUNT}: {e}")
+                if attempt < RETRY_COUNT - 1:
+                    await asyncio.sleep(limitador_gv.backoff(attempt))
+        return {}
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        tasks = []
-        for i in range(0, len(ruts_limpios), CHUNK_SIZE):
-            lote_actual = ruts_limpios[i:i + CHUNK_SIZE]
-            tasks.append(realizar_peticion_lote_consolidado(client, lote_actual, i))
+    # Los totales son del periodo completo: se parte solo por RUTs, bajo el tope de registros
+    lotes = planificar_lotes(ruts_limpios, fecha_inicio_dt.date(), fecha_fin_dt.date(), permite_ventanas=False)
+    estadisticas_planificador["peticiones"] += len(lotes)
+    tasks = [realizar_peticion_lote_consolidado(lote.ruts, i) for i, lote in enumerate(lotes)]
 
-        resultados_lotes = await asyncio.gather(*tasks)
-        for lote_res in resultados_lotes:
-            resultados_map.update(lote_res)
+    resultados_lotes = await asyncio.gather(*tasks)
+    for lote_res in resultados_lotes:
+        resultados_map.update(lote_res)
 
     return resultados_map
 
 
-async def obtener_datos_completos_periodo(token: str, ruts_limpios: list[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime):
-    headers = {'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'}
-    
-    CHUNK_SIZE = 40 # Tamaño de lote por RUTs
+async def _consultar_datos_completos_periodo(ruts_limpios: list[str], fecha_inicio_dt: datetime, fecha_fin_dt: datetime):
     RETRY_COUNT = 3
-    RETRY_DELAY = 1
-    MAX_CONCURRENCY = 3 # Límite de peticiones simultáneas para evitar 429
-    
-    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
 
     # --- FUNCIÓN AUXILIAR INTERNA PARA REALIZAR CONSULTAS EN LOTES (EN PARALELO) ---
-    async def realizar_peticion_lote(client, payload):
-        async with semaphore:
-            for attempt in range(RETRY_COUNT):
-                try:
-                    response = await client.post(GEOVICTORIA_ATTENDANCE_URL, json=payload, headers=headers)
-
-                    if response.status_code == 429:
-                        # Si hay un rate limit, esperamos más tiempo en cada reintento
-                        espera = (attempt + 1) * 2
-                        print(f"ADVERTENCIA: Rate Limit (429) en GeoVictoria. Reintentando en {espera}s...")
-                        await asyncio.sleep(espera)
-                        continue
+    async def realizar_peticion_lote(lote: Lote):
+        """Devuelve la lista 'Users' del lote, o None si falló tras todos los reintentos."""
+        payload = {
+            "StartDate": lote.desde.strftime("%Y%m%d000000"),
+            "EndDate": lote.hasta.strftime("%Y%m%d235959"),
+            "UserIds": ",".join(lote.ruts)
+        }
+        for attempt in range(RETRY_COUNT):
+            try:
+                response = await cliente_gv.post(GEOVICTORIA_ATTENDANCE_URL, payload)
+
+                if response.status_code == 429:
+                    # Backoff con jitter; respeta la pausa global si GeoVictoria envió Retry-After
+                    espera = limitador_gv.backoff(attempt, base=2.0)
+                    print(f"ADVERTENCIA: Rate Limit (429) en GeoVictoria. Reintentando en {espera:.1f}s...")
+                    await asyncio.sleep(espera)
+                    continue
+
+                response.raise_for_status()
+                respuesta_lote = response.json()
+                return respuesta_lote.get("Users") or []
+            except CircuitoAbiertoError:
+                raise
+            except Exception as e:
+                print(f"Error en lote, intento {attempt + 1}/{RETRY_COUNT}: {e}")
+                if attempt < RETRY_COUNT - 1:
+                    await asyncio.sleep(limitador_gv.backoff(attempt))
+        return None
 
-                    response.raise_for_status()
-                    respuesta_lote = response.json()
-                    return respuesta_lote.get("Users") or []
-                except Exception as e:
-                    print(f"Error en lote, intento {attempt + 1}/{RETRY_COUNT}: {e}")
-                    if attempt < RETRY_COUNT - 1:
-                        await asyncio.sleep(RETRY_DELAY)
-            return []
-
-    async def ejecutar_consulta_lotes(lista_ruts):
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            tasks = []
-            for i in range(0, len(lista_ruts), CHUNK_SIZE):
-                lote_actual = lista_ruts[i:i + CHUNK_SIZE]
-                payload = {
-                    "StartDate": fecha_inicio_dt.strftime("%Y%m%d%H%M%S"),
-                    "EndDate": fecha_fin_dt.strftime("%Y%m%d%H%M%S"),
-                    "UserIds": ",".join(lote_actual)
-                }
-                tasks.append(realizar_peticion_lote(client, payload))
-
-            resultados_anidados = await asyncio.gather(*tasks)
-            return [user for sublist in resultados_anidados for user in sublist]
-
-    # --- 1. PRIMERA CONSULTA MASIVA ---
-    todos_los_usuarios_gv = await ejecutar_consulta_lotes(ruts_limpios)
-
-    # --- 2. BLOQUE DE VERIFICACIÓN Y RECUPERACIÓN ---
-    ruts_recibidos = {str(usuario.get('Identifier')).strip().replace('.', '').replace('-', '').upper() for usuario in todos_los_usuarios_gv if usuario.get('Identifier')}
-    ruts_solicitados = set(ruts_limpios)
-    ruts_faltantes = list(ruts_solicitados - ruts_recibidos)
-
-    if ruts_faltantes:
-        print(f"ADVERTENCIA: Faltaron {len(ruts_faltantes)} RUTs. Iniciando recuperación.")
-        print(f"RUTs faltantes para recuperar: {ruts_faltantes}")
-        usuarios_recuperados = await ejecutar_consulta_lotes(ruts_faltantes)
-        if usuarios_recuperados:
-            todos_los_usuarios_gv.extend(usuarios_recuperados)
-            print(f"Se recuperaron datos para {len(usuarios_recuperados)} empleados.")
+    async def ejecutar_lotes(lotes: List[Lote]):
+        estadisticas_planificador["peticiones"] += len(lotes)
+        resultados = await asyncio.gather(*(realizar_peticion_lote(lote) for lote in lotes))
+        usuarios, fallidos = [], []
+        for lote, usuarios_lote in zip(lotes, resultados):
+            if usuarios_lote is None:
+                fallidos.append(lote)
+            else:
+                usuarios.extend(usuarios_lote)
+        return usuarios, fallidos
+
+    # --- 1. CONSULTA PLANIFICADA (RUTs x VENTANAS DE FECHAS BAJO EL TOPE DE REGISTROS) ---
+    estadisticas_planificador["consultas"] += 1
+    lotes = planificar_lotes(ruts_limpios, fecha_inicio_dt.date(), fecha_fin_dt.date())
+    todos_los_usuarios_gv, fallidos = await ejecutar_lotes(lotes)
+
+    # --- 2. REINTENTO DIRIGIDO: SOLO LOS LOTES QUE FALLARON, PARTIDOS EN MITADES ---
+    # Los RUTs ausentes de una respuesta exitosa no existen en GeoVictoria para ese rango; no se repiten.
+    if fallidos:
+        estadisticas_planificador["lotes_fallidos"] += len(fallidos)
+        print(f"ADVERTENCIA: Fallaron {len(fallidos)} de {len(lotes)} lotes. Reintentando solo esos lotes.")
+        recuperados, fallidos = await ejecutar_lotes([mitad for lote in fallidos for mitad in dividir_lote(lote)])
+        todos_los_usuarios_gv.extend(recuperados)
+        if fallidos:
+            estadisticas_planificador["lotes_perdidos"] += len(fallidos)
+            print(f"ERROR: {len(fallidos)} lotes de GeoVictoria no pudieron recuperarse.")
 
     # --- 3. PROCESAMIENTO FINAL CON LÓGICA DE LIMPIEZA DEFENSIVA ---
     if not todos_los_usuarios_gv:
         return []
-    
-    dias_procesados_total = []
-    
-    for usuario in todos_los_usuarios_gv:
-        rut_usuario_raw = usuario.get('Identifier')
-
-        # --- INICIO DEL CÓDIGO DEFENSIVO ---
-        if not rut_usuario_raw or not isinstance(rut_usuario_raw, str):
-            print(f"ADVERTENCIA: Se recibió un registro de GeoVictoria sin un 'Identifier' válido. Omitiendo. Datos: {usuario}")
-            continue
-        
-        rut_usuario = str(rut_usuario_raw).strip().replace('.', '').replace('-', '').upper()
-        # --- FIN DEL CÓDIGO DEFENSIVO ---
-
-        intervalos = usuario.get("PlannedInterval", []) or []
-        for intervalo_diario in intervalos:
-            fecha_str = intervalo_diario.get("Date", "")
-            if not fecha_str: continue
-            
-            fecha_dt = datetime.strptime(fecha_str, '%Y%m%d%H%M%S')
-            fecha_actual_str = fecha_dt.strftime('%Y-%m-%d')
-            marcas = sorted([p for p in intervalo_diario.get("Punches", []) or [] if p.get("Date")], key=lambda x: x['Date'])
-            entradas, salidas = [], []
-            if marcas:
-                marcas_dt = [pd.to_datetime(p['Date'], format='%Y%m%d%H%M%S') for p in marcas]
-                entradas.append(min(marcas_dt))
-                if len(marcas_dt) > 1: salidas.append(max(marcas_dt))
-            
-            turno = (intervalo_diario.get("Shifts", []) or [{}])[0]
-            permisos_del_dia = [p.get("TimeOffTypeDescription") for p in intervalo_diario.get("TimeOffs", []) or [] if p.get("TimeOffTypeDescription")]
-            
-            datos_dia = {
-                "fecha": fecha_actual_str,
-                "nombre_apellido": f"{usuario.get('Name', '')} {usuario.get('LastName', '')}".strip(),
-                "rut_limpio": rut_usuario,
-                "rut": rut_usuario,
-                "campaña": usuario.get('GroupDescription'),
-                "inicio_turno_teorico": turno.get('StartTime'), "fin_turno_teorico": turno.get('ExitTime'),
-                "marca_real_inicio": min(entradas).strftime('%H:%M') if entradas else None,
-                "marca_real_fin": max(salidas).strftime('%H:%M') if salidas else None,
-                "hhee_autorizadas_antes_gv": hhmm_to_decimal(intervalo_diario.get("AuthorizedOvertimeBefore")),
-                "hhee_autorizadas_despues_gv": hhmm_to_decimal(intervalo_diario.get("AuthorizedOvertimeAfter")),
-                "permisos": permisos_del_dia
-            }
-            dias_procesados_total.append(datos_dia)
-            
-    return dias_procesados_total
+
+    # Parseo por posición de las marcas; las respuestas grandes se procesan fuera del event loop
+    return await parsear_usuarios_async(todos_los_usuarios_gv)
 
     
 def aplicar_logica_de_negocio(datos_procesados):
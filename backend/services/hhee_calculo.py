@@ -0,0 +1,143 @@
+# /backend/services/hhee_calculo.py
+"""
+Motor vectorizado de cálculo de HHEE sobre periodos completos.
+
+Replica exactamente `geovictoria_service.aplicar_logica_de_negocio`, pero trabaja
+con arreglos columnares de NumPy (minutos desde medianoche) para procesar todos
+los días de todos los empleados en una sola pasada.
+"""
+from typing import List, Dict, Any, Iterable
+
+import numpy as np
+
+from .geovictoria_service import aplicar_logica_de_negocio
+
+
+# Tabla precalculada 'HH:MM' -> minutos desde medianoche (solo 1440 valores posibles)
+_MINUTOS_POR_HHMM = {f"{h:02d}:{m:02d}": h * 60 + m for h in range(24) for m in range(60)}
+
+
+def _hhmm_a_minutos(valor) -> int:
+    """'HH:MM' -> minutos desde medianoche. -1 si el valor no tiene el formato exacto."""
+    try:
+        return _MINUTOS_POR_HHMM.get(valor, -1)
+    except TypeError:
+        return -1
+
+
+def _es_descanso(inicio_teorico, fin_teorico) -> bool:
+    return not inicio_teorico or inicio_teorico.lower() == 'descanso' or (inicio_teorico == "00:00" and fin_teorico == "00:00")
+
+
+def calcular_hhee_lote(dias: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Calcula `tipo_hhee`, `hhee_inicio_calculadas`, `hhee_fin_calculadas` y
+    `cantidad_hhee_calculadas` para todos los días recibidos.
+    Devuelve una lista paralela a `dias` con el mismo contenido (y tipos) que la función escalar.
+    """
+    n = len(dias)
+    if n == 0:
+        return []
+
+    # Extracción columnar: listas de Python que luego se convierten a arreglos de una vez
+    col_inicio_real, col_fin_real, col_inicio_teo, col_fin_teo = [], [], [], []
+    col_descanso, col_sin_marcas = [], []
+    # Filas con formatos inesperados: se calculan con la función escalar para conservar su comportamiento
+    col_irregular = []
+    minutos = _hhmm_a_minutos
+
+    for dia in dias:
+        marca_inicio = dia.get("marca_real_inicio")
+        marca_fin = dia.get("marca_real_fin")
+        irregular = not isinstance(dia.get("fecha"), str)
+        if not marca_inicio or not marca_fin:
+            col_inicio_real.append(0); col_fin_real.append(0); col_inicio_teo.append(0); col_fin_teo.append(0)
+            col_descanso.append(False); col_sin_marcas.append(True); col_irregular.append(irregular)
+            continue
+
+        ini_r, fin_r = minutos(marca_inicio), minutos(marca_fin)
+        ini_t = dia.get("inicio_turno_teorico")
+        fin_t = dia.get("fin_turno_teorico")
+        try:
+            es_descanso = _es_descanso(ini_t, fin_t)
+        except AttributeError:
+            es_descanso, irregular = False, True
+        if es_descanso:
+            ini_tm = fin_tm = 0
+        else:
+            ini_tm, fin_tm = minutos(ini_t), minutos(fin_t)
+
+        col_inicio_real.append(ini_r); col_fin_real.append(fin_r)
+        col_inicio_teo.append(ini_tm); col_fin_teo.append(fin_tm)
+        col_descanso.append(es_descanso); col_sin_marcas.append(False)
+        col_irregular.append(irregular or ini_r < 0 or fin_r < 0 or ini_tm < 0 or fin_tm < 0)
+
+    inicio_real = np.array(col_inicio_real, dtype=np.int32)
+    fin_real = np.array(col_fin_real, dtype=np.int32)
+    inicio_teo = np.array(col_inicio_teo, dtype=np.int32)
+    fin_teo = np.array(col_fin_teo, dtype=np.int32)
+    descanso = np.array(col_descanso, dtype=bool)
+    sin_marcas = np.array(col_sin_marcas, dtype=bool)
+    irregulares = np.array(col_irregular, dtype=bool)
+
+    con_marcas = ~sin_marcas & ~irregulares
+
+    # Marcas nocturnas: si la salida es anterior a la entrada, la salida es al día siguiente
+    fin_real_aj = np.where(fin_real < inicio_real, fin_real + 1440, fin_real)
+    # Turno nocturno
+    fin_teo_aj = np.where(fin_teo < inicio_teo, fin_teo + 1440, fin_teo)
+
+    mask_descanso = con_marcas & descanso
+    mask_laboral = con_marcas & ~descanso
+    mask_antes = mask_laboral & (inicio_real < inicio_teo)
+    mask_despues = mask_laboral & (fin_real_aj > fin_teo_aj)
+
+    # Mismas operaciones en coma flotante que la versión escalar (segundos / 3600)
+    horas_descanso = ((fin_real_aj - inicio_real) * 60).astype(np.float64) / 3600
+    horas_antes = ((inicio_teo - inicio_real) * 60).astype(np.float64) / 3600
+    horas_despues = ((fin_real_aj - fin_teo_aj) * 60).astype(np.float64) / 3600
+
+    hhee_inicio = np.where(mask_descanso, horas_descanso, np.where(mask_antes, horas_antes, 0.0))
+    hhee_fin = np.where(mask_despues, horas_despues, 0.0)
+    total = np.maximum(0, hhee_inicio) + np.maximum(0, hhee_fin)
+
+    total_r = np.round(total, 2)
+    inicio_r = np.round(np.maximum(0, hhee_inicio), 2)
+    fin_r = np.round(np.maximum(0, hhee_fin), 2)
+
+    # Conversión a listas de Python para armar la salida sin indexar arreglos elemento a elemento
+    irregulares, sin_marcas, descanso = irregulares.tolist(), sin_marcas.tolist(), descanso.tolist()
+    mask_antes, mask_despues = mask_antes.tolist(), mask_despues.tolist()
+    hhee_inicio, total_r, inicio_r, fin_r = hhee_inicio.tolist(), total_r.tolist(), inicio_r.tolist(), fin_r.tolist()
+
+    resultados = []
+    for i in range(n):
+        if irregulares[i]:
+            resultados.append(aplicar_logica_de_negocio(dias[i]))
+        elif sin_marcas[i]:
+            resultados.append({"tipo_hhee": "Sin Marcas", "hhee_inicio_calculadas": 0, "hhee_fin_calculadas": 0, "cantidad_hhee_calculadas": 0})
+        elif descanso[i]:
+            resultados.append({
+                "tipo_hhee": "Día de Descanso",
+                # max(0, 0.0) en la versión escalar devuelve el entero 0
+                "cantidad_hhee_calculadas": total_r[i] if hhee_inicio[i] > 0 else 0,
+                "hhee_inicio_calculadas": 0,
+                "hhee_fin_calculadas": 0,
+            })
+        else:
+            antes, despues = mask_antes[i], mask_despues[i]
+            tipo = ("Antes de Turno " if antes else "") + ("Después de Turno" if despues else "")
+            resultados.append({
+                "tipo_hhee": tipo.strip(),
+                # La versión escalar devuelve enteros cuando no hubo horas calculadas
+                "cantidad_hhee_calculadas": total_r[i] if (antes or despues) else 0,
+                "hhee_inicio_calculadas": inicio_r[i] if antes else 0,
+                "hhee_fin_calculadas": fin_r[i] if despues else 0,
+            })
+    return resultados
+
+
+def enriquecer_con_logica(dias: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Equivalente a `[{**dia, **aplicar_logica_de_negocio(dia)} for dia in dias]`, en una pasada."""
+    dias = list(dias)
+    return [{**dia, **logica} for dia, logica in zip(dias, calcular_hhee_lote(dias))]
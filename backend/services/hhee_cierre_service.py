@@ -0,0 +1,219 @@
+# /backend/services/hhee_cierre_service.py
+"""
+Cierre de periodos de HHEE.
+
+Cuando un periodo ya fue enviado a RRHH sus números no cambian más. Cerrarlo guarda una
+foto final en tres tablas:
+  - cierre_hhee_resumen: totales validados por RUT, campaña, tipo y supervisor.
+  - cierre_hhee_rrhh: total autorizado por RRHH (GeoVictoria Consolidated) por RUT.
+  - cierre_hhee_detalle: cada validación aprobada con sus horas RRHH del día.
+Desde entonces /hhee/metricas y la exportación de Operaciones de ese periodo leen solo
+estas tablas, sin consultar GeoVictoria.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..enums import EstadoSolicitudHHEE
+from ..sql_app import models
+from ..utils import rango_periodo_hhee
+from . import asistencia_cache_service, hhee_exportacion, hhee_periodos_service, hhee_resumen_service
+
+# Filas por INSERT al copiar el detalle
+LOTE_CIERRE = 1000
+
+COLUMNAS_CIERRE_RESUMEN = hhee_resumen_service.COLUMNAS_RESUMEN
+
+
+class CierrePeriodoError(Exception):
+    """El periodo no se puede cerrar en su estado actual (ya cerrado, con pendientes o sin datos de RRHH)."""
+
+
+async def _verificar_cerrable(db: AsyncSession, periodo: int):
+    v, s = models.ValidacionHHEE, models.SolicitudHHEE
+    conteos = (await db.execute(
+        select(
+            func.count(v.id).filter(v.estado == 'Validado', v.reportado_a_rrhh == False).label("sin_reportar"),
+            func.count(v.id).filter(v.estado == 'Pendiente por Corrección').label("pendientes")
+        ).filter(v.periodo_id == periodo)
+    )).one()
+    solicitudes_pendientes = await db.scalar(
+        select(func.count(s.id)).filter(s.periodo_id == periodo, s.estado == EstadoSolicitudHHEE.PENDIENTE)
+    )
+
+    motivos = []
+    if conteos.sin_reportar:
+        motivos.append(f"{conteos.sin_reportar} HHEE validadas aún no reportadas a RRHH")
+    if conteos.pendientes:
+        motivos.append(f"{conteos.pendientes} HHEE pendientes por corrección")
+    if solicitudes_pendientes:
+        motivos.append(f"{solicitudes_pendientes} solicitudes pendientes")
+    if motivos:
+        raise CierrePeriodoError(f"No se puede cerrar el periodo {periodo}: " + ", ".join(motivos) + ".")
+
+
+async def _datos_geovictoria(ruts_limpios: List[str], periodo: int) -> Tuple[Dict[str, float], Dict[Tuple[str, str], Tuple[float, float]]]:
+    """Totales Consolidated y horas autorizadas por día de los RUTs del periodo, recién pedidos a GeoVictoria (no de respaldo)."""
+    inicio, fin = rango_periodo_hhee(periodo)
+    totales, antiguedad = await asistencia_cache_service.obtener_consolidados(ruts_limpios, inicio, fin, forzar=True)
+    faltantes = [r for r in ruts_limpios if r not in totales]
+    if antiguedad is not None or faltantes:
+        raise CierrePeriodoError(
+            f"GeoVictoria no devolvió los totales de RRHH de {len(faltantes) or 'algunos'} RUTs; intente cerrar más tarde."
+        )
+
+    # Las horas autorizadas por día se piden de nuevo: RRHH las carga hasta el final del periodo
+    datos_gv = await asistencia_cache_service.obtener_datos_periodo(
+        ruts_limpios, datetime.combine(inicio, datetime.min.time()), datetime.combine(fin, datetime.max.time()), forzar=True
+    )
+    ruts_con_dias = {dia['rut_limpio'] for dia in datos_gv if not dia.get('desactualizado')}
+    sin_dias = [r for r in ruts_limpios if r not in ruts_con_dias]
+    if sin_dias or any(dia.get('desactualizado') for dia in datos_gv):
+        raise CierrePeriodoError(
+            f"GeoVictoria no devolvió la asistencia del periodo de {len(sin_dias) or 'algunos'} RUTs; intente cerrar más tarde."
+        )
+    horas_por_dia = {
+        (dia['rut_limpio'], dia['fecha']): (
+            dia.get('hhee_autorizadas_antes_gv', 0) or 0,
+            dia.get('hhee_autorizadas_despues_gv', 0) or 0
+        )
+        for dia in datos_gv
+    }
+    return totales, horas_por_dia
+
+
+async def _validadas_del_periodo(db: AsyncSession, periodo: int):
+    v = models.ValidacionHHEE
+    return (await db.execute(
+        select(*hhee_exportacion.COLUMNAS_CONSULTA).filter(v.estado == 'Validado', v.periodo_id == periodo)
+    )).all()
+
+
+async def cerrar_periodo(db: AsyncSession, periodo: int, analista_id: int) -> Dict[str, Any]:
+    """
+    Congela el periodo en tres pasos, sin mantener una transacción abierta mientras se
+    espera a GeoVictoria:
+      1. Transacción corta: registra el periodo, verifica que se pueda cerrar y lee los RUTs.
+      2. Sin transacción: totales Consolidated y horas autorizadas por día de esos RUTs.
+      3. Transacción corta: bloquea la fila del periodo (FOR UPDATE, excluye a las escrituras
+         que la toman FOR SHARE), vuelve a verificar, escribe las fotos y lo marca cerrado.
+    """
+    await hhee_periodos_service.asegurar_periodos(db, [periodo])
+    await db.commit()
+    if await hhee_periodos_service.periodos_cerrados(db, [periodo]):
+        raise CierrePeriodoError(f"El periodo {periodo} ya está cerrado.")
+    await _verificar_cerrable(db, periodo)
+    ruts_limpios = sorted({f.rut_limpio for f in await _validadas_del_periodo(db, periodo) if f.rut_limpio})
+    # Se libera la conexión antes de ir a GeoVictoria
+    await db.rollback()
+
+    totales_rrhh, horas_por_dia = await _datos_geovictoria(ruts_limpios, periodo) if ruts_limpios else ({}, {})
+
+    registro = (await db.execute(
+        select(models.PeriodoHHEE).filter(models.PeriodoHHEE.id == periodo).with_for_update()
+    )).scalar_one()
+    if registro.cerrado:
+        raise CierrePeriodoError(f"El periodo {periodo} ya está cerrado.")
+    await _verificar_cerrable(db, periodo)
+    validadas = await _validadas_del_periodo(db, periodo)
+    if {f.rut_limpio for f in validadas if f.rut_limpio} - set(ruts_limpios):
+        raise CierrePeriodoError(f"El periodo {periodo} cambió mientras se consultaba GeoVictoria; intente cerrarlo nuevamente.")
+
+    # Un intento de cierre anterior que no llegó a confirmarse no deja filas, pero por las dudas
+    for modelo in (models.CierreHHEEResumen, models.CierreHHEERRHH, models.CierreHHEEDetalle):
+        await db.execute(delete(modelo).where(modelo.periodo == periodo))
+
+    await db.execute(
+        models.CierreHHEEResumen.__table__.insert().from_select(
+            COLUMNAS_CIERRE_RESUMEN, hhee_resumen_service.consulta_agregada([periodo])
+        )
+    )
+
+    filas_rrhh = [{"periodo": periodo, "rut_limpio": rut, "total_hhee_rrhh": total or 0} for rut, total in totales_rrhh.items()]
+    filas_detalle = []
+    for f in validadas:
+        antes, despues = horas_por_dia.get((f.rut_limpio, f.fecha_hhee.strftime('%Y-%m-%d')), (0, 0))
+        filas_detalle.append({
+            "periodo": periodo, "validacion_id": f.id, "rut": f.rut, "rut_limpio": f.rut_limpio or "",
+            "nombre_apellido": f.nombre_apellido, "campaña": f.campaña, "fecha_hhee": f.fecha_hhee,
+            "tipo_hhee": f.tipo_hhee, "cantidad_hhee_aprobadas": f.cantidad_hhee_aprobadas,
+            "horas_rrhh": hhee_exportacion.horas_rrhh_por_tipo(f.tipo_hhee, antes, despues),
+            "estado": f.estado, "supervisor_carga": f.supervisor_carga, "fecha_carga": f.fecha_carga,
+        })
+    for modelo, filas in ((models.CierreHHEERRHH, filas_rrhh), (models.CierreHHEEDetalle, filas_detalle)):
+        for i in range(0, len(filas), LOTE_CIERRE):
+            await db.execute(modelo.__table__.insert(), filas[i:i + LOTE_CIERRE])
+
+    s = models.SolicitudHHEE
+    horas_aprobadas, horas_rechazadas = (await db.execute(
+        select(
+            func.coalesce(func.sum(s.horas_aprobadas).filter(s.estado == EstadoSolicitudHHEE.APROBADA), 0.0),
+            func.coalesce(func.sum(s.horas_solicitadas).filter(s.estado == EstadoSolicitudHHEE.RECHAZADA), 0.0)
+        ).filter(s.periodo_id == periodo)
+    )).one()
+
+    await db.execute(
+        update(models.PeriodoHHEE).where(models.PeriodoHHEE.id == periodo).values(
+            cerrado=True,
+            fecha_cierre=func.now(),
+            cerrado_por_id=analista_id,
+            horas_aprobadas_solicitud=float(horas_aprobadas),
+            horas_rechazadas_solicitud=float(horas_rechazadas)
+        )
+    )
+    await db.commit()
+    hhee_periodos_service.marcar_cerrado(periodo)
+
+    return {
+        "periodo": periodo,
+        "validaciones": len(filas_detalle),
+        "empleados": len(ruts_limpios),
+        "total_hhee_declaradas": sum(f.cantidad_hhee_aprobadas or 0 for f in validadas),
+        "total_hhee_rrhh": sum(f["total_hhee_rrhh"] for f in filas_rrhh),
+    }
+
+
+# --- LECTURAS DE PERIODOS CERRADOS (sin GeoVictoria) ---
+
+async def leer_resumen(db: AsyncSession, periodos: List[int], supervisor_email: Optional[str] = None):
+    """Igual que hhee_resumen_service.leer_resumen, desde la foto del cierre."""
+    r = models.CierreHHEEResumen
+    query = select(
+        func.max(r.rut).label("rut"),
+        r.rut_limpio,
+        func.max(r.nombre_apellido).label("nombre_apellido"),
+        r.campaña,
+        func.sum(r.total_horas).label("cantidad_hhee_aprobadas")
+    ).filter(r.periodo.in_(periodos))
+    if supervisor_email:
+        query = query.filter(r.supervisor_carga == supervisor_email)
+    result = await db.execute(query.group_by(r.rut_limpio, r.campaña))
+    return result.all()
+
+
+async def leer_totales_rrhh(db: AsyncSession, periodos: List[int], ruts_limpios: List[str]) -> Dict[str, float]:
+    """Total RRHH por RUT sumado sobre los periodos cerrados pedidos."""
+    if not ruts_limpios:
+        return {}
+    r = models.CierreHHEERRHH
+    result = await db.execute(
+        select(r.rut_limpio, func.sum(r.total_hhee_rrhh))
+        .filter(r.periodo.in_(periodos), r.rut_limpio.in_(ruts_limpios))
+        .group_by(r.rut_limpio)
+    )
+    return {rut: float(total or 0) for rut, total in result.all()}
+
+
+async def leer_totales_solicitudes(db: AsyncSession, periodos: List[int]) -> Tuple[float, float]:
+    """(horas aprobadas, horas rechazadas) de solicitudes congeladas al cierre."""
+    p = models.PeriodoHHEE
+    aprobadas, rechazadas = (await db.execute(
+        select(
+            func.coalesce(func.sum(p.horas_aprobadas_solicitud), 0.0),
+            func.coalesce(func.sum(p.horas_rechazadas_solicitud), 0.0)
+        ).filter(p.id.in_(periodos))
+    )).one()
+    return float(aprobadas), float(rechazadas)
@@ -0,0 +1,174 @@
+# /backend/services/hhee_exportacion.py
+"""
+Consultas y formatos de fila de las exportaciones de HHEE (RRHH/ADP y Operaciones).
+
+Las filas se arman a partir de columnas sueltas (no objetos ORM) para que el
+cursor de `exportacion_service` traiga solo lo necesario.
+"""
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..database import AsyncSessionLocal
+from ..sql_app import models
+from ..utils import decimal_to_hhmm
+from . import asistencia_cache_service, exportacion_trabajos, hhee_periodos_service
+
+COLUMNAS_RRHH = ["Cod Funcionario", "Nombre", "Num Permiso", "Fecha Inicio", "Fecha Fin", "Cant Horas"]
+COLUMNAS_OPERACIONES = [
+    "ID", "RUT", "Nombre Completo", "Campaña", "Fecha HHEE", "Tipo HHEE",
+    "Horas Aprobadas (Operaciones)", "Horas Aprobadas (RRHH)", "Estado", "Validado Por", "Fecha de Carga"
+]
+PERMISO_POR_TIPO = {"Antes de Turno": 10, "Después de Turno": 5, "Día de Descanso": 10}
+
+COLUMNAS_CONSULTA = (
+    models.ValidacionHHEE.id, models.ValidacionHHEE.rut, models.ValidacionHHEE.rut_limpio,
+    models.ValidacionHHEE.nombre_apellido, models.ValidacionHHEE.campaña, models.ValidacionHHEE.fecha_hhee,
+    models.ValidacionHHEE.tipo_hhee, models.ValidacionHHEE.cantidad_hhee_aprobadas, models.ValidacionHHEE.estado,
+    models.ValidacionHHEE.supervisor_carga, models.ValidacionHHEE.fecha_carga,
+)
+
+
+def consulta_validadas(fecha_inicio: date, fecha_fin: date, solo_no_reportadas: bool, supervisor_email: Optional[str] = None):
+    """Validaciones aprobadas del rango, ordenadas por RUT y fecha."""
+    query = select(*COLUMNAS_CONSULTA).filter(
+        models.ValidacionHHEE.estado == 'Validado',
+        hhee_periodos_service.filtro_fechas(models.ValidacionHHEE, fecha_inicio, fecha_fin)
+    )
+    if supervisor_email:
+        query = query.filter(models.ValidacionHHEE.supervisor_carga == supervisor_email)
+    if solo_no_reportadas:
+        query = query.filter(models.ValidacionHHEE.reportado_a_rrhh == False)
+    return query.order_by(models.ValidacionHHEE.rut, models.ValidacionHHEE.fecha_hhee)
+
+
+def consulta_marcar_rrhh(fecha_inicio: date, fecha_fin: date, analista_id: int):
+    """
+    Marca como reportadas a RRHH las validaciones aprobadas del rango que aún no lo estaban
+    y devuelve sus columnas de exportación, en una sola sentencia:
+        WITH marcadas AS (UPDATE ... RETURNING ...) SELECT ... ORDER BY rut, fecha_hhee
+    Una exportación concurrente del mismo rango espera el bloqueo de las filas y ya no las
+    encuentra sin reportar, así que nunca salen en dos archivos. Los cambios quedan en la
+    transacción de quien ejecuta la consulta hasta que confirme.
+    """
+    v = models.ValidacionHHEE
+    marcadas = (
+        update(v)
+        .where(
+            v.estado == 'Validado',
+            hhee_periodos_service.filtro_fechas(v, fecha_inicio, fecha_fin),
+            v.reportado_a_rrhh == False
+        )
+        .values(reportado_a_rrhh=True, reportado_por_id=analista_id, fecha_reportado=func.now())
+        .returning(v.id, v.rut, v.nombre_apellido, v.fecha_hhee, v.tipo_hhee, v.cantidad_hhee_aprobadas)
+        .cte("marcadas")
+    )
+    return select(marcadas).order_by(marcadas.c.rut, marcadas.c.fecha_hhee)
+
+
+def fila_rrhh(v) -> List[Any]:
+    return [
+        v.rut, v.nombre_apellido, PERMISO_POR_TIPO.get(v.tipo_hhee, ''),
+        v.fecha_hhee.strftime('%d/%m/%Y'), v.fecha_hhee.strftime('%d/%m/%Y'),
+        decimal_to_hhmm(v.cantidad_hhee_aprobadas)
+    ]
+
+
+async def obtener_horas_rrhh(db: AsyncSession, query, fecha_inicio: date, fecha_fin: date) -> Dict[Tuple[str, str], Tuple[float, float]]:
+    """Horas autorizadas en GeoVictoria (antes, después) por (rut_limpio, 'YYYY-MM-DD') de los RUTs de la consulta."""
+    query_ruts = query.with_only_columns(models.ValidacionHHEE.rut_limpio).distinct().order_by(None)
+    ruts_unicos = (await db.execute(query_ruts)).scalars().all()
+    if not ruts_unicos:
+        return {}
+
+    fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
+    fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
+    datos_gv = await asistencia_cache_service.obtener_datos_periodo(list(ruts_unicos), fecha_inicio_dt, fecha_fin_dt)
+    return {
+        (dia['rut_limpio'], dia['fecha']): (
+            dia.get('hhee_autorizadas_antes_gv', 0) or 0,
+            dia.get('hhee_autorizadas_despues_gv', 0) or 0
+        )
+        for dia in datos_gv
+    }
+
+
+def horas_rrhh_por_tipo(tipo_hhee: Optional[str], antes: float, despues: float) -> float:
+    """Horas autorizadas en GeoVictoria que corresponden al tipo de la validación."""
+    if tipo_hhee == "Antes de Turno":
+        return antes
+    if tipo_hhee == "Después de Turno":
+        return despues
+    if tipo_hhee == "Día de Descanso":
+        return antes + despues
+    return 0
+
+
+def _fila_operaciones(v, horas_rrhh_especificas: float) -> List[Any]:
+    return [
+        v.id, v.rut, v.nombre_apellido, v.campaña,
+        v.fecha_hhee.strftime('%d-%m-%Y'), v.tipo_hhee,
+        decimal_to_hhmm(v.cantidad_hhee_aprobadas),
+        decimal_to_hhmm(horas_rrhh_especificas),
+        v.estado, v.supervisor_carga,
+        v.fecha_carga.strftime('%d-%m-%Y %H:%M') if v.fecha_carga else None
+    ]
+
+
+def formateador_operaciones(horas_rrhh: Dict[Tuple[str, str], Tuple[float, float]]) -> Callable[[Any], Sequence[Any]]:
+    def fila_operaciones(v) -> List[Any]:
+        antes, despues = horas_rrhh.get((v.rut_limpio, v.fecha_hhee.strftime('%Y-%m-%d')), (0, 0))
+        return _fila_operaciones(v, horas_rrhh_por_tipo(v.tipo_hhee, antes, despues))
+    return fila_operaciones
+
+
+# --- PERIODOS CERRADOS ---
+# La foto del cierre (cierre_hhee_detalle) ya trae las horas RRHH de cada fila: sin GeoVictoria
+
+def consulta_cierre(periodos: List[int], supervisor_email: Optional[str] = None):
+    """Validaciones aprobadas de periodos cerrados, con las mismas etiquetas que COLUMNAS_CONSULTA."""
+    d = models.CierreHHEEDetalle
+    query = select(
+        d.validacion_id.label("id"), d.rut, d.rut_limpio, d.nombre_apellido, d.campaña, d.fecha_hhee,
+        d.tipo_hhee, d.cantidad_hhee_aprobadas, d.estado, d.supervisor_carga, d.fecha_carga, d.horas_rrhh
+    ).filter(d.periodo.in_(periodos))
+    if supervisor_email:
+        query = query.filter(d.supervisor_carga == supervisor_email)
+    return query.order_by(d.rut, d.fecha_hhee)
+
+
+def fila_operaciones_cierre(v) -> List[Any]:
+    return _fila_operaciones(v, v.horas_rrhh)
+
+
+async def preparar_exportacion(db: AsyncSession, fecha_inicio: date, fecha_fin: date, es_operaciones: bool,
+                               supervisor_email: Optional[str] = None):
+    """
+    (consulta, columnas, formateador) de una exportación. El formato Operaciones de periodos
+    cerrados sale de la foto del cierre; si no, de validaciones_hhee más GeoVictoria.
+    """
+    if not es_operaciones:
+        query = consulta_validadas(fecha_inicio, fecha_fin, solo_no_reportadas=True, supervisor_email=supervisor_email)
+        return query, COLUMNAS_RRHH, fila_rrhh
+
+    periodos_cerrados = await hhee_periodos_service.rango_cerrado(db, fecha_inicio, fecha_fin)
+    if periodos_cerrados:
+        return consulta_cierre(periodos_cerrados, supervisor_email), COLUMNAS_OPERACIONES, fila_operaciones_cierre
+
+    query = consulta_validadas(fecha_inicio, fecha_fin, solo_no_reportadas=False, supervisor_email=supervisor_email)
+    horas_rrhh = await obtener_horas_rrhh(db, query, fecha_inicio, fecha_fin)
+    return query, COLUMNAS_OPERACIONES, formateador_operaciones(horas_rrhh)
+
+
+async def producir_exportacion(trabajo, fecha_inicio: date, fecha_fin: date, es_operaciones: bool, nombre_hoja: str, supervisor_email: Optional[str] = None):
+    """Productor del trabajo de exportación asíncrono (mismos filtros y columnas que /hhee/exportar)."""
+    async with AsyncSessionLocal() as db:
+        query, columnas, formateador = await preparar_exportacion(db, fecha_inicio, fecha_fin, es_operaciones, supervisor_email)
+
+    await exportacion_trabajos.exportar_consulta(
+        trabajo, query, columnas, formateador, nombre_hoja,
+        mensaje_sin_resultados="No se encontraron HHEE para los filtros seleccionados."
+    )
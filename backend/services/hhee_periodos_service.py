@@ -0,0 +1,110 @@
+# /backend/services/hhee_periodos_service.py
+"""
+Registro de periodos de HHEE (tabla periodos_hhee) y filtros por periodo.
+
+validaciones_hhee y solicitudes_hhee guardan `periodo_id` (YYYYMM, columna generada e
+indexada), así que un rango que cubre periodos completos se filtra por igualdad en vez
+de por BETWEEN sobre fechas. Los periodos cerrados no cambian más.
+"""
+from datetime import date
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..sql_app import models
+from ..utils import periodo_hhee, periodos_completos_en_rango, rango_periodo_hhee, siguiente_periodo_hhee
+
+# Un periodo cerrado no se reabre: se recuerda en memoria para no volver a consultarlo
+_periodos_cerrados: Set[int] = set()
+
+
+def filtro_fechas(modelo, fecha_inicio: date, fecha_fin: date):
+    """
+    Condición sobre `modelo` (ValidacionHHEE o SolicitudHHEE) para un rango de fechas:
+    igualdad por periodo_id si el rango son periodos completos, BETWEEN si no.
+    """
+    periodos = periodos_completos_en_rango(fecha_inicio, fecha_fin)
+    if periodos:
+        return modelo.periodo_id == periodos[0] if len(periodos) == 1 else modelo.periodo_id.in_(periodos)
+    return modelo.fecha_hhee.between(fecha_inicio, fecha_fin)
+
+
+def periodos_del_rango(fecha_inicio: date, fecha_fin: date) -> List[int]:
+    """Periodos que toca el rango, aunque sea en parte."""
+    periodos, periodo = [], periodo_hhee(fecha_inicio)
+    while periodo <= periodo_hhee(fecha_fin):
+        periodos.append(periodo)
+        periodo = siguiente_periodo_hhee(periodo)
+    return periodos
+
+
+async def asegurar_periodos(db: AsyncSession, periodos: Iterable[int]):
+    """Registra los periodos que aún no existen en periodos_hhee (no confirma la transacción)."""
+    filas = []
+    for periodo in sorted(set(periodos)):
+        inicio, fin = rango_periodo_hhee(periodo)
+        filas.append({"id": periodo, "fecha_inicio": inicio, "fecha_fin": fin})
+    if filas:
+        await db.execute(pg_insert(models.PeriodoHHEE).values(filas).on_conflict_do_nothing(index_elements=["id"]))
+
+
+async def periodos_cerrados(db: AsyncSession, periodos: Iterable[int]) -> Set[int]:
+    """Cuáles de los periodos pedidos están cerrados."""
+    periodos = set(periodos)
+    pendientes = periodos - _periodos_cerrados
+    if pendientes:
+        result = await db.execute(
+            select(models.PeriodoHHEE.id).filter(models.PeriodoHHEE.id.in_(pendientes), models.PeriodoHHEE.cerrado.is_(True))
+        )
+        _periodos_cerrados.update(result.scalars().all())
+    return periodos & _periodos_cerrados
+
+
+async def bloquear_periodos(db: AsyncSession, periodos: Iterable[int]) -> Set[int]:
+    """
+    Para las escrituras (cargas, solicitudes y aprobaciones): registra los periodos y toma
+    sus filas FOR SHARE hasta el fin de la transacción, de modo que un cierre (FOR UPDATE)
+    no pueda confirmarse en medio. Devuelve cuáles están cerrados.
+    """
+    periodos = set(periodos)
+    if not periodos:
+        return set()
+    await asegurar_periodos(db, periodos)
+    result = await db.execute(
+        select(models.PeriodoHHEE.id, models.PeriodoHHEE.cerrado)
+        .filter(models.PeriodoHHEE.id.in_(periodos))
+        .order_by(models.PeriodoHHEE.id)
+        .with_for_update(read=True)
+    )
+    cerrados = {periodo for periodo, cerrado in result.all() if cerrado}
+    _periodos_cerrados.update(cerrados)
+    return cerrados
+
+
+async def rango_cerrado(db: AsyncSession, fecha_inicio: date, fecha_fin: date) -> Optional[List[int]]:
+    """Los periodos del rango si son periodos completos y todos están cerrados; si no, None."""
+    periodos = periodos_completos_en_rango(fecha_inicio, fecha_fin)
+    if periodos and await periodos_cerrados(db, periodos) == set(periodos):
+        return periodos
+    return None
+
+
+async def primer_dia_abierto(db: AsyncSession, fecha_inicio: date, fecha_fin: date) -> Optional[date]:
+    """Primer día del rango que cae en un periodo sin cerrar (None si todo el rango está cerrado)."""
+    periodos = periodos_del_rango(fecha_inicio, fecha_fin)
+    cerrados = await periodos_cerrados(db, periodos)
+    for periodo in periodos:
+        if periodo not in cerrados:
+            return max(fecha_inicio, rango_periodo_hhee(periodo)[0])
+    return None
+
+
+def marcar_cerrado(periodo: int):
+    _periodos_cerrados.add(periodo)
+
+
+async def listar_periodos(db: AsyncSession, limite: int = 24) -> List[models.PeriodoHHEE]:
+    result = await db.execute(select(models.PeriodoHHEE).order_by(models.PeriodoHHEE.id.desc()).limit(limite))
+    return result.scalars().all()
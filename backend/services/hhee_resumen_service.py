@@ -0,0 +1,171 @@
+# /backend/services/hhee_resumen_service.py
+"""
+Resumen precalculado de HHEE validadas (tabla resumen_hhee) para /hhee/metricas.
+
+Cada escritura de validaciones recalcula, dentro de su misma transacción, solo los
+pares (periodo, RUT) que tocó: borra sus filas del resumen y las vuelve a insertar
+agregando validaciones_hhee. Recalcular en vez de sumar/restar deltas mantiene el
+resumen exacto aunque cambie la campaña, el tipo o el supervisor de un registro.
+
+`reconstruir_periodo` recalcula un periodo completo y verifica que coincida con
+las validaciones (ver backend/reconstruir_resumen_hhee.py).
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, String, column, delete, func, tuple_, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..sql_app import models
+from ..utils import periodo_hhee
+
+# Pares (periodo, RUT) por sentencia al actualizar el resumen
+LOTE_RESUMEN = 500
+
+COLUMNAS_RESUMEN = [
+    "periodo", "rut_limpio", "rut", "nombre_apellido", "campaña",
+    "tipo_hhee", "supervisor_carga", "total_horas", "registros"
+]
+
+
+def consulta_agregada(periodos: List[int], ruts: Optional[Iterable[str]] = None, pares: Optional[List[Tuple[int, str]]] = None):
+    """SELECT con las filas del resumen calculadas desde validaciones_hhee (mismo orden que COLUMNAS_RESUMEN)."""
+    v = models.ValidacionHHEE
+    filtros = [v.estado == 'Validado', v.periodo_id.in_(periodos)]
+    if ruts is not None:
+        filtros.append(v.rut_limpio.in_(list(ruts)))
+
+    base = select(
+        v.periodo_id.label("periodo"),
+        v.rut_limpio, v.rut, v.nombre_apellido,
+        func.coalesce(v.campaña, '').label("campaña"),
+        func.coalesce(v.tipo_hhee, '').label("tipo_hhee"),
+        func.coalesce(v.supervisor_carga, '').label("supervisor_carga"),
+        v.cantidad_hhee_aprobadas
+    ).filter(*filtros).subquery()
+
+    query = select(
+        base.c.periodo, base.c.rut_limpio,
+        func.max(base.c.rut).label("rut"), func.max(base.c.nombre_apellido).label("nombre_apellido"),
+        base.c["campaña"], base.c.tipo_hhee, base.c.supervisor_carga,
+        func.coalesce(func.sum(base.c.cantidad_hhee_aprobadas), 0.0).label("total_horas"),
+        func.count().label("registros")
+    ).group_by(
+        base.c.periodo, base.c.rut_limpio, base.c["campaña"], base.c.tipo_hhee, base.c.supervisor_carga
+    )
+    if pares is not None:
+        query = query.filter(tuple_(base.c.periodo, base.c.rut_limpio).in_(pares))
+    return query
+
+
+def _insertar_desde(query):
+    stmt = pg_insert(models.ResumenHHEE).from_select(COLUMNAS_RESUMEN, query)
+    return stmt.on_conflict_do_update(
+        constraint="uq_resumen_hhee_clave",
+        set_={
+            "rut": stmt.excluded.rut,
+            "nombre_apellido": stmt.excluded.nombre_apellido,
+            "total_horas": stmt.excluded.total_horas,
+            "registros": stmt.excluded.registros,
+            "fecha_actualizacion": func.now(),
+        }
+    )
+
+
+async def _bloquear_claves(db: AsyncSession, claves: List[Tuple[int, str]]):
+    """
+    pg_advisory_xact_lock(periodo, hashtext(rut_limpio)) por cada clave. Se toman en el mismo
+    orden que `sorted()` en Python (periodo, RUT con collation "C"), también entre lotes, para
+    que dos transacciones no se bloqueen en cruz. Se liberan al terminar la transacción.
+    """
+    lote_claves = values(column("periodo", Integer), column("rut_limpio", String), name="claves").data(claves)
+    await db.execute(
+        select(func.pg_advisory_xact_lock(lote_claves.c.periodo, func.hashtext(lote_claves.c.rut_limpio)))
+        .select_from(lote_claves)
+        .order_by(lote_claves.c.periodo, lote_claves.c.rut_limpio.collate("C"))
+    )
+
+
+async def actualizar_resumen(db: AsyncSession, pares_rut_fecha: Iterable[Tuple[str, date]]):
+    """
+    Recalcula el resumen de los (rut_limpio, fecha) afectados por una escritura.
+    Se ejecuta dentro de la transacción del llamador (hacer flush antes si hay objetos sin enviar).
+
+    Cada (periodo, RUT) se bloquea antes de borrar y reagregar: con READ COMMITTED, dos
+    transacciones que recalculan la misma clave a la vez podrían pisarse con un agregado
+    que no ve las filas de la otra. Con el bloqueo la segunda espera a que la primera
+    confirme y su INSERT ... SELECT ya ve esas filas.
+    """
+    claves = sorted({(periodo_hhee(fecha), rut) for rut, fecha in pares_rut_fecha if rut and fecha})
+    if claves:
+        # Todas las claves de la escritura se toman antes de empezar (orden global, sin deadlocks)
+        for i in range(0, len(claves), LOTE_RESUMEN):
+            await _bloquear_claves(db, claves[i:i + LOTE_RESUMEN])
+    for i in range(0, len(claves), LOTE_RESUMEN):
+        lote = claves[i:i + LOTE_RESUMEN]
+
+        await db.execute(delete(models.ResumenHHEE).where(
+            tuple_(models.ResumenHHEE.periodo, models.ResumenHHEE.rut_limpio).in_(lote)
+        ))
+        await db.execute(_insertar_desde(consulta_agregada(
+            sorted({periodo for periodo, _ in lote}), ruts={rut for _, rut in lote}, pares=lote
+        )))
+
+
+async def leer_resumen(db: AsyncSession, periodos: List[int], supervisor_email: Optional[str] = None):
+    """Totales por empleado y campaña de los periodos pedidos (una consulta sobre el índice por periodo)."""
+    r = models.ResumenHHEE
+    query = select(
+        func.max(r.rut).label("rut"),
+        r.rut_limpio,
+        func.max(r.nombre_apellido).label("nombre_apellido"),
+        r.campaña,
+        func.sum(r.total_horas).label("cantidad_hhee_aprobadas")
+    ).filter(r.periodo.in_(periodos))
+    if supervisor_email:
+        query = query.filter(r.supervisor_carga == supervisor_email)
+    result = await db.execute(query.group_by(r.rut_limpio, r.campaña))
+    return result.all()
+
+
+def _indexar(filas) -> Dict[Tuple[str, str, str, str], Tuple[float, int]]:
+    return {
+        (f.rut_limpio, f.campaña, f.tipo_hhee, f.supervisor_carga): (round(float(f.total_horas), 6), int(f.registros))
+        for f in filas
+    }
+
+
+async def verificar_periodo(db: AsyncSession, periodo: int) -> List[Dict[str, Any]]:
+    """Compara el resumen guardado del periodo con el recalculado desde validaciones_hhee."""
+    esperado = _indexar((await db.execute(consulta_agregada([periodo]))).all())
+    guardado = _indexar((await db.execute(
+        select(models.ResumenHHEE).filter(models.ResumenHHEE.periodo == periodo)
+    )).scalars().all())
+
+    diferencias = []
+    for clave in sorted(set(esperado) | set(guardado)):
+        if esperado.get(clave) != guardado.get(clave):
+            diferencias.append({
+                "rut_limpio": clave[0], "campaña": clave[1], "tipo_hhee": clave[2], "supervisor_carga": clave[3],
+                "esperado": esperado.get(clave), "guardado": guardado.get(clave)
+            })
+    return diferencias
+
+
+async def reconstruir_periodo(db: AsyncSession, periodo: int) -> Dict[str, Any]:
+    """Recalcula desde cero el resumen de un periodo, lo confirma y verifica el resultado."""
+    diferencias_previas = await verificar_periodo(db, periodo)
+    await db.execute(delete(models.ResumenHHEE).where(models.ResumenHHEE.periodo == periodo))
+    await db.execute(_insertar_desde(consulta_agregada([periodo])))
+    await db.commit()
+
+    diferencias = await verificar_periodo(db, periodo)
+    filas = await db.scalar(select(func.count()).select_from(models.ResumenHHEE).filter(models.ResumenHHEE.periodo == periodo))
+    return {
+        "periodo": periodo,
+        "filas": filas,
+        "diferencias_previas": len(diferencias_previas),
+        "diferencias": diferencias,
+    }
@@ -0,0 +1,308 @@
+# /backend/services/hhee_solicitudes_service.py
+"""
+Pipeline común de las vistas de solicitudes de HHEE enriquecidas con GeoVictoria.
+
+1. Una consulta liviana obtiene los RUTs (y el rango de fechas) de las solicitudes.
+2. La carga completa de las solicitudes (sesión del request) y la consulta a GeoVictoria
+   (caché de asistencia, con sus propias sesiones) corren en paralelo.
+3. La lógica de negocio se aplica en una pasada (hhee_calculo) y la respuesta se arma
+   con un solo TypeAdapter para toda la lista.
+
+También contiene el motor de decisiones en lote de /solicitudes/procesar-lote: validación
+de todas las decisiones en una pasada y escritura por conjuntos.
+"""
+import asyncio
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import TypeAdapter
+from sqlalchemy import Float, Integer, String, Text, column, func, or_, tuple_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from ..enums import EstadoSolicitudHHEE, TipoSolicitudHHEE
+from ..schemas.models import SolicitudHHEE
+from ..sql_app import models
+from ..utils import formatear_rut
+from . import asistencia_cache_service, geovictoria_service, hhee_calculo
+
+ADAPTADOR_SOLICITUDES = TypeAdapter(List[SolicitudHHEE])
+
+MapaGV = Dict[Tuple[str, str], Dict[str, Any]]
+
+
+async def ruts_de_solicitudes(db: AsyncSession, *filtros) -> Tuple[List[str], Optional[date], Optional[date]]:
+    """RUTs de los solicitantes y rango de fechas de las solicitudes que cumplen los filtros."""
+    s = models.SolicitudHHEE
+    result = await db.execute(
+        select(models.Analista.rut_limpio, func.min(s.fecha_hhee), func.max(s.fecha_hhee))
+        .join(models.Analista, s.analista_id == models.Analista.id)
+        .filter(*filtros)
+        .group_by(models.Analista.rut_limpio)
+    )
+    filas = result.all()
+    if not filas:
+        return [], None, None
+    return [f[0] for f in filas if f[0]], min(f[1] for f in filas), max(f[2] for f in filas)
+
+
+async def datos_gv_por_dia(ruts_limpios: List[str], inicio: date, fin: date) -> Tuple[MapaGV, bool]:
+    """
+    Asistencia de GeoVictoria con la lógica de negocio aplicada, por (rut_limpio, 'YYYY-MM-DD').
+    Devuelve también si GeoVictoria estaba disponible.
+    """
+    if not ruts_limpios:
+        return {}, True
+    if not await geovictoria_service.puede_consultar_asistencia():
+        return {}, False
+    try:
+        datos_gv = await asistencia_cache_service.obtener_datos_periodo(
+            ruts_limpios,
+            datetime.combine(inicio, datetime.min.time()),
+            datetime.combine(fin, datetime.max.time())
+        )
+    except Exception as e:
+        print(f"ADVERTENCIA: Falló la consulta a GV para las solicitudes de HHEE: {e}")
+        return {}, False
+    return {(d['rut_limpio'], d['fecha']): d for d in hhee_calculo.enriquecer_con_logica(datos_gv)}, True
+
+
+async def cargar_con_gv(db: AsyncSession, query, ruts_limpios: List[str], inicio: date, fin: date, escalares: bool = True):
+    """Ejecuta la consulta de solicitudes y la de GeoVictoria a la vez. Devuelve (solicitudes, mapa_gv, gv_disponible)."""
+    result, (mapa_gv, gv_disponible) = await asyncio.gather(
+        db.execute(query),
+        datos_gv_por_dia(ruts_limpios, inicio, fin)
+    )
+    return (result.scalars().all() if escalares else result.all()), mapa_gv, gv_disponible
+
+
+def datos_del_dia(mapa_gv: MapaGV, solicitud) -> Dict[str, Any]:
+    rut_limpio = solicitud.solicitante.rut_limpio if solicitud.solicitante else None
+    return mapa_gv.get((rut_limpio, solicitud.fecha_hhee.strftime('%Y-%m-%d')), {})
+
+
+def armar_respuesta(solicitudes, mapa_gv: MapaGV) -> List[Dict[str, Any]]:
+    """Serializa todas las solicitudes en una pasada y les agrega 'datos_geovictoria'."""
+    filas = ADAPTADOR_SOLICITUDES.dump_python(ADAPTADOR_SOLICITUDES.validate_python(solicitudes, from_attributes=True))
+    for fila, solicitud in zip(filas, solicitudes):
+        fila['datos_geovictoria'] = datos_del_dia(mapa_gv, solicitud)
+    return filas
+
+
+async def solicitudes_enriquecidas(db: AsyncSession, filtros: list, orden: list, opciones: list,
+                                   inicio: date, fin: date, ruts_limpios: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Solicitudes que cumplen `filtros`, ordenadas y con sus relaciones, cada una con los datos
+    de GeoVictoria de su día. Si ya se conocen los RUTs (p. ej. el propio analista) se omite
+    la consulta previa y GeoVictoria arranca de inmediato.
+    """
+    if ruts_limpios is None:
+        ruts_limpios, fecha_min, fecha_max = await ruts_de_solicitudes(db, *filtros)
+        if fecha_min is None:
+            return []
+        # El rango de GV se acota a las fechas que realmente tienen solicitudes
+        inicio, fin = max(inicio, fecha_min), min(fin, fecha_max)
+
+    query = select(models.SolicitudHHEE).options(*opciones).filter(*filtros).order_by(*orden)
+    solicitudes, mapa_gv, _ = await cargar_con_gv(db, query, ruts_limpios, inicio, fin)
+    return armar_respuesta(solicitudes, mapa_gv)
+
+
+# --- DECISIONES EN LOTE ---
+# Tipo de validación que genera cada tipo de solicitud aprobada
+TIPO_VALIDACION = {
+    TipoSolicitudHHEE.ANTES_TURNO: "Antes de Turno",
+    TipoSolicitudHHEE.DESPUES_TURNO: "Después de Turno",
+    TipoSolicitudHHEE.DIA_DESCANSO: "Día de Descanso",
+}
+# Campo de GeoVictoria con el máximo aprobable de cada tipo de solicitud
+CAMPO_MAXIMO = {
+    TipoSolicitudHHEE.ANTES_TURNO: 'hhee_inicio_calculadas',
+    TipoSolicitudHHEE.DESPUES_TURNO: 'hhee_fin_calculadas',
+    TipoSolicitudHHEE.DIA_DESCANSO: 'cantidad_hhee_calculadas',
+}
+# Filas por sentencia en el UPDATE ... FROM (VALUES ...)
+LOTE_DECISIONES = 1000
+
+
+def consulta_para_decision(solicitud_ids: List[int]):
+    """
+    Columnas necesarias para decidir e insertar las validaciones, sin cargar objetos ORM.
+    La campaña es la primera asignada al solicitante (subconsulta correlacionada, sin
+    cargar todas las campañas de cada analista).
+    """
+    s, a = models.SolicitudHHEE, models.Analista
+    campaña = (
+        select(models.Campana.nombre)
+        .join(models.analistas_campanas, models.analistas_campanas.c.campana_id == models.Campana.id)
+        .where(models.analistas_campanas.c.analista_id == a.id)
+        .order_by(models.Campana.id)
+        .limit(1)
+        .correlate(a)
+        .scalar_subquery()
+    )
+    return select(
+        s.id, s.estado, s.tipo, s.fecha_hhee,
+        a.rut, a.rut_limpio, a.nombre, a.apellido,
+        campaña.label("campaña")
+    ).join(a, s.analista_id == a.id).filter(s.id.in_(solicitud_ids))
+
+
+def deduplicar_decisiones(decisiones):
+    """
+    Un mismo solicitud_id repetido en el lote es ambiguo (y generaría dos validaciones
+    para la misma fila): esas decisiones no se procesan y se informan como error.
+    Devuelve (decisiones únicas, errores).
+    """
+    apariciones: Dict[int, int] = {}
+    for decision in decisiones:
+        apariciones[decision.solicitud_id] = apariciones.get(decision.solicitud_id, 0) + 1
+    unicas = [d for d in decisiones if apariciones[d.solicitud_id] == 1]
+    errores = [
+        {"solicitud_id": solicitud_id, "detail": f"La solicitud #{solicitud_id} aparece {veces} veces en el lote; no se procesó."}
+        for solicitud_id, veces in apariciones.items() if veces > 1
+    ]
+    return unicas, errores
+
+
+async def claves_validadas(db: AsyncSession, claves: List[Tuple[str, Any, str]]) -> set:
+    """
+    De las claves (rut_limpio, fecha, tipo) pedidas, las que ya tienen una validación
+    aprobada o reportada a RRHH: aprobar una solicitud no debe reemplazarlas.
+    """
+    if not claves:
+        return set()
+    v = models.ValidacionHHEE
+    result = await db.execute(
+        select(v.rut_limpio, v.fecha_hhee, v.tipo_hhee).filter(
+            tuple_(v.rut_limpio, v.fecha_hhee, v.tipo_hhee).in_(claves),
+            or_(v.estado == 'Validado', v.reportado_a_rrhh == True)
+        )
+    )
+    return {tuple(fila) for fila in result.all()}
+
+
+def clave_validacion(fila) -> Optional[Tuple[str, Any, str]]:
+    """(rut_limpio, fecha, tipo de validación) que generaría aprobar la solicitud."""
+    tipo_hhee = TIPO_VALIDACION.get(fila.tipo)
+    return (fila.rut_limpio, fila.fecha_hhee, tipo_hhee) if tipo_hhee else None
+
+
+def mensaje_conflicto(fila, tipo_hhee: str) -> str:
+    return (f"Ya existe una validación de '{tipo_hhee}' del {fila.fecha_hhee.strftime('%d-%m-%Y')} "
+            f"(aprobada o reportada a RRHH); la solicitud #{fila.id} no se puede aprobar.")
+
+
+async def descartar_conflictos(db: AsyncSession, aceptadas):
+    """
+    Saca de las aprobaciones con horas las que chocarían con una validación existente
+    (o con otra aprobación del mismo lote para el mismo RUT, fecha y tipo).
+    Devuelve (aceptadas, errores).
+    """
+    def genera_validacion(decision, fila):
+        return decision.estado == EstadoSolicitudHHEE.APROBADA and decision.horas_aprobadas > 0 and clave_validacion(fila)
+
+    existentes = await claves_validadas(db, [clave_validacion(f) for d, f in aceptadas if genera_validacion(d, f)])
+    vistas = set()
+    sin_conflicto, errores = [], []
+    for decision, fila in aceptadas:
+        clave = genera_validacion(decision, fila)
+        if clave and (clave in existentes or clave in vistas):
+            errores.append({"solicitud_id": fila.id, "detail": mensaje_conflicto(fila, clave[2])})
+            continue
+        if clave:
+            vistas.add(clave)
+        sin_conflicto.append((decision, fila))
+    return sin_conflicto, errores
+
+
+def validar_decisiones(decisiones, filas_por_id: Dict[int, Any], mapa_gv: MapaGV):
+    """
+    Valida todas las decisiones en una pasada contra los máximos calculados desde GeoVictoria.
+    Devuelve (aceptadas: [(decision, fila)], errores: [{"solicitud_id", "detail"}]).
+    """
+    errores = []
+    candidatas = []
+    for decision in decisiones:
+        fila = filas_por_id.get(decision.solicitud_id)
+        if fila is None:
+            errores.append({"solicitud_id": decision.solicitud_id, "detail": "Solicitud no encontrada."})
+        elif fila.estado != EstadoSolicitudHHEE.PENDIENTE:
+            errores.append({"solicitud_id": decision.solicitud_id, "detail": "Esta solicitud ya ha sido procesada."})
+        else:
+            candidatas.append((decision, fila))
+
+    if not candidatas:
+        return [], errores
+
+    horas = np.array([d.horas_aprobadas for d, _ in candidatas], dtype=float)
+    maximos = np.array([
+        float(mapa_gv.get((f.rut_limpio, f.fecha_hhee.strftime('%Y-%m-%d')), {}).get(CAMPO_MAXIMO.get(f.tipo), 0) or 0)
+        for _, f in candidatas
+    ], dtype=float)
+    excede = horas > maximos
+
+    aceptadas = []
+    for (decision, fila), fuera_de_limite, maximo in zip(candidatas, excede, maximos):
+        if fuera_de_limite:
+            errores.append({
+                "solicitud_id": fila.id,
+                "detail": f"Para la solicitud #{fila.id}, no se pueden aprobar {decision.horas_aprobadas} horas. El máximo calculado es {maximo:.2f}."
+            })
+        else:
+            aceptadas.append((decision, fila))
+    return aceptadas, errores
+
+
+async def aplicar_decisiones(db: AsyncSession, aceptadas, supervisor_id: int) -> set:
+    """
+    UPDATE ... FROM (VALUES ...) por lote. Solo toca solicitudes que siguen pendientes
+    (otra decisión concurrente no se pisa) y devuelve los ids efectivamente actualizados.
+    """
+    s = models.SolicitudHHEE
+    actualizadas = set()
+    for i in range(0, len(aceptadas), LOTE_DECISIONES):
+        decisiones = values(
+            column("id", Integer), column("estado", String), column("horas", Float), column("comentario", Text),
+            name="decisiones"
+        ).data([
+            (fila.id, decision.estado.name, decision.horas_aprobadas, decision.comentario_supervisor)
+            for decision, fila in aceptadas[i:i + LOTE_DECISIONES]
+        ])
+        result = await db.execute(
+            update(s)
+            .where(s.id == decisiones.c.id, s.estado == EstadoSolicitudHHEE.PENDIENTE)
+            .values(
+                estado=decisiones.c.estado,
+                horas_aprobadas=decisiones.c.horas,
+                comentario_supervisor=decisiones.c.comentario,
+                supervisor_id=supervisor_id,
+                fecha_decision=func.now()
+            )
+            .returning(s.id)
+            .execution_options(synchronize_session=False)
+        )
+        actualizadas.update(result.scalars().all())
+    return actualizadas
+
+
+def validaciones_aprobadas(aceptadas, ids_actualizados: set, supervisor_email: str) -> List[Dict[str, Any]]:
+    """Filas de validaciones_hhee que generan las aprobaciones con horas."""
+    filas = []
+    for decision, fila in aceptadas:
+        tipo_hhee = TIPO_VALIDACION.get(fila.tipo)
+        if fila.id not in ids_actualizados or decision.estado != EstadoSolicitudHHEE.APROBADA or decision.horas_aprobadas <= 0 or not tipo_hhee:
+            continue
+        filas.append({
+            "rut": formatear_rut(fila.rut) if fila.rut else "",
+            "nombre_apellido": f"{fila.nombre} {fila.apellido}",
+            "campaña": fila.campaña or "General",
+            "fecha_hhee": fila.fecha_hhee,
+            "tipo_hhee": tipo_hhee,
+            "cantidad_hhee_aprobadas": decision.horas_aprobadas,
+            "estado": "Validado",
+            "supervisor_carga": supervisor_email,
+            "notas": f"Aprobado desde solicitud #{fila.id}. Comentario: {decision.comentario_supervisor or ''}".strip()
+        })
+    return filas
@@ -0,0 +1,147 @@
+# /backend/services/reportes_exportacion.py
+"""
+Filtros y formatos de fila de las exportaciones de bitácora e incidencias,
+compartidos por la exportación directa y por los trabajos asíncronos.
+"""
+from datetime import datetime, time, timezone
+from typing import Any, Dict
+
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from ..enums import EstadoIncidencia
+from ..sql_app import models
+from . import exportacion_trabajos
+
+
+# --- BITÁCORA ---
+def filtrar_bitacora(query, filtros):
+    if filtros.fecha_inicio:
+        query = query.filter(models.BitacoraEntry.fecha >= filtros.fecha_inicio)
+    if filtros.fecha_fin:
+        query = query.filter(models.BitacoraEntry.fecha <= filtros.fecha_fin)
+    if filtros.campana_id:
+        query = query.filter(models.BitacoraEntry.campana_id == filtros.campana_id)
+    if filtros.autor_id:
+        query = query.filter(models.BitacoraEntry.autor_id == filtros.autor_id)
+    if filtros.lob_id:
+        query = query.filter(models.BitacoraEntry.lob_id == filtros.lob_id)
+    return query
+
+
+def consulta_bitacora(filtros):
+    query = select(models.BitacoraEntry).options(
+        selectinload(models.BitacoraEntry.campana),
+        selectinload(models.BitacoraEntry.autor),
+        selectinload(models.BitacoraEntry.lob)
+    ).order_by(models.BitacoraEntry.fecha.desc(), models.BitacoraEntry.hora.desc())
+    return filtrar_bitacora(query, filtros)
+
+
+def fila_bitacora(entry) -> Dict[str, Any]:
+    return {
+        "ID": entry.id,
+        "Fecha": entry.fecha.strftime("%d-%m-%Y"),
+        "Hora": entry.hora.strftime("%H:%M"),
+        "Campaña": entry.campana.nombre if entry.campana else "N/A",
+        "LOB": entry.lob.nombre if entry.lob else "N/A",
+        "Autor": f"{entry.autor.nombre} {entry.autor.apellido}" if entry.autor else "N/A",
+        "Comentario": entry.comentario
+    }
+
+
+COLUMNAS_BITACORA = ["ID", "Fecha", "Hora", "Campaña", "LOB", "Autor", "Comentario"]
+
+
+async def producir_bitacora(trabajo, filtros):
+    await exportacion_trabajos.exportar_consulta(
+        trabajo, consulta_bitacora(filtros), COLUMNAS_BITACORA,
+        lambda entry: list(fila_bitacora(entry).values()), 'Eventos',
+        mensaje_sin_resultados="No se encontraron eventos con los filtros seleccionados.",
+        query_total=filtrar_bitacora(select(models.BitacoraEntry.id), filtros),
+        escalares=True
+    )
+
+
+# --- INCIDENCIAS ---
+def filtrar_incidencias(query, filtros):
+    if filtros.fecha_inicio:
+        query = query.filter(models.Incidencia.fecha_apertura >= datetime.combine(filtros.fecha_inicio, time.min))
+    if filtros.fecha_fin:
+        query = query.filter(models.Incidencia.fecha_apertura <= datetime.combine(filtros.fecha_fin, time.max))
+    if filtros.campana_id:
+        query = query.filter(models.Incidencia.campana_id == filtros.campana_id)
+    if filtros.estado:
+        query = query.filter(models.Incidencia.estado == filtros.estado)
+    if filtros.asignado_a_id is not None:
+        if filtros.asignado_a_id == 0:
+            query = query.filter(models.Incidencia.asignado_a_id.is_(None))
+        else:
+            query = query.filter(models.Incidencia.asignado_a_id == filtros.asignado_a_id)
+    return query
+
+
+def consulta_incidencias(filtros):
+    query = select(models.Incidencia).options(
+        selectinload(models.Incidencia.campana),
+        selectinload(models.Incidencia.lobs),
+        selectinload(models.Incidencia.creador),
+        selectinload(models.Incidencia.asignado_a),
+        selectinload(models.Incidencia.cerrado_por),
+        selectinload(models.Incidencia.actualizaciones)
+    ).order_by(models.Incidencia.fecha_apertura.desc())
+    return filtrar_incidencias(query, filtros)
+
+
+def _fecha_comparable(d):
+    # Ordenamos asegurando que todas las fechas sean comparables (aware) y manejando None
+    if not d:
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    if d.tzinfo is None:
+        return d.replace(tzinfo=timezone.utc)
+    return d
+
+
+def fila_incidencia(inc) -> Dict[str, Any]:
+    comentario_cierre = "N/A"
+    if inc.estado == EstadoIncidencia.CERRADA:
+        actualizaciones_ordenadas = sorted(
+            inc.actualizaciones,
+            key=lambda x: _fecha_comparable(x.fecha_actualizacion),
+            reverse=True
+        )
+        for act in actualizaciones_ordenadas:
+            if "Comentario de Cierre: " in act.comentario:
+                comentario_cierre = act.comentario.split("Comentario de Cierre: ")[1]
+                break
+
+    return {
+        "ID": inc.id,
+        "Titulo": inc.titulo,
+        "Campaña": inc.campana.nombre if inc.campana else "N/A",
+        "LOBs": ", ".join([lob.nombre for lob in inc.lobs]) if inc.lobs else "N/A",
+        "Gravedad": inc.gravedad.value if inc.gravedad else "N/A",
+        "Estado": inc.estado.value if inc.estado else "N/A",
+        "Creador": f"{inc.creador.nombre} {inc.creador.apellido}" if inc.creador else "N/A",
+        "Asignado a": f"{inc.asignado_a.nombre} {inc.asignado_a.apellido}" if inc.asignado_a else "Sin Asignar",
+        "Cerrado por": f"{inc.cerrado_por.nombre} {inc.cerrado_por.apellido}" if inc.cerrado_por else "N/A",
+        "Fecha Apertura": inc.fecha_apertura.strftime("%d-%m-%Y %H:%M") if inc.fecha_apertura else "N/A",
+        "Fecha Cierre": inc.fecha_cierre.strftime("%d-%m-%Y %H:%M") if inc.fecha_cierre else "N/A",
+        "Comentario de Cierre": comentario_cierre
+    }
+
+
+COLUMNAS_INCIDENCIAS = [
+    "ID", "Titulo", "Campaña", "LOBs", "Gravedad", "Estado", "Creador",
+    "Asignado a", "Cerrado por", "Fecha Apertura", "Fecha Cierre", "Comentario de Cierre"
+]
+
+
+async def producir_incidencias(trabajo, filtros):
+    await exportacion_trabajos.exportar_consulta(
+        trabajo, consulta_incidencias(filtros), COLUMNAS_INCIDENCIAS,
+        lambda inc: list(fila_incidencia(inc).values()), 'Incidencias',
+        mensaje_sin_resultados="No se encontraron incidencias con los filtros seleccionados.",
+        query_total=filtrar_incidencias(select(models.Incidencia.id), filtros),
+        escalares=True
+    )
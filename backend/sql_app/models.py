@@ -1,7 +1,8 @@
 # backend/sql_app/models.py
 
 from sqlalchemy import (Column, Integer, String, Boolean, DateTime, ForeignKey,
-                        Enum as SQLEnum, Date, Time, Text, Float, Table, func)
+                        Enum as SQLEnum, Date, Time, Text, Float, Table, func,
+                        JSON, UniqueConstraint, Computed, Index, text)
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 from ..enums import (UserRole, ProgresoTarea, TipoIncidencia, EstadoIncidencia,
@@ -10,6 +11,19 @@ from ..enums import (UserRole, ProgresoTarea, TipoIncidencia, EstadoIncidencia,
 
 Base = declarative_base()
 
+# RUT normalizado (sin puntos ni guion, en mayúsculas), igual que los Identifier de GeoVictoria.
+# Lo mantiene Postgres como columna generada para poder filtrar y unir por índice.
+RUT_LIMPIO_SQL = "upper(replace(replace(btrim(rut), '.', ''), '-', ''))"
+
+# Periodo de HHEE (26 al 25) de una fecha, como entero YYYYMM del mes en que termina el periodo.
+# Misma regla que utils.periodo_hhee; expresión inmutable para poder guardarla como columna generada.
+PERIODO_HHEE_SQL = (
+    "CASE WHEN EXTRACT(DAY FROM {col}) >= 26 THEN "
+    "CASE WHEN EXTRACT(MONTH FROM {col}) = 12 THEN (EXTRACT(YEAR FROM {col})::int + 1) * 100 + 1 "
+    "ELSE EXTRACT(YEAR FROM {col})::int * 100 + EXTRACT(MONTH FROM {col})::int + 1 END "
+    "ELSE EXTRACT(YEAR FROM {col})::int * 100 + EXTRACT(MONTH FROM {col})::int END"
+)
+
 # --- TABLAS DE ASOCIACIÓN ---
 
 incidencias_lobs = Table('incidencias_lobs', Base.metadata,
@@ -122,6 +136,7 @@ class Analista(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     bms_id = Column(Integer, nullable=True)
     rut = Column(String, unique=True, nullable=True)
+    rut_limpio = Column(String, Computed(RUT_LIMPIO_SQL, persisted=True), index=True)
     hashed_password = Column(String, nullable=False)
     role = Column(SQLEnum(UserRole, native_enum=False, create_type=False), default=UserRole.ANALISTA)
     esta_activo = Column(Boolean, default=True)
@@ -420,12 +435,23 @@ class ActualizacionIncidencia(Base):
 # --- HHEE ---
 class ValidacionHHEE(Base):
     __tablename__ = "validaciones_hhee"
+    __table_args__ = (
+        Index('ix_validaciones_hhee_rut_limpio_fecha', 'rut_limpio', 'fecha_hhee'),
+        # Conteos de pendientes por rango y supervisor (/hhee/metricas-pendientes)
+        Index('ix_validaciones_hhee_estado_fecha_supervisor', 'estado', 'fecha_hhee', 'supervisor_carga'),
+        # Páginas de /hhee/pendientes: orden (nombre, fecha, id) solo sobre las filas pendientes
+        Index('ix_validaciones_hhee_pendientes_orden', text("coalesce(nombre_apellido, '')"), 'fecha_hhee', 'id',
+              postgresql_where=text("estado = 'Pendiente por Corrección'")),
+        UniqueConstraint('rut_limpio', 'fecha_hhee', 'tipo_hhee', name='uq_validacion_hhee_rut_fecha_tipo'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     rut = Column(String, index=True, nullable=False)
+    rut_limpio = Column(String, Computed(RUT_LIMPIO_SQL, persisted=True), index=True)
     nombre_apellido = Column(String)
     campaña = Column(String, nullable=True)
     fecha_hhee = Column(Date, nullable=False, index=True)
+    periodo_id = Column(Integer, Computed(PERIODO_HHEE_SQL.format(col="fecha_hhee"), persisted=True), index=True)
     tipo_hhee = Column(String, nullable=True) # "Antes de Turno", "Después de Turno", "Día de Descanso"
     cantidad_hhee_declaradas = Column(Float, default=0.0)
     cantidad_hhee_aprobadas = Column(Float, default=0.0)
@@ -446,11 +472,16 @@ class ValidacionHHEE(Base):
 
 class SolicitudHHEE(Base):
     __tablename__ = 'solicitudes_hhee'
+    __table_args__ = (
+        # Conteos por estado en un rango de fechas (/hhee/metricas)
+        Index('ix_solicitudes_hhee_estado_fecha', 'estado', 'fecha_hhee'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
     # Datos de la solicitud
     fecha_hhee = Column(Date, nullable=False)
+    periodo_id = Column(Integer, Computed(PERIODO_HHEE_SQL.format(col="fecha_hhee"), persisted=True), index=True)
     tipo = Column(SQLEnum(TipoSolicitudHHEE, native_enum=False, create_type=False), nullable=False)
     horas_solicitadas = Column(Float, nullable=False)
     justificacion = Column(Text, nullable=False)
@@ -469,6 +500,32 @@ class SolicitudHHEE(Base):
     solicitante = relationship("Analista", foreign_keys=[analista_id], back_populates="solicitudes_realizadas")
     supervisor = relationship("Analista", foreign_keys=[supervisor_id], back_populates="solicitudes_gestionadas")
 
+class AsistenciaDiariaGV(Base):
+    """
+    Caché persistente de la asistencia diaria ya procesada desde GeoVictoria (AttendanceBook).
+    Una fila por (rut_limpio, fecha). Los días cerrados se sirven desde aquí sin llamar a la API.
+    """
+    __tablename__ = "asistencia_diaria_gv"
+    __table_args__ = (
+        UniqueConstraint('rut_limpio', 'fecha', name='uq_asistencia_gv_rut_fecha'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    rut_limpio = Column(String, nullable=False, index=True)
+    fecha = Column(Date, nullable=False, index=True)
+    nombre_apellido = Column(String, nullable=True)
+    campaña = Column(String, nullable=True)
+    inicio_turno_teorico = Column(String, nullable=True)
+    fin_turno_teorico = Column(String, nullable=True)
+    marca_real_inicio = Column(String, nullable=True)
+    marca_real_fin = Column(String, nullable=True)
+    hhee_autorizadas_antes_gv = Column(Float, default=0.0)
+    hhee_autorizadas_despues_gv = Column(Float, default=0.0)
+    permisos = Column(JSON, nullable=True)
+    # Marcado cuando el día puede haber cambiado en GeoVictoria (p. ej. corrección de marcas)
+    sucio = Column(Boolean, default=False, nullable=False)
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 class Entregable(Base):
     """
     Gestión de tareas asíncronas para el Backoffice Kanban.
@@ -529,4 +586,137 @@ class EntregableComentario(Base):
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
 
     entregable = relationship("Entregable", back_populates="comentarios")
-    autor = relationship("Analista", foreign_keys=[autor_id])
\ No newline at end of file
+    autor = relationship("Analista", foreign_keys=[autor_id])
+
+
+class ConsolidadoGV(Base):
+    """
+    Totales de HHEE del periodo por RUT, según el endpoint Consolidated de GeoVictoria.
+    Los precalcula el job nocturno para que /hhee/metricas no tenga que esperar a la API.
+    """
+    __tablename__ = "consolidado_gv"
+    __table_args__ = (
+        UniqueConstraint('rut_limpio', 'fecha_inicio', 'fecha_fin', name='uq_consolidado_gv_rut_rango'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    rut_limpio = Column(String, nullable=False, index=True)
+    fecha_inicio = Column(Date, nullable=False)
+    fecha_fin = Column(Date, nullable=False)
+    total_hhee = Column(Float, default=0.0, nullable=False)
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class SincronizacionGV(Base):
+    """
+    Estado de la sincronización incremental de asistencia por RUT.
+    `fecha_asentada` es el último día que ya no puede cambiar y está guardado en asistencia_diaria_gv;
+    `marca_agua` es el momento de la última sincronización exitosa.
+    """
+    __tablename__ = "sincronizacion_gv"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rut_limpio = Column(String, nullable=False, unique=True, index=True)
+    fecha_asentada = Column(Date, nullable=True)
+    marca_agua = Column(DateTime(timezone=True), nullable=True)
+
+class PeriodoHHEE(Base):
+    """
+    Registro de periodos de HHEE (26 al 25). El id es el mismo YYYYMM que guardan
+    validaciones_hhee.periodo_id y solicitudes_hhee.periodo_id (utils.periodo_hhee).
+    Un periodo cerrado ya no cambia: sus lecturas se pueden cachear sin vencimiento corto.
+    """
+    __tablename__ = "periodos_hhee"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # YYYYMM
+    fecha_inicio = Column(Date, nullable=False)
+    fecha_fin = Column(Date, nullable=False)
+    cerrado = Column(Boolean, default=False, nullable=False)
+    fecha_cierre = Column(DateTime(timezone=True), nullable=True)
+    cerrado_por_id = Column(Integer, ForeignKey('analistas.id'), nullable=True)
+    # Totales de solicitudes congelados al cerrar (al cierre no quedan pendientes)
+    horas_aprobadas_solicitud = Column(Float, nullable=True)
+    horas_rechazadas_solicitud = Column(Float, nullable=True)
+
+class CierreHHEEResumen(Base):
+    """
+    Foto al cierre del periodo de los totales validados por (RUT, campaña, tipo, supervisor).
+    Mismas columnas que resumen_hhee, pero no se vuelve a escribir después del cierre.
+    """
+    __tablename__ = "cierre_hhee_resumen"
+    __table_args__ = (
+        Index('ix_cierre_hhee_resumen_periodo_supervisor', 'periodo', 'supervisor_carga'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    periodo = Column(Integer, nullable=False)
+    rut_limpio = Column(String, nullable=False)
+    rut = Column(String, nullable=False)
+    nombre_apellido = Column(String)
+    campaña = Column(String, nullable=False, default="")
+    tipo_hhee = Column(String, nullable=False, default="")
+    supervisor_carga = Column(String, nullable=False, default="")
+    total_horas = Column(Float, default=0.0, nullable=False)
+    registros = Column(Integer, default=0, nullable=False)
+
+class CierreHHEERRHH(Base):
+    """Total de HHEE autorizadas por RRHH (GeoVictoria Consolidated) por RUT, tomado una vez al cerrar el periodo."""
+    __tablename__ = "cierre_hhee_rrhh"
+    __table_args__ = (
+        UniqueConstraint('periodo', 'rut_limpio', name='uq_cierre_hhee_rrhh_periodo_rut'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    periodo = Column(Integer, nullable=False)
+    rut_limpio = Column(String, nullable=False)
+    total_hhee_rrhh = Column(Float, default=0.0, nullable=False)
+
+class CierreHHEEDetalle(Base):
+    """
+    Validaciones aprobadas del periodo al cierre, con las horas autorizadas en GeoVictoria
+    para su tipo. Las re-exportaciones de periodos cerrados se leen de aquí.
+    """
+    __tablename__ = "cierre_hhee_detalle"
+    __table_args__ = (
+        Index('ix_cierre_hhee_detalle_periodo_rut_fecha', 'periodo', 'rut', 'fecha_hhee'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    periodo = Column(Integer, nullable=False)
+    validacion_id = Column(Integer, nullable=False)
+    rut = Column(String, nullable=False)
+    rut_limpio = Column(String, nullable=False)
+    nombre_apellido = Column(String)
+    campaña = Column(String)
+    fecha_hhee = Column(Date, nullable=False)
+    tipo_hhee = Column(String)
+    cantidad_hhee_aprobadas = Column(Float)
+    horas_rrhh = Column(Float, default=0.0, nullable=False)
+    estado = Column(String)
+    supervisor_carga = Column(String)
+    fecha_carga = Column(DateTime(timezone=True))
+
+class ResumenHHEE(Base):
+    """
+    Totales de HHEE validadas por (periodo, RUT, campaña, tipo, supervisor).
+    Lo mantienen al día los endpoints que escriben validaciones (recalculando solo
+    los RUTs/periodos afectados) para que /hhee/metricas lea una sola consulta indexada.
+    Los valores nulos de la clave se guardan como cadena vacía.
+    """
+    __tablename__ = "resumen_hhee"
+    __table_args__ = (
+        UniqueConstraint('periodo', 'rut_limpio', 'campaña', 'tipo_hhee', 'supervisor_carga', name='uq_resumen_hhee_clave'),
+        Index('ix_resumen_hhee_periodo_supervisor', 'periodo', 'supervisor_carga'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    periodo = Column(Integer, nullable=False)  # YYYYMM del mes en que termina el periodo (26 al 25)
+    rut_limpio = Column(String, nullable=False)
+    rut = Column(String, nullable=False)
+    nombre_apellido = Column(String)
+    campaña = Column(String, nullable=False, default="")
+    tipo_hhee = Column(String, nullable=False, default="")
+    supervisor_carga = Column(String, nullable=False, default="")
+    total_horas = Column(Float, default=0.0, nullable=False)
+    registros = Column(Integer, default=0, nullable=False)
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
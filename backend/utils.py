@@ -8,6 +8,12 @@ def decimal_to_hhmm(decimal_hours):
     minutes = int(round((decimal_hours - hours) * 60))
     return f"{hours:02d}:{minutes:02d}"
 
+def limpiar_rut(rut: str) -> str:
+    """Normaliza un RUT al formato de GeoVictoria y de la columna rut_limpio: sin puntos ni guion, en mayúsculas."""
+    if not isinstance(rut, str):
+        return ""
+    return rut.strip().replace('.', '').replace('-', '').upper()
+
 def formatear_rut(rut: str) -> str:
     """Limpia y formatea un RUT al formato XXXXXXXX-K."""
     if not isinstance(rut, str):
@@ -27,19 +33,54 @@ def get_current_hhee_period():
     Calcula el periodo actual de HHEE (26 del mes anterior al 25 del mes actual).
     Si hoy es >= 26, el periodo termina el 25 del mes siguiente.
     """
-    today = date.today()
-    if today.day >= 26:
-        start = date(today.year, today.month, 26)
-        if today.month == 12:
-            end = date(today.year + 1, 1, 25)
-        else:
-            end = date(today.year, today.month + 1, 25)
+    return rango_periodo_hhee(periodo_actual_hhee())
+
+def periodo_actual_hhee() -> int:
+    """Identificador YYYYMM del periodo de HHEE en curso."""
+    return periodo_hhee(date.today())
+
+def periodo_hhee(fecha: date) -> int:
+    """
+    Identificador del periodo de HHEE al que pertenece una fecha, como entero YYYYMM
+    del mes en que el periodo termina (el 26/01 y el 25/02 pertenecen a 202602).
+    """
+    if fecha.day >= 26:
+        if fecha.month == 12:
+            return (fecha.year + 1) * 100 + 1
+        return fecha.year * 100 + fecha.month + 1
+    return fecha.year * 100 + fecha.month
+
+def rango_periodo_hhee(periodo: int):
+    """Devuelve (inicio, fin) del periodo YYYYMM: del 26 del mes anterior al 25 del mes."""
+    anio, mes = divmod(periodo, 100)
+    if mes == 1:
+        inicio = date(anio - 1, 12, 26)
     else:
-        if today.month == 1:
-            start = date(today.year - 1, 12, 26)
-        else:
-            start = date(today.year, today.month - 1, 26)
-        end = date(today.year, today.month, 25)
+        inicio = date(anio, mes - 1, 26)
+    return inicio, date(anio, mes, 25)
+
+def siguiente_periodo_hhee(periodo: int) -> int:
+    anio, mes = divmod(periodo, 100)
+    return (anio + 1) * 100 + 1 if mes == 12 else periodo + 1
+
+def periodos_en_rango(fecha_inicio: date, fecha_fin: date):
+    """Identificadores de todos los periodos que toca el rango, completos o no."""
+    periodos = []
+    periodo, ultimo = periodo_hhee(fecha_inicio), periodo_hhee(fecha_fin)
+    while periodo <= ultimo:
+        periodos.append(periodo)
+        periodo = siguiente_periodo_hhee(periodo)
+    return periodos
+
+def periodos_completos_en_rango(fecha_inicio: date, fecha_fin: date):
+    """
+    Si el rango cubre exactamente uno o más periodos completos (26 al 25) devuelve
+    sus identificadores; si empieza o termina a mitad de periodo devuelve None.
+    """
+    if fecha_inicio.day != 26 or fecha_fin.day != 25 or fecha_fin < fecha_inicio:
+        return None
+    return periodos_en_rango(fecha_inicio, fecha_fin)
+
 def get_timezone_by_country(country_code: str) -> str:
     """
     Devuelve la zona horaria correspondiente al código de país.
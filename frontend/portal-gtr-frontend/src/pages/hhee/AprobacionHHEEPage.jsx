@@ -125,7 +125,11 @@ function AprobacionHHEEPage() {
             }
             const result = await response.json();
             setSuccess(result.detail);
-            fetchPendientes();
+            await fetchPendientes();
+            // Las decisiones que no pasaron la validación vuelven una por una; el resto ya quedó guardado
+            if (result.errores && result.errores.length > 0) {
+                setError(result.errores.map(e => `#${e.solicitud_id}: ${e.detail}`).join(' | '));
+            }
         } catch (err) {
             setError(err.message);
         } finally {
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Container, Form, Button, Card, Spinner, Alert, ListGroup, Table, Row, Col, Badge  } from 'react-bootstrap';
 import { API_BASE_URL, fetchWithAuth } from '../../api';
 import ResultadoFila from '../../components/hhee/ResultadoFila';
@@ -124,7 +124,10 @@ function PortalHHEEPage() {
         setFechaFin(formatDate(fechaFin));
     };
 
-    const initializeValidaciones = (datos) => {
+    // Identifica la carga de pendientes en curso, para cortar la paginación si el usuario cambia de vista
+    const cargaPendientesRef = useRef(0);
+
+    const initializeValidaciones = (datos, acumular = false) => {
         const initialValidaciones = {};
         datos.forEach(dia => {
             const esDescanso = (dia.inicio_turno_teorico === '00:00' && dia.fin_turno_teorico === '00:00');
@@ -136,11 +139,13 @@ function PortalHHEEPage() {
                 nota: dia.notas || ''
             };
         });
-        setValidaciones(initialValidaciones);
+        // Al acumular páginas se conservan los cambios que el usuario ya hizo
+        setValidaciones(prev => acumular ? { ...initialValidaciones, ...prev } : initialValidaciones);
     };
 
     const handleConsulta = async (e) => {
         e.preventDefault();
+        cargaPendientesRef.current++;
         setLoading(true);
         setError(null);
         setSuccess(null);
@@ -179,6 +184,7 @@ function PortalHHEEPage() {
     };
     
     const handleCargarPendientes = async (fechaInicioOverride = null, fechaFinOverride = null) => {
+        const cargaActual = ++cargaPendientesRef.current;
         setLoading(true);
         setError(null);
         setSuccess(null);
@@ -192,39 +198,42 @@ function PortalHHEEPage() {
             const inicio = fechaInicioOverride || fechaInicio;
             const fin = fechaFinOverride || fechaFin;
 
-            let url = `${API_BASE_URL}/hhee/pendientes`;
-            
             // 2. Construimos la URL con los parámetros
             const params = new URLSearchParams();
             if (inicio) params.append('fecha_inicio', inicio);
             if (fin) params.append('fecha_fin', fin);
-            
-            const queryString = params.toString();
-            if (queryString) {
-                url += `?${queryString}`;
-            }
-    
-            const response = await fetchWithAuth(url, {});
-    
-            if (!response.ok) {
-                 const errorInfo = await response.json();
-                 throw new Error(errorInfo.detail);
-            }
-    
-            const data = await response.json(); 
+
+            // 3. Pedimos página por página: la primera se muestra apenas llega y las siguientes se agregan
+            let acumulados = [];
+            let cursor = null;
+            do {
+                if (cursor) params.set('cursor', cursor);
+                const response = await fetchWithAuth(`${API_BASE_URL}/hhee/pendientes?${params.toString()}`, {});
     
-            if (!data.datos_periodo || data.datos_periodo.length === 0) {
-                setSuccess('¡Excelente! No hay registros pendientes por corregir para el período seleccionado.');
-                return;
-            }
+                if (!response.ok) {
+                     const errorInfo = await response.json();
+                     throw new Error(errorInfo.detail);
+                }
     
-            setNombreAgente(data.nombre_agente);
-            setResultados(data.datos_periodo);
-            initializeValidaciones(data.datos_periodo);
+                const data = await response.json(); 
+                if (cargaActual !== cargaPendientesRef.current) return;
+
+                if (acumulados.length === 0 && (!data.datos_periodo || data.datos_periodo.length === 0)) {
+                    setSuccess('¡Excelente! No hay registros pendientes por corregir para el período seleccionado.');
+                    return;
+                }
+
+                acumulados = [...acumulados, ...data.datos_periodo];
+                setNombreAgente(data.nombre_agente);
+                setResultados(acumulados);
+                initializeValidaciones(data.datos_periodo, !!cursor);
+                setLoading(false);
+                cursor = data.siguiente_cursor;
+            } while (cursor);
         } catch (err) {
-            setError(err.message);
+            if (cargaActual === cargaPendientesRef.current) setError(err.message);
         } finally {
-            setLoading(false);
+            if (cargaActual === cargaPendientesRef.current) setLoading(false);
         }
     };
 
@@ -0,0 +1,24 @@
+-- Migración: caché persistente de asistencia de GeoVictoria (HHEE)
+-- Ejecutar en el editor SQL de Supabase
+
+CREATE TABLE IF NOT EXISTS public.asistencia_diaria_gv (
+    id SERIAL PRIMARY KEY,
+    rut_limpio VARCHAR NOT NULL,
+    fecha DATE NOT NULL,
+    nombre_apellido VARCHAR NULL,
+    "campaña" VARCHAR NULL,
+    inicio_turno_teorico VARCHAR NULL,
+    fin_turno_teorico VARCHAR NULL,
+    marca_real_inicio VARCHAR NULL,
+    marca_real_fin VARCHAR NULL,
+    hhee_autorizadas_antes_gv DOUBLE PRECISION DEFAULT 0,
+    hhee_autorizadas_despues_gv DOUBLE PRECISION DEFAULT 0,
+    permisos JSON NULL,
+    fecha_actualizacion TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_asistencia_gv_rut_fecha UNIQUE (rut_limpio, fecha)
+);
+
+CREATE INDEX IF NOT EXISTS ix_asistencia_diaria_gv_rut_limpio ON public.asistencia_diaria_gv (rut_limpio);
+CREATE INDEX IF NOT EXISTS ix_asistencia_diaria_gv_fecha ON public.asistencia_diaria_gv (fecha);
+
+COMMENT ON TABLE public.asistencia_diaria_gv IS 'Asistencia diaria procesada de GeoVictoria, usada como caché por el portal HHEE';
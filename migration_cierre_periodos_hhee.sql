@@ -0,0 +1,53 @@
+-- Migración: cierre de periodos de HHEE (fotos inmutables para dashboards y re-exportaciones)
+-- Ejecutar en el editor SQL de Supabase
+-- Las tablas se llenan al cerrar un periodo con POST /hhee/periodos/{periodo}/cerrar.
+
+ALTER TABLE public.periodos_hhee
+    ADD COLUMN IF NOT EXISTS horas_aprobadas_solicitud DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS horas_rechazadas_solicitud DOUBLE PRECISION;
+
+CREATE TABLE IF NOT EXISTS public.cierre_hhee_resumen (
+    id SERIAL PRIMARY KEY,
+    periodo INTEGER NOT NULL,
+    rut_limpio VARCHAR NOT NULL,
+    rut VARCHAR NOT NULL,
+    nombre_apellido VARCHAR,
+    "campaña" VARCHAR NOT NULL DEFAULT '',
+    tipo_hhee VARCHAR NOT NULL DEFAULT '',
+    supervisor_carga VARCHAR NOT NULL DEFAULT '',
+    total_horas DOUBLE PRECISION NOT NULL DEFAULT 0,
+    registros INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS ix_cierre_hhee_resumen_periodo_supervisor ON public.cierre_hhee_resumen (periodo, supervisor_carga);
+
+CREATE TABLE IF NOT EXISTS public.cierre_hhee_rrhh (
+    id SERIAL PRIMARY KEY,
+    periodo INTEGER NOT NULL,
+    rut_limpio VARCHAR NOT NULL,
+    total_hhee_rrhh DOUBLE PRECISION NOT NULL DEFAULT 0,
+    CONSTRAINT uq_cierre_hhee_rrhh_periodo_rut UNIQUE (periodo, rut_limpio)
+);
+
+CREATE TABLE IF NOT EXISTS public.cierre_hhee_detalle (
+    id SERIAL PRIMARY KEY,
+    periodo INTEGER NOT NULL,
+    validacion_id INTEGER NOT NULL,
+    rut VARCHAR NOT NULL,
+    rut_limpio VARCHAR NOT NULL,
+    nombre_apellido VARCHAR,
+    "campaña" VARCHAR,
+    fecha_hhee DATE NOT NULL,
+    tipo_hhee VARCHAR,
+    cantidad_hhee_aprobadas DOUBLE PRECISION,
+    horas_rrhh DOUBLE PRECISION NOT NULL DEFAULT 0,
+    estado VARCHAR,
+    supervisor_carga VARCHAR,
+    fecha_carga TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS ix_cierre_hhee_detalle_periodo_rut_fecha ON public.cierre_hhee_detalle (periodo, rut, fecha_hhee);
+
+COMMENT ON TABLE public.cierre_hhee_resumen IS 'Totales HHEE validadas de periodos cerrados por RUT, campaña, tipo y supervisor';
+COMMENT ON TABLE public.cierre_hhee_rrhh IS 'Totales RRHH (GeoVictoria Consolidated) de periodos cerrados por RUT';
+COMMENT ON TABLE public.cierre_hhee_detalle IS 'Validaciones aprobadas de periodos cerrados con sus horas RRHH, para re-exportar';
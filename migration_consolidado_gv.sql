@@ -0,0 +1,16 @@
+-- Migración: totales consolidados de GeoVictoria precalculados por el job nocturno (HHEE)
+-- Ejecutar en el editor SQL de Supabase
+
+CREATE TABLE IF NOT EXISTS public.consolidado_gv (
+    id SERIAL PRIMARY KEY,
+    rut_limpio VARCHAR NOT NULL,
+    fecha_inicio DATE NOT NULL,
+    fecha_fin DATE NOT NULL,
+    total_hhee DOUBLE PRECISION NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_consolidado_gv_rut_rango UNIQUE (rut_limpio, fecha_inicio, fecha_fin)
+);
+
+CREATE INDEX IF NOT EXISTS ix_consolidado_gv_rut_limpio ON public.consolidado_gv (rut_limpio);
+
+COMMENT ON TABLE public.consolidado_gv IS 'Totales HHEE por RUT y periodo (GeoVictoria Consolidated), precalculados para /hhee/metricas';
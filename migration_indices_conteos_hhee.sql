@@ -0,0 +1,13 @@
+-- Migración: índices para los conteos de HHEE resueltos en la BD
+-- Ejecutar en el editor SQL de Supabase
+-- /hhee/metricas-pendientes cuenta pendientes por estado, rango de fechas y supervisor;
+-- /hhee/metricas cuenta solicitudes por estado en un rango de fechas.
+
+CREATE INDEX IF NOT EXISTS ix_validaciones_hhee_estado_fecha_supervisor
+    ON public.validaciones_hhee (estado, fecha_hhee, supervisor_carga);
+
+CREATE INDEX IF NOT EXISTS ix_solicitudes_hhee_estado_fecha
+    ON public.solicitudes_hhee (estado, fecha_hhee);
+
+ANALYZE public.validaciones_hhee;
+ANALYZE public.solicitudes_hhee;
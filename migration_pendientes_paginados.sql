@@ -0,0 +1,9 @@
+-- Migración: índice para la paginación por cursor de /hhee/pendientes
+-- Ejecutar en el editor SQL de Supabase
+-- Índice parcial (solo filas pendientes) en el mismo orden que las páginas: nombre, fecha, id.
+
+CREATE INDEX IF NOT EXISTS ix_validaciones_hhee_pendientes_orden
+    ON public.validaciones_hhee (coalesce(nombre_apellido, ''), fecha_hhee, id)
+    WHERE estado = 'Pendiente por Corrección';
+
+ANALYZE public.validaciones_hhee;
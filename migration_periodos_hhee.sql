@@ -0,0 +1,52 @@
+-- Migración: registro de periodos de HHEE y periodo_id precalculado
+-- Ejecutar en el editor SQL de Supabase
+-- periodo_id es el YYYYMM del mes en que termina el periodo (26 al 25), la misma regla que
+-- utils.periodo_hhee. Es una columna generada: Postgres la completa para las filas
+-- existentes y la mantiene al insertar o actualizar fecha_hhee.
+
+ALTER TABLE public.validaciones_hhee
+    ADD COLUMN IF NOT EXISTS periodo_id INTEGER
+    GENERATED ALWAYS AS (
+        CASE WHEN EXTRACT(DAY FROM fecha_hhee) >= 26 THEN
+            CASE WHEN EXTRACT(MONTH FROM fecha_hhee) = 12 THEN (EXTRACT(YEAR FROM fecha_hhee)::int + 1) * 100 + 1
+            ELSE EXTRACT(YEAR FROM fecha_hhee)::int * 100 + EXTRACT(MONTH FROM fecha_hhee)::int + 1 END
+        ELSE EXTRACT(YEAR FROM fecha_hhee)::int * 100 + EXTRACT(MONTH FROM fecha_hhee)::int END
+    ) STORED;
+
+ALTER TABLE public.solicitudes_hhee
+    ADD COLUMN IF NOT EXISTS periodo_id INTEGER
+    GENERATED ALWAYS AS (
+        CASE WHEN EXTRACT(DAY FROM fecha_hhee) >= 26 THEN
+            CASE WHEN EXTRACT(MONTH FROM fecha_hhee) = 12 THEN (EXTRACT(YEAR FROM fecha_hhee)::int + 1) * 100 + 1
+            ELSE EXTRACT(YEAR FROM fecha_hhee)::int * 100 + EXTRACT(MONTH FROM fecha_hhee)::int + 1 END
+        ELSE EXTRACT(YEAR FROM fecha_hhee)::int * 100 + EXTRACT(MONTH FROM fecha_hhee)::int END
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_validaciones_hhee_periodo_id ON public.validaciones_hhee (periodo_id);
+CREATE INDEX IF NOT EXISTS ix_solicitudes_hhee_periodo_id ON public.solicitudes_hhee (periodo_id);
+
+CREATE TABLE IF NOT EXISTS public.periodos_hhee (
+    id INTEGER PRIMARY KEY,
+    fecha_inicio DATE NOT NULL,
+    fecha_fin DATE NOT NULL,
+    cerrado BOOLEAN NOT NULL DEFAULT false,
+    fecha_cierre TIMESTAMPTZ,
+    cerrado_por_id INTEGER REFERENCES public.analistas (id)
+);
+
+COMMENT ON TABLE public.periodos_hhee IS 'Periodos de HHEE (26 al 25) identificados por YYYYMM; cerrado = inmutable';
+
+-- Registro inicial: todos los periodos que ya tienen validaciones o solicitudes
+INSERT INTO public.periodos_hhee (id, fecha_inicio, fecha_fin)
+SELECT p.periodo_id,
+       (make_date(p.periodo_id / 100, p.periodo_id % 100, 26) - interval '1 month')::date,
+       make_date(p.periodo_id / 100, p.periodo_id % 100, 25)
+FROM (
+    SELECT periodo_id FROM public.validaciones_hhee
+    UNION
+    SELECT periodo_id FROM public.solicitudes_hhee
+) p
+ON CONFLICT (id) DO NOTHING;
+
+ANALYZE public.validaciones_hhee;
+ANALYZE public.solicitudes_hhee;
@@ -0,0 +1,23 @@
+-- Migración: resumen precalculado de HHEE validadas para /hhee/metricas
+-- Ejecutar en el editor SQL de Supabase
+-- Después de crear la tabla, poblar cada periodo con:
+--   python -m backend.reconstruir_resumen_hhee 202601 202602 ...
+
+CREATE TABLE IF NOT EXISTS public.resumen_hhee (
+    id SERIAL PRIMARY KEY,
+    periodo INTEGER NOT NULL,
+    rut_limpio VARCHAR NOT NULL,
+    rut VARCHAR NOT NULL,
+    nombre_apellido VARCHAR,
+    "campaña" VARCHAR NOT NULL DEFAULT '',
+    tipo_hhee VARCHAR NOT NULL DEFAULT '',
+    supervisor_carga VARCHAR NOT NULL DEFAULT '',
+    total_horas DOUBLE PRECISION NOT NULL DEFAULT 0,
+    registros INTEGER NOT NULL DEFAULT 0,
+    fecha_actualizacion TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT uq_resumen_hhee_clave UNIQUE (periodo, rut_limpio, "campaña", tipo_hhee, supervisor_carga)
+);
+
+CREATE INDEX IF NOT EXISTS ix_resumen_hhee_periodo_supervisor ON public.resumen_hhee (periodo, supervisor_carga);
+
+COMMENT ON TABLE public.resumen_hhee IS 'Totales HHEE validadas por periodo, RUT, campaña, tipo y supervisor, para /hhee/metricas';
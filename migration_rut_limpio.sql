@@ -0,0 +1,19 @@
+-- Migración: RUT normalizado e indexado en validaciones_hhee y analistas (HHEE)
+-- Ejecutar en el editor SQL de Supabase
+-- Las columnas son generadas: Postgres las completa para las filas existentes (backfill)
+-- y las mantiene al insertar o actualizar el RUT.
+
+ALTER TABLE public.validaciones_hhee
+    ADD COLUMN IF NOT EXISTS rut_limpio VARCHAR
+    GENERATED ALWAYS AS (upper(replace(replace(btrim(rut), '.', ''), '-', ''))) STORED;
+
+ALTER TABLE public.analistas
+    ADD COLUMN IF NOT EXISTS rut_limpio VARCHAR
+    GENERATED ALWAYS AS (upper(replace(replace(btrim(rut), '.', ''), '-', ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS ix_validaciones_hhee_rut_limpio ON public.validaciones_hhee (rut_limpio);
+CREATE INDEX IF NOT EXISTS ix_validaciones_hhee_rut_limpio_fecha ON public.validaciones_hhee (rut_limpio, fecha_hhee);
+CREATE INDEX IF NOT EXISTS ix_analistas_rut_limpio ON public.analistas (rut_limpio);
+
+ANALYZE public.validaciones_hhee;
+ANALYZE public.analistas;
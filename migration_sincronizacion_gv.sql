@@ -0,0 +1,19 @@
+-- Migración: sincronización incremental de asistencia de GeoVictoria (HHEE)
+-- Ejecutar en el editor SQL de Supabase
+
+ALTER TABLE public.asistencia_diaria_gv
+    ADD COLUMN IF NOT EXISTS sucio BOOLEAN NOT NULL DEFAULT FALSE;
+
+CREATE INDEX IF NOT EXISTS ix_asistencia_diaria_gv_sucio
+    ON public.asistencia_diaria_gv (rut_limpio, fecha) WHERE sucio;
+
+CREATE TABLE IF NOT EXISTS public.sincronizacion_gv (
+    id SERIAL PRIMARY KEY,
+    rut_limpio VARCHAR NOT NULL UNIQUE,
+    fecha_asentada DATE NULL,
+    marca_agua TIMESTAMPTZ NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_sincronizacion_gv_rut_limpio ON public.sincronizacion_gv (rut_limpio);
+
+COMMENT ON TABLE public.sincronizacion_gv IS 'Último día asentado y marca de agua de la sincronización incremental con GeoVictoria, por RUT';
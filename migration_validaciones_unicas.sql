@@ -0,0 +1,89 @@
+-- Migración: clave única (RUT, fecha, tipo) en validaciones_hhee (HHEE)
+-- Ejecutar en el editor SQL de Supabase, después de migration_rut_limpio.sql
+-- /hhee/cargar-hhee guarda cada lote con un único INSERT ... ON CONFLICT sobre esta clave.
+--
+-- Los duplicados existentes son registros reales (p. ej. una carga de /cargar-hhee más la
+-- validación creada al aprobar una solicitud del mismo día y tipo): no se borran a ciegas.
+-- Cada grupo se fusiona en su registro más reciente (horas validadas sumadas, notas
+-- concatenadas, marca de RRHH conservada) y los demás se archivan en
+-- validaciones_hhee_duplicados antes de eliminarlos.
+
+-- 1. Revisar los duplicados existentes
+SELECT rut_limpio, fecha_hhee, tipo_hhee, COUNT(*) AS filas,
+       SUM(cantidad_hhee_aprobadas) FILTER (WHERE estado = 'Validado') AS horas_validadas,
+       bool_or(reportado_a_rrhh) AS alguno_reportado, bool_and(reportado_a_rrhh) AS todos_reportados
+FROM public.validaciones_hhee
+WHERE tipo_hhee IS NOT NULL
+GROUP BY rut_limpio, fecha_hhee, tipo_hhee
+HAVING COUNT(*) > 1;
+
+-- 2. Un grupo con registros reportados y no reportados a RRHH no se puede fusionar sin
+--    duplicar o perder horas en el próximo envío: la migración se detiene (y no aplica nada)
+--    hasta que se resuelvan a mano.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM public.validaciones_hhee
+        WHERE tipo_hhee IS NOT NULL
+        GROUP BY rut_limpio, fecha_hhee, tipo_hhee
+        HAVING COUNT(*) > 1 AND bool_or(reportado_a_rrhh) AND NOT bool_and(reportado_a_rrhh)
+    ) THEN
+        RAISE EXCEPTION 'Hay duplicados (RUT, fecha, tipo) que mezclan registros reportados y no reportados a RRHH. Revisarlos con la consulta del paso 1 antes de migrar.';
+    END IF;
+END $$;
+
+-- 3. Grupos a fusionar: se conserva el registro más reciente de cada (RUT, fecha, tipo)
+CREATE TEMP TABLE grupos_duplicados ON COMMIT DROP AS
+SELECT rut_limpio, fecha_hhee, tipo_hhee,
+       MAX(id) AS id_conservado,
+       bool_or(estado = 'Validado') AS hay_validado,
+       COALESCE(SUM(cantidad_hhee_aprobadas) FILTER (WHERE estado = 'Validado'), 0) AS horas_validadas,
+       string_agg(DISTINCT notas, ' | ') AS notas,
+       bool_or(reportado_a_rrhh) AS reportado_a_rrhh,
+       (array_agg(reportado_por_id ORDER BY fecha_reportado DESC NULLS LAST))[1] AS reportado_por_id,
+       MAX(fecha_reportado) AS fecha_reportado
+FROM public.validaciones_hhee
+WHERE tipo_hhee IS NOT NULL
+GROUP BY rut_limpio, fecha_hhee, tipo_hhee
+HAVING COUNT(*) > 1;
+
+-- 4. Archivo de los registros que se fusionan (copia completa, con el id que los absorbió)
+CREATE TABLE IF NOT EXISTS public.validaciones_hhee_duplicados (
+    LIKE public.validaciones_hhee,
+    fusionado_en_id INTEGER NOT NULL,
+    fecha_archivo TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE public.validaciones_hhee_duplicados IS 'Registros de validaciones_hhee fusionados al crear uq_validacion_hhee_rut_fecha_tipo';
+
+INSERT INTO public.validaciones_hhee_duplicados
+SELECT v.*, g.id_conservado, now()
+FROM public.validaciones_hhee v
+JOIN grupos_duplicados g
+  ON v.rut_limpio = g.rut_limpio AND v.fecha_hhee = g.fecha_hhee AND v.tipo_hhee = g.tipo_hhee
+WHERE v.id <> g.id_conservado;
+
+-- 5. Fusión en el registro conservado
+UPDATE public.validaciones_hhee v
+SET cantidad_hhee_aprobadas = CASE WHEN g.hay_validado THEN g.horas_validadas ELSE v.cantidad_hhee_aprobadas END,
+    estado = CASE WHEN g.hay_validado THEN 'Validado' ELSE v.estado END,
+    notas = g.notas,
+    reportado_a_rrhh = g.reportado_a_rrhh,
+    reportado_por_id = COALESCE(v.reportado_por_id, g.reportado_por_id),
+    fecha_reportado = COALESCE(v.fecha_reportado, g.fecha_reportado)
+FROM grupos_duplicados g
+WHERE v.id = g.id_conservado;
+
+DELETE FROM public.validaciones_hhee v
+USING grupos_duplicados g
+WHERE v.rut_limpio = g.rut_limpio
+  AND v.fecha_hhee = g.fecha_hhee
+  AND v.tipo_hhee = g.tipo_hhee
+  AND v.id <> g.id_conservado;
+
+-- 6. Clave única
+ALTER TABLE public.validaciones_hhee
+    ADD CONSTRAINT uq_validacion_hhee_rut_fecha_tipo UNIQUE (rut_limpio, fecha_hhee, tipo_hhee);
+
+ANALYZE public.validaciones_hhee;